@@ -0,0 +1,3 @@
+# __init__.py
+# Imports the plugin classes (gedit looks them up in this module)
+from .hello_gpt import HelloGPTApp, HelloGPTPlugin
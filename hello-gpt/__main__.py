@@ -0,0 +1,17 @@
+# __main__.py
+# Lets the plugin directory run headless: python3 <plugin-dir> [options]
+# The directory name is not a valid module name, so register it under an
+# alias package without running __init__.py (which needs gedit).
+import os
+import sys
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+package = types.ModuleType("hello_gpt_engine")
+package.__path__ = [PLUGIN_DIR]
+sys.modules["hello_gpt_engine"] = package
+
+from hello_gpt_engine.cli import main
+
+sys.exit(main())
@@ -0,0 +1,207 @@
+# backends/__init__.py
+# Transport backends behind engine.chat_stream()
+#
+# A backend is a module with a stream function per provider it serves,
+# called as func(api_key, model, message, callback, trace=None,
+# options=None) and emitting the events documented on
+# engine.chat_stream(). Request bodies are built by openai_request() and
+# gemini_request() here, so every backend applies the options the same
+# way. Modules are imported on first use, so the SDKs cost nothing at
+# startup while a provider uses the stdlib backend.
+#
+# options may also carry a CancelToken as "cancel"; backends hook the
+# abort of their open stream into it with abort_on_cancel().
+import os
+import sys
+import importlib
+import threading
+from contextlib import contextmanager
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# provider -> config name -> (module, stream function)
+BACKENDS = {
+    "openai": {
+        "stdlib": ("stdlib", "openai_chat_stream"),
+        "sdk": ("openai_sdk", "openai_sdk_stream"),
+        "realtime": ("realtime", "openai_realtime_stream"),
+    },
+    "gemini": {
+        "stdlib": ("stdlib", "gemini_chat_stream"),
+        "sdk": ("genai_sdk", "gemini_sdk_stream"),
+        "realtime": ("realtime", "gemini_live_stream"),
+    },
+}
+DEFAULT_BACKEND = "stdlib"
+
+
+def use_vendored(name):
+    """
+    Puts a vendored SDK directory (openai-gpt-core, google) on sys.path.
+    """
+    path = os.path.join(PLUGIN_DIR, name)
+    if os.path.isdir(path) and path not in sys.path:
+        sys.path.insert(0, path)
+
+def load(provider, name=None):
+    """
+    Returns (backend name, stream function) for provider. Unknown names
+    and SDK backends whose SDK is not importable fall back to stdlib.
+    """
+    choices = BACKENDS[provider]
+    if name not in choices:
+        name = DEFAULT_BACKEND
+    module_name, func_name = choices[name]
+    module = importlib.import_module(f"{__name__}.{module_name}")
+    if not getattr(module, "AVAILABLE", True):
+        return load(provider, DEFAULT_BACKEND)
+    return name, getattr(module, func_name)
+
+
+# OpenAI models that reason before answering: they take reasoning_effort
+# and max_completion_tokens, but no temperature or stop sequences
+OPENAI_REASONING_PREFIXES = ("o1", "o3", "o4", "gpt-5")
+
+# Gemini models without thinking, which reject a thinkingConfig
+GEMINI_NO_THINKING_PREFIXES = ("gemini-1.", "gemini-2.0")
+
+# Gemini models that always think, with their smallest thinking budget: a
+# budget of 0 (thinking off) is rejected, so it is raised to the minimum
+GEMINI_MIN_THINKING_BUDGET = {"gemini-2.5-pro": 128, "gemini-3-pro": 128}
+
+# Reported for finish_reason "length", like Gemini's MAX_TOKENS
+OPENAI_LENGTH_ERROR = "OpenAI: Response exceeded maximum token limit"
+
+
+def openai_request(model, message, options=None):
+    """
+    Chat Completions parameters (without "stream") for message and the
+    request options: "system" becomes a system message, "prediction" the
+    predicted output, and the latency profile keys (see latency.py) the
+    matching sampling parameters.
+    """
+    options = options or {}
+    messages = [{"role": "user", "content": message}]
+    if options.get("system"):
+        messages.insert(0, {"role": "system", "content": options["system"]})
+    params = {
+        "model": model,
+        "messages": messages,
+        "stream_options": {"include_usage": True},
+    }
+    if model.startswith(OPENAI_REASONING_PREFIXES):
+        if options.get("reasoning_effort"):
+            params["reasoning_effort"] = options["reasoning_effort"]
+        if options.get("max_output_tokens"):
+            params["max_completion_tokens"] = options["max_output_tokens"]
+    else:
+        params["temperature"] = options.get("temperature", 0.7)
+        if options.get("max_output_tokens"):
+            params["max_tokens"] = options["max_output_tokens"]
+        if options.get("stop"):
+            params["stop"] = options["stop"]
+    if options.get("prediction"):
+        params["prediction"] = {"type": "content", "content": options["prediction"]}
+    return params
+
+def gemini_request(model, message, options=None):
+    """
+    generateContent body for message; "system" becomes the system
+    instruction, "files" (uploads.py) fileData parts ahead of the message
+    and the latency profile keys the generation config. Gemini has no
+    predicted outputs, so "prediction" is unused.
+    """
+    options = options or {}
+    config = {"temperature": options.get("temperature", 0.7)}
+    if options.get("max_output_tokens"):
+        config["maxOutputTokens"] = options["max_output_tokens"]
+    if options.get("stop"):
+        config["stopSequences"] = options["stop"]
+    budget = options.get("thinking_budget")
+    if budget is not None and not model.startswith(GEMINI_NO_THINKING_PREFIXES):
+        for prefix, minimum in GEMINI_MIN_THINKING_BUDGET.items():
+            if model.startswith(prefix) and 0 <= budget < minimum:
+                budget = minimum
+        config["thinkingConfig"] = {"thinkingBudget": budget}
+    body = {
+        "contents": [{"role": "user", "parts": [
+            {"fileData": {"mimeType": file["mime_type"], "fileUri": file["uri"]}}
+            for file in options.get("files") or []
+        ] + [{"text": message}]}],
+        "generationConfig": config,
+    }
+    if options.get("system"):
+        body["systemInstruction"] = {"parts": [{"text": options["system"]}]}
+    return body
+
+
+class StreamDelta:
+    """
+    One event of an SDK backend's raw stream: a text delta, the final
+    usage dict or an abnormal finish reason.
+    """
+    __slots__ = ("text", "usage", "finish")
+
+    def __init__(self, text=None, usage=None, finish=None):
+        self.text = text
+        self.usage = usage
+        self.finish = finish
+
+
+# -------------------------
+# Cancellation
+# -------------------------
+class CancelToken:
+    """
+    Lets another thread stop a request. cancel() runs the hooks the
+    backend registered for its open stream (closing the response or
+    socket wakes the blocked read); see engine.chat_stream() for the
+    events a cancelled request still sends.
+    """
+    def __init__(self):
+        self.cancelled = False
+        self.hooks = []
+        self.lock = threading.Lock()
+
+    def hook(self, func):
+        with self.lock:
+            if not self.cancelled:
+                self.hooks.append(func)
+                return
+        func()
+
+    def unhook(self, func):
+        with self.lock:
+            if func in self.hooks:
+                self.hooks.remove(func)
+
+    def cancel(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            hooks, self.hooks = self.hooks, []
+        for func in hooks:
+            try:
+                func()
+            except Exception:
+                pass
+
+def cancelled(options):
+    token = (options or {}).get("cancel")
+    return token is not None and token.cancelled
+
+@contextmanager
+def abort_on_cancel(options, abort):
+    """
+    Calls abort() if the request's token is cancelled inside the block.
+    """
+    token = (options or {}).get("cancel")
+    if token is None:
+        yield
+        return
+    token.hook(abort)
+    try:
+        yield
+    finally:
+        token.unhook(abort)
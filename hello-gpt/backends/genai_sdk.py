@@ -0,0 +1,187 @@
+# backends/genai_sdk.py
+# Gemini backend on the vendored google-genai SDK
+from . import use_vendored, gemini_request, abort_on_cancel, cancelled, StreamDelta
+from ..engine import DECODER, provider_config
+from ..ledger import gemini_usage
+from .. import tracing, recorder
+
+use_vendored("google")
+
+try:
+    import google.genai as genai
+    from google.genai import errors as genai_errors
+    from google.genai._transformers import t_model
+except ImportError:
+    genai = None
+
+AVAILABLE = genai is not None
+
+# One client (and connection pool) per key, base URL and recording state
+CLIENTS = {}
+
+
+def get_client(api_key=None, options=None):
+    """
+    Returns a cached genai.Client for api_key (default: the configured
+    key) and the base URL of the request's settings, or None when it can't
+    be created.
+    """
+    if not genai:
+        return None
+    settings = provider_config("gemini", options)
+    api_key = api_key or settings.get("api_key")
+    base_url = settings.get("base_url")
+    key = (api_key, base_url, recorder.ENABLED)
+    if key not in CLIENTS:
+        try:
+            http_options = {"base_url": base_url} if base_url else {}
+            if recorder.ENABLED:
+                http_options["client_args"] = {"transport": recorder.httpx_transport("gemini")}
+            CLIENTS[key] = genai.Client(api_key=api_key, http_options=http_options or None)
+        except Exception:
+            return None
+    return CLIENTS[key]
+
+# Non-STOP finish reasons reported as errors, as in the stdlib backend
+GEMINI_FINISH_ERRORS = {
+    "SAFETY": "Gemini: Response blocked by safety filters",
+    "OTHER": "Gemini: Response terminated unexpectedly",
+    "MAX_TOKENS": "Gemini: Response exceeded maximum token limit",
+}
+
+def gemini_raw_payloads(client, model, message, options=None):
+    """
+    Sends streamGenerateContent through the client's own transport (auth,
+    base URL, retries, status errors) and yields each SSE event's JSON
+    text, the strings HttpResponse.segments() would json.loads.
+    """
+    api_client = client._api_client
+    path = f"{t_model(api_client, model)}:streamGenerateContent?alt=sse"
+    request = api_client._build_request("post", path, gemini_request(model, message, options), None)
+    response = api_client._request(request, None, stream=True)
+    try:
+        with abort_on_cancel(options, response.response_stream.close):
+            yield from response._iter_response_stream()
+    finally:
+        response.response_stream.close()
+
+def gemini_raw_deltas(client, model, message, options=None):
+    """
+    Yields StreamDeltas from the raw events without building
+    GenerateContentResponse models. Plain text chunks go through the
+    decoder's fast path; the rest are read as dicts for their text parts
+    and finish reason. Only an in-stream error becomes a typed APIError.
+    """
+    usage_payload = None
+    for payload in gemini_raw_payloads(client, model, message, options):
+        payload = payload.encode("utf-8")
+        text = DECODER.gemini_text(payload)
+        if text is not None:
+            # Cumulative usage: only the last one is ever parsed
+            if b'"usageMetadata"' in payload:
+                usage_payload = payload
+            if text:
+                yield StreamDelta(text)
+            continue
+
+        data = DECODER.loads(payload)
+        if data.get("error"):
+            raise genai_errors.APIError(None, data)
+        if data.get("usageMetadata"):
+            usage_payload = None
+            yield StreamDelta(usage=data["usageMetadata"])
+        for candidate in (data.get("candidates") or [])[:1]:
+            # Thought summaries are not part of the reply (chunk.text skips them too)
+            text = "".join(part["text"] for part in (candidate.get("content") or {}).get("parts") or []
+                           if part.get("text") and not part.get("thought"))
+            if text:
+                yield StreamDelta(text)
+            if candidate.get("finishReason") in GEMINI_FINISH_ERRORS:
+                yield StreamDelta(finish=candidate["finishReason"])
+    if usage_payload:
+        yield StreamDelta(usage=DECODER.loads(usage_payload).get("usageMetadata"))
+
+def gemini_raw_stream(client, model, message, callback, trace=None, options=None):
+    """
+    Lightweight Gemini path, the counterpart of openai_raw_stream().
+    """
+    if trace:
+        trace.mark("request_sent")
+    usage = None
+    # The request is only sent on the first next(), so the first
+    # raw.next_delta span also covers connecting
+    delta_start = tracing.now() if tracing.ENABLED else 0.0
+    for delta in gemini_raw_deltas(client, model, message, options):
+        if trace:
+            trace.mark_once("first_byte")
+            trace.chunks += 1
+        if tracing.ENABLED and delta_start:
+            tracing.complete("raw.next_delta", delta_start)
+        if delta.text:
+            callback("text", delta.text)
+        elif delta.usage:
+            usage = delta.usage
+        elif delta.finish:
+            callback("error", GEMINI_FINISH_ERRORS[delta.finish])
+        if tracing.ENABLED:
+            delta_start = tracing.now()
+    if usage:
+        callback("usage", gemini_usage(usage))
+    callback("done", None)
+
+def gemini_sdk_stream(api_key, model, message, callback, trace=None, options=None):
+    """
+    Streams generated content through the google-genai SDK.
+    "stream_mode": "raw" (the default) reads plain deltas; "sdk" builds a
+    GenerateContentResponse model per chunk.
+    """
+    client = get_client(api_key, options)
+    if not client:
+        callback("error", "Error connecting to the API.")
+        return
+
+    if provider_config("gemini", options).get("stream_mode", "raw") == "raw":
+        try:
+            gemini_raw_stream(client, model, message, callback, trace, options)
+        except Exception as e:
+            callback("error", str(e))
+        return
+
+    try:
+        if trace:
+            trace.mark("request_sent")
+        # GenerateContentConfig takes the REST body's camelCase names too
+        request = gemini_request(model, message, options)
+        config = dict(request["generationConfig"])
+        if "systemInstruction" in request:
+            config["systemInstruction"] = request["systemInstruction"]
+        stream = client.models.generate_content_stream(
+            model=model,
+            contents=request["contents"],
+            config=config
+        )
+        usage = None
+        # The request is only sent on the first next(), so the first
+        # sdk.next_event span also covers connecting
+        chunk_start = tracing.now() if tracing.ENABLED else 0.0
+        for chunk in stream:
+            # The SDK's generator can't be closed from another thread
+            if cancelled(options):
+                break
+            if trace:
+                trace.mark_once("first_byte")
+                trace.chunks += 1
+            if tracing.ENABLED and chunk_start:
+                tracing.complete("sdk.next_event", chunk_start)
+            if getattr(chunk, "text", None):
+                callback("text", chunk.text)
+            # usage_metadata is cumulative; keep the latest
+            if getattr(chunk, "usage_metadata", None):
+                usage = chunk.usage_metadata
+            if tracing.ENABLED:
+                chunk_start = tracing.now()
+        if usage:
+            callback("usage", gemini_usage(usage.model_dump(by_alias=True, exclude_none=True)))
+        callback("done", None)
+    except Exception as e:
+        callback("error", str(e))
@@ -0,0 +1,164 @@
+# backends/openai_sdk.py
+# OpenAI backend on the vendored openai SDK
+from . import use_vendored, openai_request, abort_on_cancel, StreamDelta, OPENAI_LENGTH_ERROR
+from ..engine import OPENAI_CONFIG, DECODER, provider_config
+from ..ledger import openai_usage
+from .. import tracing, recorder
+
+use_vendored("openai-gpt-core")
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+AVAILABLE = openai is not None
+
+# Streaming clients, one (and its connection pool) per key, base URL and
+# recording state
+CLIENTS = {}
+
+
+def configure(api_key=None):
+    """
+    Sets the key and base URL on the module-level client, which the
+    batch API calls use too.
+    """
+    openai.api_key = api_key or OPENAI_CONFIG.get("api_key")
+    if OPENAI_CONFIG.get("base_url"):
+        openai.base_url = OPENAI_CONFIG["base_url"]
+    if recorder.ENABLED and openai.http_client is None:
+        openai.http_client = openai.DefaultHttpxClient(transport=recorder.httpx_transport("openai"))
+
+def get_client(api_key, options=None):
+    """
+    A cached client for api_key and the base URL of the request's
+    settings. Streams don't use the module-level client, whose key and
+    URL are shared by every request of the process.
+    """
+    base_url = provider_config("openai", options).get("base_url")
+    key = (api_key, base_url, recorder.ENABLED)
+    if key not in CLIENTS:
+        http_client = None
+        if recorder.ENABLED:
+            http_client = openai.DefaultHttpxClient(transport=recorder.httpx_transport("openai"))
+        CLIENTS[key] = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+    return CLIENTS[key]
+
+def openai_raw_deltas(response):
+    """
+    Yields StreamDeltas straight from the SSE lines of a streamed response,
+    without building ChatCompletionChunk models or the stream snapshot.
+    Only chunks the decoder can't take apart (role, finish, usage) are
+    parsed whole.
+    """
+    for line in response.iter_lines():
+        if not line.startswith("data: ") or line == "data: [DONE]":
+            continue
+        payload = line[6:].encode("utf-8")
+        text = DECODER.openai_text(payload)
+        if text is not None:
+            yield StreamDelta(text)
+            continue
+
+        data = DECODER.loads(payload)
+        if data.get("error"):
+            error = data["error"]
+            message = error.get("message") if isinstance(error, dict) else str(error)
+            raise openai.APIError(message or "An error occurred during streaming",
+                                  response.http_response.request, body=error)
+        if data.get("usage"):
+            yield StreamDelta(usage=data["usage"])
+        choice = (data.get("choices") or [{}])[0]
+        content = choice.get("delta", {}).get("content")
+        if content:
+            yield StreamDelta(content)
+        if choice.get("finish_reason") == "length":
+            yield StreamDelta(finish="length")
+
+def openai_raw_stream(client, model, message, callback, trace=None, options=None):
+    """
+    Lightweight OpenAI path: the SDK still sends the request (auth,
+    retries, status errors) but the body is read as raw SSE lines.
+    """
+    if trace:
+        trace.mark("request_sent")
+    usage = None
+    open_start = tracing.now() if tracing.ENABLED else 0.0
+    with client.chat.completions.with_streaming_response.create(
+        **openai_request(model, message, options), stream=True
+    ) as response, abort_on_cancel(options, response.close):
+        delta_start = open_start
+        if tracing.ENABLED and open_start:
+            delta_start = tracing.complete("sdk.open_stream", open_start)
+        for delta in openai_raw_deltas(response):
+            if trace:
+                trace.mark_once("first_byte")
+                trace.chunks += 1
+            if tracing.ENABLED and delta_start:
+                tracing.complete("raw.next_delta", delta_start)
+            if delta.text:
+                callback("text", delta.text)
+            elif delta.usage:
+                usage = delta.usage
+            elif delta.finish:
+                callback("error", OPENAI_LENGTH_ERROR)
+            if tracing.ENABLED:
+                delta_start = tracing.now()
+    if usage:
+        callback("usage", openai_usage(usage))
+    callback("done", None)
+
+def openai_sdk_stream(api_key, model, message, callback, trace=None, options=None):
+    """
+    Streams a chat completion through the OpenAI SDK. The SDK hides the
+    connection, so trace only gets request-sent and first-event marks.
+    "stream_mode": "raw" (the default) reads plain deltas; "sdk" uses
+    chat.completions.stream() and its per-chunk snapshot accumulation.
+    """
+    # Check OpenAI module import and API key presence
+    if openai is None or not api_key:
+        callback("error", "Error connecting to the API.")
+        return
+
+    client = get_client(api_key, options)
+    if provider_config("openai", options).get("stream_mode", "raw") == "raw":
+        try:
+            openai_raw_stream(client, model, message, callback, trace, options)
+        except Exception as e:
+            callback("error", str(e))
+        return
+
+    try:
+        if trace:
+            trace.mark("request_sent")
+        usage = None
+        open_start = tracing.now() if tracing.ENABLED else 0.0
+        with client.chat.completions.stream(**openai_request(model, message, options)) as stream, \
+                abort_on_cancel(options, stream.close):
+            # Each event is timed from the end of the previous one, which
+            # covers the network wait plus the SDK's chunk accumulation
+            event_start = open_start
+            if tracing.ENABLED and open_start:
+                event_start = tracing.complete("sdk.open_stream", open_start)
+            for event in stream:
+                if trace:
+                    trace.mark_once("first_byte")
+                    trace.chunks += 1
+                event_type = getattr(event, "type", "")
+                if tracing.ENABLED and event_start:
+                    tracing.complete("sdk.next_event", event_start, {"type": event_type})
+                if event_type == "content.delta" and event.delta:
+                    callback("text", event.delta)
+                elif event_type == "chunk" and event.chunk.usage:
+                    usage = event.chunk.usage.model_dump()
+                elif event_type == "chunk" and event.chunk.choices and \
+                        event.chunk.choices[0].finish_reason == "length":
+                    callback("error", OPENAI_LENGTH_ERROR)
+                if tracing.ENABLED:
+                    event_start = tracing.now()
+        if usage:
+            callback("usage", openai_usage(usage))
+        callback("done", None)
+    except Exception as e:
+        callback("error", str(e))
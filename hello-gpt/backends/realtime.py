@@ -0,0 +1,384 @@
+# backends/realtime.py
+# Persistent WebSocket sessions ("backend": "realtime")
+#
+# Instead of one HTTP request per reply, keeps authenticated sessions with
+# the OpenAI Realtime API and the Gemini Live API (BidiGenerateContent)
+# open and sends each turn as a message over them. Both are JSON frames
+# over the vendored websockets package's sync client, the transport
+# google.genai.live uses; like the raw stream modes, the SDKs' session
+# wrappers and models are skipped. "model" must name a realtime / live
+# model.
+#
+# A session remembers its conversation, so it is only reused for a turn
+# that extends it: a document that still starts with the session's last
+# prompt followed by its reply sends just the text added after that. Any
+# other turn opens a fresh session. Broken connections are reopened with
+# exponential backoff as long as no text of the turn was delivered yet.
+import json
+import time
+import threading
+
+from . import use_vendored, abort_on_cancel, cancelled
+from .stdlib import StreamStalled, get_timeouts
+from ..engine import CONFIG, provider_config
+from ..ledger import openai_realtime_usage, gemini_usage
+from .. import tracing
+
+use_vendored("google")
+
+try:
+    from websockets.sync.client import connect
+    from websockets.exceptions import ConnectionClosed, WebSocketException
+except ImportError:
+    connect = None
+
+AVAILABLE = connect is not None
+
+OPENAI_BASE_URL = "https://api.openai.com/v1/"
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/"
+GEMINI_LIVE_PATH = "ws/google.ai.generativelanguage.v1beta.GenerativeService.BidiGenerateContent"
+
+DEFAULT_REALTIME_CONFIG = {
+    "max_sessions": 4,     # idle sessions kept open
+    "idle_close": 300,     # seconds an idle session is kept
+    "retries": 3,          # reconnects per turn before giving up
+    "backoff": 0.5,        # first reconnect delay, doubled per attempt
+    "backoff_max": 8.0,
+}
+
+
+def realtime_config():
+    config = dict(DEFAULT_REALTIME_CONFIG)
+    config.update(CONFIG.get("realtime") or {})
+    return config
+
+def ws_url(base_url):
+    return "ws" + base_url.rstrip("/")[4:] if base_url.startswith("http") else base_url.rstrip("/")
+
+
+# -------------------------
+# Sessions
+# -------------------------
+def session_config(provider, options):
+    """
+    The session settings a latency profile can set. Sessions have no
+    thinking budget, reasoning effort or stop sequences, and predicted
+    outputs only exist in Chat Completions.
+    """
+    config = {}
+    if provider == "openai":
+        if options.get("temperature") is not None:
+            # The Realtime API only accepts 0.6 to 1.2
+            config["temperature"] = min(max(options["temperature"], 0.6), 1.2)
+        if options.get("max_output_tokens"):
+            config["max_response_output_tokens"] = options["max_output_tokens"]
+    else:
+        if options.get("temperature") is not None:
+            config["temperature"] = options["temperature"]
+        if options.get("max_output_tokens"):
+            config["maxOutputTokens"] = options["max_output_tokens"]
+    return config
+
+
+class TurnFailed(Exception):
+    """
+    An error the API reported for a turn (as opposed to a broken connection).
+    """
+
+
+class Session:
+    """
+    One open WebSocket and the conversation it has seen.
+    """
+    def __init__(self, provider, api_key, model, options=None):
+        options = options or {}
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.system = options.get("system")
+        self.config = session_config(provider, options)
+        if provider == "openai":
+            base_url = provider_config(provider, options).get("base_url", OPENAI_BASE_URL)
+            self.url = f"{ws_url(base_url)}/realtime?model={model}"
+        else:
+            base_url = provider_config(provider, options).get("base_url", GEMINI_BASE_URL)
+            self.url = f"{ws_url(base_url)}/{GEMINI_LIVE_PATH}?key={api_key}"
+        self.key = (provider, api_key, model, self.url, self.system, tuple(sorted(self.config.items())))
+        self.ws = None
+        self.prompt = None
+        self.reply = None
+        self.usage = None
+        self.last_used = time.monotonic()
+
+    def follow_up(self, message):
+        """
+        The part of message after this session's prompt and reply, or None
+        if message does not extend the conversation.
+        """
+        if self.prompt is None or not message.startswith(self.prompt):
+            return None
+        rest = message[len(self.prompt):].lstrip()
+        reply = self.reply.lstrip()
+        if not rest.startswith(reply):
+            return None
+        added = rest[len(reply):]
+        return added if added.strip() else None
+
+    def open(self, trace=None):
+        timeouts = get_timeouts()
+        headers = None
+        if self.provider == "openai":
+            headers = {"Authorization": f"Bearer {self.api_key}", "OpenAI-Beta": "realtime=v1"}
+        self.ws = connect(self.url, additional_headers=headers, open_timeout=timeouts["connect"],
+                          max_size=None, compression=None)
+        if trace:
+            trace.mark("connect_done")
+
+        if self.provider == "openai":
+            session = dict(self.config, modalities=["text"])
+            if self.system:
+                session["instructions"] = self.system
+            self.send({"type": "session.update", "session": session})
+            self.handshake(lambda event: event.get("type") == "session.updated", timeouts["first_byte"], trace)
+        else:
+            setup = {"model": f"models/{self.model}",
+                     "generationConfig": dict(self.config, responseModalities=["TEXT"])}
+            if self.system:
+                setup["systemInstruction"] = {"parts": [{"text": self.system}]}
+            self.send({"setup": setup})
+            self.handshake(lambda event: "setupComplete" in event, timeouts["first_byte"], trace)
+
+    def handshake(self, ready, timeout, trace=None):
+        """
+        Reads events until ready(event). An error event, or the server
+        closing the connection with a reason (how Gemini rejects an unknown
+        model), raises TurnFailed with the server's message rather than
+        waiting out the timeout.
+        """
+        name = "OpenAI" if self.provider == "openai" else "Gemini"
+        while True:
+            try:
+                event = self.receive(timeout, trace)
+            except ConnectionClosed as e:
+                if e.rcvd and e.rcvd.reason:
+                    raise TurnFailed(f"{name} realtime session rejected: {e.rcvd.reason}")
+                raise
+            if ready(event):
+                return
+            if "error" in event:
+                error = event["error"]
+                message = error.get("message") if isinstance(error, dict) else error
+                raise TurnFailed(f"{name} realtime session rejected: {message or error}")
+
+    def send(self, event, trace=None):
+        data = json.dumps(event)
+        if trace:
+            trace.bytes_out += len(data)
+        self.ws.send(data)
+
+    def receive(self, timeout, trace=None):
+        data = self.ws.recv(timeout)
+        if trace:
+            trace.bytes_in += len(data)
+        return json.loads(data)
+
+    def turn(self, text, emit, trace=None):
+        """
+        Sends one user turn and passes ("text", str) and ("usage", dict)
+        events to emit. Returns the reply text.
+        """
+        if self.provider == "openai":
+            self.send({"type": "conversation.item.create",
+                       "item": {"type": "message", "role": "user",
+                                "content": [{"type": "input_text", "text": text}]}}, trace)
+            self.send({"type": "response.create"}, trace)
+        else:
+            self.send({"clientContent": {"turns": [{"role": "user", "parts": [{"text": text}]}],
+                                         "turnComplete": True}}, trace)
+        if trace:
+            trace.mark("request_sent")
+
+        timeouts = get_timeouts()
+        phase = "first_byte"
+        parts = []
+        while True:
+            try:
+                event = self.receive(timeouts[phase], trace)
+            except TimeoutError:
+                raise StreamStalled(self.provider.capitalize(), phase, timeouts[phase], timeouts[phase],
+                                    sum(map(len, parts)))
+            if phase == "first_byte":
+                phase = "idle"
+                if trace:
+                    trace.mark("first_byte")
+                if tracing.ENABLED:
+                    tracing.instant("first_byte")
+            if trace:
+                trace.chunks += 1
+            done = (self._openai_event if self.provider == "openai" else self._gemini_event)(event, parts, emit)
+            if done:
+                return "".join(parts)
+
+    def _openai_event(self, event, parts, emit):
+        kind = event.get("type")
+        if kind in ("response.text.delta", "response.output_text.delta"):
+            parts.append(event["delta"])
+            emit("text", event["delta"])
+        elif kind == "response.done":
+            response = event.get("response") or {}
+            if response.get("usage"):
+                emit("usage", openai_realtime_usage(response["usage"]))
+            if response.get("status") not in (None, "completed"):
+                details = response.get("status_details") or {}
+                reason = (details.get("error") or {}).get("message") or details.get("reason")
+                raise TurnFailed(f"OpenAI realtime response {response['status']}: {reason}")
+            return True
+        elif kind == "error":
+            raise TurnFailed(f"OpenAI realtime error: {(event.get('error') or {}).get('message')}")
+        return False
+
+    def _gemini_event(self, event, parts, emit):
+        content = event.get("serverContent") or {}
+        for part in (content.get("modelTurn") or {}).get("parts") or []:
+            if part.get("text"):
+                parts.append(part["text"])
+                emit("text", part["text"])
+        if event.get("usageMetadata"):
+            self.usage = event["usageMetadata"]
+        if content.get("turnComplete"):
+            usage, self.usage = self.usage, None
+            if usage:
+                emit("usage", gemini_usage(usage))
+            return True
+        return False
+
+    def close(self):
+        if self.ws:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+            self.ws = None
+
+
+# -------------------------
+# Session pool
+# -------------------------
+IDLE = []
+_pool_lock = threading.Lock()
+
+
+def checkout(provider, api_key, model, message, options=None):
+    """
+    Returns (session, text to send): an idle session this message extends
+    with just the added text, else a new session with the whole message.
+    """
+    settings = realtime_config()
+    fresh = Session(provider, api_key, model, options)
+    now = time.monotonic()
+    stale = []
+    found = None
+    with _pool_lock:
+        for session in list(IDLE):
+            if now - session.last_used > settings["idle_close"]:
+                IDLE.remove(session)
+                stale.append(session)
+            elif found is None and session.key == fresh.key:
+                added = session.follow_up(message)
+                if added is not None:
+                    IDLE.remove(session)
+                    found = (session, added)
+    for session in stale:
+        session.close()
+    return found or (fresh, message)
+
+def checkin(session, message, reply):
+    session.prompt = message
+    session.reply = reply
+    session.last_used = time.monotonic()
+    limit = realtime_config()["max_sessions"]
+    with _pool_lock:
+        IDLE.append(session)
+        extra = IDLE[:max(0, len(IDLE) - limit)]
+        del IDLE[:len(extra)]
+    for old in extra:
+        old.close()
+
+def close_sessions():
+    with _pool_lock:
+        sessions = list(IDLE)
+        IDLE.clear()
+    for session in sessions:
+        session.close()
+
+
+# -------------------------
+# Stream functions
+# -------------------------
+def realtime_stream(provider, api_key, model, message, callback, trace=None, options=None):
+    name = "OpenAI" if provider == "openai" else "Gemini"
+    if not api_key:
+        callback("error", f"{name} API key is missing")
+        return
+
+    settings = realtime_config()
+    received = [0]
+
+    def emit(event_type, data):
+        if event_type == "text":
+            received[0] += len(data)
+        callback(event_type, data)
+
+    for attempt in range(settings["retries"] + 1):
+        session, text = checkout(provider, api_key, model, message, options)
+        reused = session.ws is not None
+        try:
+            with tracing.span("realtime.turn", reused=reused, attempt=attempt):
+                if not reused:
+                    session.open(trace)
+                # A cancelled turn would leave the session mid-response
+                with abort_on_cancel(options, session.ws.close):
+                    reply = session.turn(text, emit, trace)
+        except TurnFailed as e:
+            # The response may still be streaming; don't reuse the socket
+            session.close()
+            callback("error", str(e))
+            return
+        except StreamStalled as e:
+            session.close()
+            callback("stall", e)
+            return
+        except (OSError, WebSocketException) as e:
+            session.close()
+            if cancelled(options):
+                return
+            # A retry can only replay the turn if nothing reached the document
+            if received[0] or attempt == settings["retries"]:
+                if isinstance(e, ConnectionClosed) and e.rcvd and e.rcvd.reason:
+                    callback("error", f"{name} realtime connection closed: {e.rcvd.reason}")
+                else:
+                    callback("error", f"{name} realtime connection error: {e}")
+                return
+            # An idle session the server has since closed is retried at once
+            if not reused:
+                time.sleep(min(settings["backoff"] * 2 ** attempt, settings["backoff_max"]))
+            continue
+        except Exception as e:
+            session.close()
+            callback("error", f"An unexpected {name} realtime error occurred: {e}")
+            return
+        checkin(session, message, reply)
+        callback("done", None)
+        return
+
+def openai_realtime_stream(api_key, model, message, callback, trace=None, options=None):
+    """
+    Streams a reply over an OpenAI Realtime session (text only).
+    """
+    realtime_stream("openai", api_key, model, message, callback, trace, options)
+
+def gemini_live_stream(api_key, model, message, callback, trace=None, options=None):
+    """
+    Streams a reply over a Gemini Live session (text only).
+    """
+    realtime_stream("gemini", api_key, model, message, callback, trace, options)
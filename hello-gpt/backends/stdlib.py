@@ -0,0 +1,463 @@
+# backends/stdlib.py
+# Default backend: urllib/http.client only, for both providers
+import json
+import time
+import socket
+import threading
+import http.client
+import urllib.request
+import urllib.error
+
+from . import openai_request, gemini_request, OPENAI_LENGTH_ERROR
+from ..engine import DEFAULT_CONFIG, CONFIG, DECODER, provider_config
+from ..ledger import openai_usage, gemini_usage
+from .. import tracing, recorder
+
+# Either can be overridden with a "base_url" in the provider's config section
+OPENAI_BASE_URL = "https://api.openai.com/v1/"
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/"
+
+# -------------------------
+# Stream timeouts
+# -------------------------
+class StreamStalled(Exception):
+    """
+    Raised when a stream stops delivering data within its time budget.
+    phase is one of "connect", "first_byte" or "idle"; received is the
+    number of text characters already delivered, so a retry can resume.
+    """
+    def __init__(self, provider, phase, waited, budget, received=0):
+        self.provider = provider
+        self.phase = phase
+        self.waited = waited
+        self.budget = budget
+        self.received = received
+        super().__init__(
+            f"{provider} stream stalled: no data for {waited:.1f}s "
+            f"({phase} budget {budget}s)"
+        )
+
+def get_timeouts():
+    timeouts = dict(DEFAULT_CONFIG["timeouts"])
+    timeouts.update(CONFIG.get("timeouts", {}))
+    return timeouts
+
+class StreamWatchdog:
+    """
+    Watches a streaming response from a side thread and shuts its socket
+    down when no byte arrives within the first-byte or idle budget, which
+    unblocks a read that would otherwise hang forever. Cancelling the
+    request's CancelToken shuts it down the same way.
+    """
+    def __init__(self, response, first_byte_timeout, idle_timeout, cancel=None):
+        self.response = response
+        self.cancel = cancel
+        self.first_byte_timeout = first_byte_timeout
+        self.idle_timeout = idle_timeout
+        self.last_activity = time.monotonic()
+        self.got_first_byte = False
+        self.stalled = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        if self.cancel is not None:
+            self.cancel.hook(self._abort)
+        return self
+
+    def feed(self):
+        self.last_activity = time.monotonic()
+        self.got_first_byte = True
+
+    def stop(self):
+        self._stopped.set()
+        if self.cancel is not None:
+            self.cancel.unhook(self._abort)
+
+    def check(self, provider, received=0):
+        # Raise if the watchdog aborted the read
+        if self.stalled:
+            phase, waited, budget = self.stalled
+            raise StreamStalled(provider, phase, waited, budget, received)
+
+    def _watch(self):
+        while not self._stopped.is_set():
+            if self.got_first_byte:
+                phase, budget = "idle", self.idle_timeout
+            else:
+                phase, budget = "first_byte", self.first_byte_timeout
+            waited = time.monotonic() - self.last_activity
+            if waited >= budget:
+                self.stalled = (phase, waited, budget)
+                self._abort()
+                return
+            # Wake at least once per idle budget so the switch from the
+            # first-byte phase to the idle phase is noticed in time
+            self._stopped.wait(min(budget - waited, self.idle_timeout))
+
+    def _abort(self):
+        sock = getattr(getattr(getattr(self.response, "fp", None), "raw", None), "_sock", None)
+        try:
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+def open_stream(req, trace=None, cancel=None, provider=None):
+    """
+    Opens a streaming request with a connect timeout and starts a watchdog
+    enforcing the first-byte and idle timeouts on the body (and cancel, a
+    CancelToken, if given). While recording (recorder.py), the stream and
+    HTTP errors are recorded under provider.
+    """
+    timeouts = get_timeouts()
+    with tracing.span("open_stream", url=req.full_url.split("?")[0]):
+        try:
+            if trace:
+                trace.bytes_out += len(req.data or b"")
+                opener = urllib.request.build_opener(TimedHTTPHandler(trace), TimedHTTPSHandler(trace))
+                response = opener.open(req, timeout=timeouts["connect"])
+            else:
+                response = urllib.request.urlopen(req, timeout=timeouts["connect"])
+        except urllib.error.HTTPError as e:
+            if not recorder.ENABLED:
+                raise
+            raise recorder.record_http_error(provider, req, e) from None
+    if recorder.ENABLED:
+        recorder.record_response(provider, req, response)
+
+    # The watchdog owns read timing from here; keep the socket timeout only
+    # as a backstop in case the shutdown does not wake the read.
+    sock = getattr(getattr(response.fp, "raw", None), "_sock", None)
+    if sock is not None:
+        sock.settimeout(max(timeouts["first_byte"], timeouts["idle"]) + timeouts["connect"])
+
+    watchdog = StreamWatchdog(response, timeouts["first_byte"], timeouts["idle"], cancel)
+    return response, watchdog.start()
+
+def as_stall(provider, error, response, watchdog, received=0):
+    """
+    Turns a watchdog abort or a socket timeout into a StreamStalled,
+    or returns None if the error is unrelated.
+    """
+    if watchdog and watchdog.stalled:
+        return StreamStalled(provider, *watchdog.stalled, received)
+
+    reason = error.reason if isinstance(error, urllib.error.URLError) else error
+    if not isinstance(reason, (socket.timeout, TimeoutError)):
+        return None
+
+    timeouts = get_timeouts()
+    if response is None:
+        return StreamStalled(provider, "connect", timeouts["connect"], timeouts["connect"], received)
+    phase = "idle" if watchdog and watchdog.got_first_byte else "first_byte"
+    return StreamStalled(provider, phase, timeouts[phase], timeouts[phase], received)
+
+# -------------------------
+# Connection timing
+# -------------------------
+def timed_connection(base, trace):
+    """
+    Subclasses an http.client connection so it marks connect, TLS and
+    request-sent times on trace.
+    """
+    class TimedConnection(base):
+        def connect(self):
+            create = self._create_connection
+
+            def timed_create(*args, **kwargs):
+                sock = create(*args, **kwargs)
+                trace.mark("connect_done")
+                return sock
+
+            self._create_connection = timed_create
+            super().connect()
+            if isinstance(self, http.client.HTTPSConnection):
+                trace.mark("tls_done")
+
+        def getresponse(self):
+            trace.mark("request_sent")
+            return super().getresponse()
+
+    return TimedConnection
+
+class TimedHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, trace):
+        super().__init__()
+        self.trace = trace
+
+    def http_open(self, req):
+        return self.do_open(timed_connection(http.client.HTTPConnection, self.trace), req)
+
+class TimedHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, trace):
+        super().__init__()
+        self.trace = trace
+
+    def https_open(self, req):
+        return self.do_open(timed_connection(http.client.HTTPSConnection, self.trace), req,
+                            context=self._context)
+
+# -------------------------
+# API Functions using urllib
+# -------------------------
+def openai_chat_stream(api_key, model, message, callback, trace=None, options=None):
+    """
+    Calls the OpenAI Chat Completions API with streaming output.
+    """
+    if not api_key:
+        callback("error", "OpenAI API key is missing")
+        return
+
+    req = urllib.request.Request(
+        f"{provider_config('openai', options).get('base_url', OPENAI_BASE_URL).rstrip('/')}/chat/completions",
+        data=json.dumps(dict(openai_request(model, message, options), stream=True)).encode('utf-8'),
+        headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+    )
+    
+    response = watchdog = None
+    received = 0
+    truncated = False
+    try:
+        response, watchdog = open_stream(req, trace, (options or {}).get("cancel"), "openai")
+        buffer = b""
+        line_start = 0.0
+        
+        # Read the stream chunk by chunk and parse NDJSON (data: ...)
+        while True:
+            chunk = response.read(1)
+            if not chunk:
+                break
+            if not watchdog.got_first_byte:
+                if trace:
+                    trace.mark("first_byte")
+                if tracing.ENABLED:
+                    tracing.instant("first_byte")
+            watchdog.feed()
+            buffer += chunk
+            if buffer.endswith(b'\n'):
+                if trace:
+                    trace.bytes_in += len(buffer)
+                line = buffer.strip()
+                buffer = b""
+                if line.startswith(b'data: ') and line != b'data: [DONE]':
+                    if trace:
+                        trace.chunks += 1
+                    try:
+                        if tracing.ENABLED:
+                            line_start = tracing.complete("sse.read", line_start) if line_start else tracing.now()
+                        payload = line[6:]  # Strip 'data: ' prefix
+
+                        # Plain text deltas skip the full parse
+                        content = DECODER.openai_text(payload)
+                        if content is None:
+                            data = DECODER.loads(payload)
+
+                            # The last chunk carries usage and no choices
+                            if data.get('usage'):
+                                callback("usage", openai_usage(data['usage']))
+                            choice = (data.get('choices') or [{}])[0]
+                            content = choice.get('delta', {}).get('content', '')
+                            truncated = truncated or choice.get('finish_reason') == 'length'
+                        if tracing.ENABLED:
+                            line_start = tracing.complete("sse.parse", line_start)
+
+                        if content:
+                            received += len(content)
+                            callback("text", content)
+                        if tracing.ENABLED:
+                            line_start = tracing.complete("sse.dispatch", line_start)
+                    except:
+                        pass
+        watchdog.check("OpenAI", received)
+        if truncated:
+            callback("error", OPENAI_LENGTH_ERROR)
+        callback("done", None)
+
+    except StreamStalled as e:
+        callback("stall", e)
+    except urllib.error.HTTPError as e:
+        error_msg = f"OpenAI HTTP Error: {e.code} - {e.reason}"
+        try:
+            error_body = e.read().decode()
+            error_msg += f"\nResponse: {error_body}"
+        except:
+            pass
+        callback("error", error_msg)
+    except Exception as e:
+        stall = as_stall("OpenAI", e, response, watchdog, received)
+        if stall:
+            callback("stall", stall)
+        elif isinstance(e, urllib.error.URLError):
+            callback("error", f"OpenAI URL Error: {e.reason}")
+        else:
+            callback("error", f"An unexpected OpenAI error occurred: {e}")
+    finally:
+        if watchdog:
+            watchdog.stop()
+        if response:
+            response.close()
+
+def gemini_chat_stream(api_key, model, message, callback, trace=None, options=None):
+    """
+    Calls the Gemini API with streaming using the correct endpoint and format.
+    """
+    if not api_key:
+        callback("error", "Gemini API key is missing")
+        return
+
+    response = watchdog = None
+    received = 0
+    usage = usage_payload = None
+    try:
+        # Use the correct streaming endpoint
+        base_url = provider_config("gemini", options).get("base_url", GEMINI_BASE_URL).rstrip("/")
+        url = f"{base_url}/v1beta/models/{model}:streamGenerateContent?alt=sse&key={api_key}"
+        
+        req = urllib.request.Request(
+            url,
+            data=json.dumps(gemini_request(model, message, options)).encode('utf-8'),
+            headers={
+                "Content-Type": "application/json"
+            }
+        )
+        
+        response, watchdog = open_stream(req, trace, (options or {}).get("cancel"), "gemini")
+        buffer = b""
+        line_start = 0.0
+        
+        # Read the Server-Sent Events (SSE) stream
+        while True:
+            chunk = response.read(1)
+            if not chunk:
+                break
+            if not watchdog.got_first_byte:
+                if trace:
+                    trace.mark("first_byte")
+                if tracing.ENABLED:
+                    tracing.instant("first_byte")
+            watchdog.feed()
+            buffer += chunk
+            
+            # Process complete lines
+            if buffer.endswith(b'\n'):
+                if trace:
+                    trace.bytes_in += len(buffer)
+                line = buffer.strip()
+                buffer = b""
+                
+                # Skip empty lines and event markers
+                if not line or line.startswith(b':'):
+                    continue
+                    
+                # Process data lines
+                if line.startswith(b'data: '):
+                    data_str = line[6:]  # Remove 'data: ' prefix
+                    if data_str == b'[DONE]':
+                        break
+                    if trace:
+                        trace.chunks += 1
+                        
+                    try:
+                        if tracing.ENABLED:
+                            line_start = tracing.complete("sse.read", line_start) if line_start else tracing.now()
+
+                        # Plain text chunks skip the full parse; their
+                        # usageMetadata is only parsed if it is the last one
+                        text = DECODER.gemini_text(data_str)
+                        if text is not None:
+                            if b'"usageMetadata"' in data_str:
+                                usage_payload = data_str
+                            if tracing.ENABLED:
+                                line_start = tracing.complete("sse.parse", line_start)
+                            if text:
+                                received += len(text)
+                                callback("text", text)
+                            if tracing.ENABLED:
+                                line_start = tracing.complete("sse.dispatch", line_start)
+                            continue
+
+                        data = DECODER.loads(data_str)
+                        if tracing.ENABLED:
+                            line_start = tracing.complete("sse.parse", line_start)
+
+                        # usageMetadata is cumulative; keep the latest
+                        if 'usageMetadata' in data:
+                            usage = data['usageMetadata']
+                            usage_payload = None
+                        
+                        # Extract text from Gemini response
+                        if 'candidates' in data and data['candidates']:
+                            candidate = data['candidates'][0]
+                            if 'content' in candidate and 'parts' in candidate['content']:
+                                for part in candidate['content']['parts']:
+                                    if 'text' in part:
+                                        received += len(part['text'])
+                                        callback("text", part['text'])
+                            
+                            # Check for errors or blocks
+                            finish_reason = candidate.get('finishReason')
+                            if finish_reason and finish_reason != 'STOP':
+                                if finish_reason == 'SAFETY':
+                                    callback("error", "Gemini: Response blocked by safety filters")
+                                elif finish_reason == 'OTHER':
+                                    callback("error", "Gemini: Response terminated unexpectedly")
+                                elif finish_reason == 'MAX_TOKENS':
+                                    callback("error", "Gemini: Response exceeded maximum token limit")
+                            
+                            # Check safety ratings
+                            safety_ratings = candidate.get('safetyRatings', [])
+                            blocked = False
+                            for rating in safety_ratings:
+                                if rating.get('probability') in ['HIGH', 'MEDIUM']:
+                                    blocked = True
+                                    break
+                            if blocked:
+                                callback("error", "Gemini: Response blocked due to safety concerns")
+                        if tracing.ENABLED:
+                            line_start = tracing.complete("sse.dispatch", line_start)
+                                
+                    except ValueError:
+                        # Skip invalid JSON lines (json and jiter both raise ValueError)
+                        continue
+                    except Exception as e:
+                        callback("error", f"Gemini parsing error: {e}")
+        
+        watchdog.check("Gemini", received)
+        if usage_payload:
+            usage = DECODER.loads(usage_payload).get('usageMetadata')
+        if usage:
+            callback("usage", gemini_usage(usage))
+        callback("done", None)
+
+    except StreamStalled as e:
+        callback("stall", e)
+    except urllib.error.HTTPError as e:
+        error_msg = f"Gemini HTTP Error: {e.code} - {e.reason}"
+        try:
+            error_body = e.read().decode()
+            error_data = json.loads(error_body)
+            if 'error' in error_data:
+                error_msg += f"\nDetails: {error_data['error'].get('message', 'Unknown error')}"
+            else:
+                error_msg += f"\nResponse: {error_body}"
+        except:
+            pass
+        callback("error", error_msg)
+    except Exception as e:
+        stall = as_stall("Gemini", e, response, watchdog, received)
+        if stall:
+            callback("stall", stall)
+        elif isinstance(e, urllib.error.URLError):
+            callback("error", f"Gemini URL Error: {e.reason}")
+        else:
+            callback("error", f"An unexpected Gemini error occurred: {e}")
+    finally:
+        if watchdog:
+            watchdog.stop()
+        if response:
+            response.close()
@@ -0,0 +1,247 @@
+# batch.py
+# Alt+B batch mode: one instruction over every open document through the
+# OpenAI or Gemini batch API, polled in the background until it finishes.
+#
+# tools/fake_batch_server.py emulates the OpenAI Files and Batches
+# endpoints and tools/check_batch.py runs this module against it; the
+# Gemini path (genai files/batches) is only exercised against the real API.
+import os
+import json
+import time
+import threading
+
+# None when the vendored SDK is missing (see backends/openai_sdk.py)
+from .backends.openai_sdk import openai
+
+# -------------------------
+# Batch job settings
+# -------------------------
+OPENAI_FAILED = ("failed", "expired", "cancelled")
+GEMINI_SUCCEEDED = "JOB_STATE_SUCCEEDED"
+GEMINI_FAILED = ("JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED")
+
+DEFAULT_BATCH_CONFIG = {"poll_initial": 30, "poll_max": 600}
+
+
+# -------------------------
+# JSONL input
+# -------------------------
+def build_prompt(instruction, text):
+    return f"{instruction}\n\n{text}"
+
+def write_jsonl(path, provider, model, prompts):
+    """
+    Writes one batch request per prompt. prompts maps a request key to the
+    prompt text; the key comes back with each result.
+    """
+    with open(path, "w") as f:
+        for key, prompt in prompts.items():
+            if provider == "openai":
+                line = {
+                    "custom_id": key,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": model,
+                        "messages": [{"role": "user", "content": prompt}],
+                        "temperature": 0.7
+                    }
+                }
+            else:
+                line = {
+                    "key": key,
+                    "request": {
+                        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                        "generationConfig": {"temperature": 0.7}
+                    }
+                }
+            f.write(json.dumps(line) + "\n")
+
+def read_results(provider, data):
+    """
+    Parses a batch output JSONL into {key: text} and {key: error}.
+    """
+    results, errors = {}, {}
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if provider == "openai":
+            key = item.get("custom_id")
+            body = (item.get("response") or {}).get("body") or {}
+            choices = body.get("choices") or []
+            if item.get("error") or not choices:
+                errors[key] = str(item.get("error") or body.get("error") or "No output")
+                continue
+            results[key] = choices[0].get("message", {}).get("content") or ""
+        else:
+            key = item.get("key")
+            candidates = (item.get("response") or {}).get("candidates") or []
+            if item.get("error") or not candidates:
+                errors[key] = str(item.get("error") or "No output")
+                continue
+            parts = candidates[0].get("content", {}).get("parts", [])
+            results[key] = "".join(part.get("text", "") for part in parts)
+    return results, errors
+
+
+# -------------------------
+# Provider calls
+# -------------------------
+def submit_openai(jsonl_path):
+    with open(jsonl_path, "rb") as f:
+        uploaded = openai.files.create(file=f, purpose="batch")
+    batch = openai.batches.create(
+        input_file_id=uploaded.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return batch.id
+
+def check_openai(job_id):
+    """
+    Returns (done, output_text). Raises RuntimeError if the batch failed.
+    """
+    batch = openai.batches.retrieve(job_id)
+    if batch.status in OPENAI_FAILED:
+        raise RuntimeError(f"OpenAI batch {job_id} {batch.status}")
+    if batch.status != "completed":
+        return False, None
+
+    output = ""
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            output += openai.files.content(file_id).text + "\n"
+    return True, output
+
+def submit_gemini(client, model, jsonl_path):
+    uploaded = client.files.upload(file=jsonl_path, config={"mime_type": "jsonl"})
+    job = client.batches.create(model=model, src=uploaded.name)
+    return job.name
+
+def check_gemini(client, job_id):
+    """
+    Returns (done, output_text). Raises RuntimeError if the batch failed.
+    """
+    job = client.batches.get(name=job_id)
+    state = getattr(job.state, "value", job.state)
+    if state in GEMINI_FAILED:
+        raise RuntimeError(f"Gemini batch {job_id} {state}")
+    if state != GEMINI_SUCCEEDED:
+        return False, None
+    return True, client.files.download(file=job.dest.file_name).decode("utf-8")
+
+
+# -------------------------
+# Persistent job tracking
+# -------------------------
+class BatchRunner:
+    """
+    Submits batch jobs, polls them with exponential backoff on daemon
+    threads and hands results to on_result(job, key, text). Pending jobs
+    are kept in state_file so polling resumes after a gedit restart.
+    """
+    def __init__(self, state_file, on_result, on_error, config=None):
+        self.state_file = state_file
+        self.work_dir = os.path.splitext(state_file)[0]
+        self.on_result = on_result
+        self.on_error = on_error
+        self.config = dict(DEFAULT_BATCH_CONFIG)
+        self.config.update(config or {})
+        self.gemini_client = None
+        self.lock = threading.Lock()
+        self.polling = set()
+        self.jobs = self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save(self):
+        with self.lock:
+            try:
+                with open(self.state_file, "w") as f:
+                    json.dump(self.jobs, f, indent=2)
+            except Exception:
+                pass
+
+    def submit(self, provider, model, instruction, targets):
+        """
+        targets maps a request key to {"path", "name", "text"}. Runs on a
+        worker thread; returns the job id.
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        prompts = {key: build_prompt(instruction, t["text"]) for key, t in targets.items()}
+        jsonl_path = os.path.join(self.work_dir, f"input-{int(time.time() * 1000)}.jsonl")
+        write_jsonl(jsonl_path, provider, model, prompts)
+
+        if provider == "openai":
+            job_id = submit_openai(jsonl_path)
+        else:
+            job_id = submit_gemini(self.gemini_client, model, jsonl_path)
+
+        with self.lock:
+            self.jobs[job_id] = {
+                "provider": provider,
+                "model": model,
+                "instruction": instruction,
+                "submitted": time.time(),
+                "targets": {key: {"path": t.get("path"), "name": t.get("name")}
+                            for key, t in targets.items()}
+            }
+        self._save()
+        self.poll(job_id)
+        return job_id
+
+    def resume(self):
+        for job_id in list(self.jobs):
+            self.poll(job_id)
+
+    def poll(self, job_id):
+        with self.lock:
+            if job_id in self.polling:
+                return
+            self.polling.add(job_id)
+        threading.Thread(target=self._poll_loop, args=(job_id,), daemon=True).start()
+
+    def _poll_loop(self, job_id):
+        job = self.jobs[job_id]
+        delay = self.config["poll_initial"]
+        try:
+            while True:
+                try:
+                    if job["provider"] == "openai":
+                        done, output = check_openai(job_id)
+                    else:
+                        done, output = check_gemini(self.gemini_client, job_id)
+                except RuntimeError as e:
+                    self._finish(job_id)
+                    self.on_error(str(e))
+                    return
+                except Exception:
+                    # Network hiccup or missing client: keep the job and retry later
+                    done, output = False, None
+
+                if done:
+                    results, errors = read_results(job["provider"], output)
+                    for key, text in results.items():
+                        if key in job["targets"]:
+                            self.on_result(job, key, text)
+                    if errors:
+                        self.on_error(f"{len(errors)} batch request(s) failed in {job_id}")
+                    self._finish(job_id)
+                    return
+
+                time.sleep(delay)
+                delay = min(delay * 2, self.config["poll_max"])
+        finally:
+            with self.lock:
+                self.polling.discard(job_id)
+
+    def _finish(self, job_id):
+        with self.lock:
+            self.jobs.pop(job_id, None)
+        self._save()
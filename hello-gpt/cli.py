@@ -0,0 +1,159 @@
+# cli.py
+# Headless front end for the streaming engine:
+#
+#   python3 <plugin-dir> "Explain SSE"            one prompt from arguments
+#   python3 <plugin-dir> < prompt.txt             one prompt from stdin
+#   python3 <plugin-dir> -f a.txt b.txt --jobs 4  one prompt per file
+#   python3 <plugin-dir> --lines --jobs 8 < prompts.txt
+#   python3 <plugin-dir> --trace run.json "Explain SSE"   Chrome/Perfetto trace
+#   python3 <plugin-dir> --profile instant -f q*.txt      with a latency profile
+#   python3 <plugin-dir> --record captures/ "Explain SSE"  record the streams for replay
+#
+# Replies go to stdout, per-request latency and throughput stats to stderr.
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from .engine import CONFIG, current_model, chat_stream
+from .telemetry import RequestTrace, percentile
+from .latency import profiles_config, profile_options
+from . import tracing, recorder
+
+# -------------------------
+# Running requests
+# -------------------------
+def run_request(index, prompt, provider, model, live, profile=None):
+    """
+    Streams one prompt and returns its stats; the reply is written straight
+    to stdout when live, otherwise collected in stats["text"].
+    """
+    stats = {"index": index, "ttft": None, "chunks": 0, "chars": 0, "error": None}
+    parts = []
+    provider = (provider or CONFIG.get("active_provider", "openai")).lower()
+    trace = RequestTrace(provider, model or current_model(provider), profile)
+    trace.mark("worker_start")
+    start = trace.worker_start
+
+    def callback(event_type, data):
+        if event_type == "text":
+            if stats["ttft"] is None:
+                stats["ttft"] = time.monotonic() - start
+            stats["chunks"] += 1
+            stats["chars"] += len(data)
+            if live:
+                sys.stdout.write(data)
+                sys.stdout.flush()
+            else:
+                parts.append(data)
+        elif event_type in ("error", "stall"):
+            stats["error"] = str(data)
+
+    with tracing.span("request", index=index):
+        chat_stream(prompt, callback, provider, model, trace=trace, options=profile_options(profile))
+    stats["total"] = time.monotonic() - start
+    stats["connect"] = trace.span("worker_start", "connect_done")
+    stats["first_byte"] = trace.span("worker_start", "first_byte")
+    stats["bytes_in"] = trace.bytes_in
+    stats["text"] = "".join(parts)
+    return stats
+
+def seconds(value):
+    return f"{value:.3f}s" if value is not None else "-"
+
+def format_stats(stats):
+    if stats["error"]:
+        return f"[{stats['index']}] error after {stats['total']:.2f}s: {stats['error']}"
+    rate = stats["chars"] / stats["total"] if stats["total"] else 0.0
+    return (f"[{stats['index']}] connect {seconds(stats['connect'])} "
+            f"first byte {seconds(stats['first_byte'])} ttft {seconds(stats['ttft'])} "
+            f"total {stats['total']:.3f}s {stats['chunks']} chunks {stats['chars']} chars "
+            f"{stats['bytes_in']} bytes {rate:.0f} chars/s")
+
+def format_summary(results, wall):
+    ok = [s for s in results if not s["error"]]
+    ttfts = [s["ttft"] for s in ok if s["ttft"] is not None]
+    totals = [s["total"] for s in ok]
+    chars = sum(s["chars"] for s in ok)
+    return (f"{len(results)} requests, {len(results) - len(ok)} failed, wall {wall:.2f}s | "
+            f"ttft p50 {percentile(ttfts, 0.5):.3f}s p95 {percentile(ttfts, 0.95):.3f}s | "
+            f"total p50 {percentile(totals, 0.5):.3f}s p95 {percentile(totals, 0.95):.3f}s | "
+            f"{chars / wall if wall else 0.0:.0f} chars/s aggregate")
+
+
+# -------------------------
+# Entry point
+# -------------------------
+def read_prompts(args):
+    if args.files:
+        prompts = []
+        for path in args.files:
+            with open(path, "r") as f:
+                prompts.append(f.read())
+        return prompts
+    if args.prompt:
+        return [" ".join(args.prompt)]
+
+    data = sys.stdin.read()
+    if args.lines:
+        return [line for line in data.splitlines() if line.strip()]
+    return [data]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="hello-gpt", description="Stream GPT replies without gedit.")
+    parser.add_argument("prompt", nargs="*", help="prompt text (default: read stdin)")
+    parser.add_argument("-f", "--files", nargs="+", help="read one prompt per file")
+    parser.add_argument("--lines", action="store_true", help="treat each stdin line as a prompt")
+    parser.add_argument("-p", "--provider", help="openai or gemini (default: from config)")
+    parser.add_argument("-m", "--model", help="model name (default: from config)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="concurrent requests")
+    parser.add_argument("-q", "--quiet", action="store_true", help="print stats only")
+    parser.add_argument("--profile", help="latency profile: instant, balanced, deep, ... (default: none)")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome/Perfetto trace of the run")
+    parser.add_argument("--record", metavar="DIR", help="record each request and its stream to DIR (recorder.py)")
+    # Internal: run as the plugin's out-of-process worker (worker.py)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    # Internal: run as the shared per-user daemon (daemon.py)
+    parser.add_argument("--daemon", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--socket", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        from .worker import serve
+        return serve()
+    if args.daemon:
+        from .daemon import run_daemon
+        return run_daemon(args.socket)
+
+    if args.profile and args.profile not in profiles_config()["presets"]:
+        parser.error(f"unknown latency profile: {args.profile}")
+    if args.trace:
+        tracing.enable(path=args.trace)
+    if args.record:
+        recorder.enable(args.record)
+
+    prompts = read_prompts(args)
+    live = args.jobs == 1 and len(prompts) == 1 and not args.quiet
+    start = time.monotonic()
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(run_request, i + 1, prompt, args.provider, args.model, live, args.profile)
+                   for i, prompt in enumerate(prompts)]
+        for future in futures:
+            stats = future.result()
+            results.append(stats)
+            if not args.quiet and not live:
+                sys.stdout.write(stats["text"])
+            if not args.quiet:
+                sys.stdout.write("\n")
+                sys.stdout.flush()
+            print(format_stats(stats), file=sys.stderr)
+
+    if len(results) > 1:
+        print(format_summary(results, time.monotonic() - start), file=sys.stderr)
+    if args.trace:
+        tracing.disable()
+        path, count = tracing.export(args.trace)
+        print(f"Wrote {count} trace events to {path}", file=sys.stderr)
+    return 1 if any(s["error"] for s in results) else 0
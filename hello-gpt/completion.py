@@ -0,0 +1,103 @@
+# completion.py
+# Inline completion at the cursor ("completion": {"enabled": true}).
+#
+# When typing pauses for "delay" seconds, the plugin sends only a window
+# of text around the cursor (prefix and suffix) with a fill-in marker and
+# shows the reply as ghost text. Any key cancels the request in flight
+# through its CancelToken. Suggestions are cached by the end of their
+# prefix and the start of their suffix, so going back to an earlier
+# context, or typing the first characters of a suggestion, is answered
+# without a request.
+import threading
+from collections import OrderedDict
+
+from .engine import CONFIG
+from .latency import profile_options
+
+CURSOR = "<|cursor|>"
+
+DEFAULT_COMPLETION_CONFIG = {
+    "enabled": False,
+    # Seconds without typing before a suggestion is requested
+    "delay": 0.25,
+    "prefix_chars": 2000,
+    "suffix_chars": 500,
+    "max_tokens": 64,
+    # Latency profile (latency.py) the requests run with
+    "profile": "instant",
+    "cache_size": 256,
+    "instruction": f"You are an inline completion engine. The user sends text containing the marker {CURSOR}. "
+                   "Reply with only the text to insert at the marker, continuing naturally, and nothing "
+                   "that already follows it. No explanations, no code fences. Reply with nothing if no "
+                   "completion fits.",
+}
+
+# How much of the prefix and suffix a cache key keeps
+KEY_CHARS = 256
+
+
+def completion_config():
+    config = dict(DEFAULT_COMPLETION_CONFIG)
+    config.update(CONFIG.get("completion") or {})
+    return config
+
+def completion_prompt(prefix, suffix):
+    return f"{prefix}{CURSOR}{suffix}"
+
+def completion_options(settings):
+    """
+    Request options for a suggestion: the profile, capped at max_tokens.
+    """
+    options = profile_options(settings["profile"])
+    options["max_output_tokens"] = settings["max_tokens"]
+    options["system"] = settings["instruction"]
+    return options
+
+
+class SuggestionCache:
+    """
+    LRU of suggestions by (prefix, suffix). Safe to use from any thread.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        # Longest cached suggestion: how far back get() looks for one being typed
+        self.longest = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, prefix, suffix):
+        return prefix[-KEY_CHARS:], suffix[:KEY_CHARS]
+
+    def get(self, prefix, suffix):
+        """
+        The suggestion for this cursor context: a cached one, or the rest
+        of one whose first characters were typed since. None on a miss.
+        """
+        with self.lock:
+            for typed in range(min(self.longest, len(prefix) + 1)):
+                key = self.key(prefix[:len(prefix) - typed], suffix)
+                text = self.entries.get(key)
+                if text is not None and len(text) > typed and text.startswith(prefix[len(prefix) - typed:]):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return text[typed:]
+            self.misses += 1
+            return None
+
+    def put(self, prefix, suffix, text):
+        if not text or self.size <= 0:
+            return
+        with self.lock:
+            key = self.key(prefix, suffix)
+            self.entries[key] = text
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+            self.longest = max(self.longest, len(text))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.longest = 0
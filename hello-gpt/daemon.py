@@ -0,0 +1,197 @@
+# daemon.py
+# Optional per-user daemon ("daemon": {"enabled": true}) shared by every
+# gedit process of the user.
+#
+# python3 <plugin-dir> --daemon listens on a Unix socket and serves the
+# worker protocol (worker.py) to any number of connections. It holds the
+# one HelloGPTService for all of them: SDK clients and their connection
+# pools, the scheduler's concurrency caps and the usage ledger, whose new
+# entries it reports back as "ledger" events. The plugin starts it on
+# first use and runs requests in-process when it can't be reached.
+import os
+import time
+import fcntl
+import socket
+import tempfile
+import threading
+import subprocess
+import socketserver
+
+from .engine import PLUGIN_DIR, CONFIG
+from .worker import FrameClient, python_executable, serve, run_request
+
+DEFAULT_DAEMON_CONFIG = {
+    "enabled": False,
+    # Default: $XDG_RUNTIME_DIR/hello-gpt-<uid>.sock
+    "socket": None,
+    # Seconds without clients or requests before the daemon exits; 0 = never
+    "idle_exit": 600,
+}
+
+# How long the plugin waits for a daemon it started to listen
+START_TIMEOUT = 5.0
+
+
+def daemon_config(settings=None):
+    config = dict(DEFAULT_DAEMON_CONFIG)
+    config.update(settings or {})
+    return config
+
+def socket_path(settings=None):
+    path = daemon_config(settings)["socket"]
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"hello-gpt-{os.getuid()}.sock")
+
+
+# -------------------------
+# Server
+# -------------------------
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        self.service = service
+        self.clients = 0
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+        super().__init__(path, DaemonHandler)
+
+    def handle_request_line(self, request, write):
+        self.last_active = time.monotonic()
+        self.service.scheduler.submit(run_request, (request, write, self.service.ledger),
+                                      provider=request["provider"],
+                                      priority=request.get("priority") or "interactive")
+
+    def idle(self, idle_exit):
+        with self.lock:
+            if self.clients:
+                return False
+        return (self.service.scheduler.stats()["running"] == 0
+                and time.monotonic() - self.last_active >= idle_exit)
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.clients += 1
+        try:
+            serve(self.rfile, self.wfile, server.handle_request_line)
+        except OSError:
+            pass
+        finally:
+            with server.lock:
+                server.clients -= 1
+                server.last_active = time.monotonic()
+
+
+def run_daemon(path=None):
+    """
+    Serves until idle for "idle_exit" seconds. Returns at once if another
+    daemon already holds the socket's lock file.
+    """
+    from .service import get_service, shutdown_service
+
+    settings = daemon_config(CONFIG.get("daemon"))
+    path = path or socket_path(settings)
+    # The socket hands out the API keys' quota: user-only permissions
+    os.umask(0o077)
+    lock_file = open(path + ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return 0
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = DaemonServer(path, get_service())
+    idle_exit = settings["idle_exit"]
+    if idle_exit:
+        def watch_idle():
+            while True:
+                time.sleep(min(idle_exit, 5))
+                if server.idle(idle_exit):
+                    server.shutdown()
+                    return
+        threading.Thread(target=watch_idle, daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(path)
+        shutdown_service()
+    return 0
+
+
+# -------------------------
+# Client
+# -------------------------
+class DaemonClient(FrameClient):
+    """
+    A connection to the shared daemon. The daemon records usage, so the
+    plugin only shows the "ledger" events it sends back.
+    """
+    records_usage = True
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.sock = None
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(self.path)
+        except OSError:
+            self.sock.close()
+            raise
+        return self
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def stop(self):
+        if self.sock:
+            # Wakes a reader blocked on the socket, which close() alone does not
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+
+def start_daemon(path):
+    python = python_executable()
+    if not python:
+        raise OSError("No python3 found for the GPT daemon")
+    subprocess.Popen([python, PLUGIN_DIR, "--daemon", "--socket", path],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     close_fds=True, start_new_session=True)
+
+def connect_daemon(settings=None):
+    """
+    Connects to the daemon, starting it if nothing listens yet. Returns
+    None if it can't be reached within START_TIMEOUT.
+    """
+    path = socket_path(settings)
+    try:
+        return DaemonClient(path).connect()
+    except OSError:
+        pass
+    try:
+        start_daemon(path)
+    except OSError:
+        return None
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            return DaemonClient(path).connect()
+        except OSError:
+            continue
+    return None
@@ -0,0 +1,125 @@
+# decoder.py
+# SSE chunk decoders for the streaming loops.
+#
+# Nearly every chunk of a reply is a plain text delta, and the plugin only
+# needs that one string out of it. The fast path finds the string by its
+# key, checks the chunk's shape around it and decodes just that literal with
+# json's C string scanner, so no dict tree is built. Any chunk that carries
+# something else (finish reason, usage, tool calls, safety ratings, several
+# choices or parts) returns None and the caller falls back to a full parse
+# with loads(), which uses jiter when it is importable (it ships with the
+# OpenAI SDK) and json otherwise.
+import json
+from json.decoder import scanstring
+
+try:
+    import jiter
+except ImportError:
+    jiter = None
+
+# Compact (OpenAI) and spaced (Gemini, Python's json.dumps) spellings of:
+# the content key, what must come right before it (so it is the delta's
+# first key: no role, refusal or tool calls ahead of it), the still-streaming
+# finish reason, and a usage object
+OPENAI_FORMATS = (
+    ('"content":"', '"delta":{', '"finish_reason":null', '"usage":{'),
+    ('"content": "', '"delta": {', '"finish_reason": null', '"usage": {'),
+)
+# The text key and the opening of the parts list it must be first in
+GEMINI_FORMATS = (
+    ('"text":"', '"parts":[{'),
+    ('"text": "', '"parts": [{'),
+)
+# Gemini chunks with any of these need the full candidate handling
+GEMINI_SLOW = ('"finishReason"', '"safetyRatings"')
+
+
+class ChunkDecoder:
+    """
+    backend is "jiter", "json" or "auto" (jiter when available). With
+    fast_path off every chunk takes the full parse, which is what the
+    benchmark compares against.
+    """
+    def __init__(self, backend="auto", fast_path=True):
+        if backend == "auto":
+            backend = "jiter" if jiter else "json"
+        if backend == "jiter" and not jiter:
+            raise ValueError("jiter is not importable")
+        self.backend = backend
+        self.fast_path = fast_path
+        if backend == "jiter":
+            self.loads = jiter.from_json
+        else:
+            # json.loads on bytes sniffs the encoding first; str is quicker
+            decode = json.JSONDecoder().decode
+            self.loads = lambda payload: decode(payload.decode("utf-8"))
+
+    def openai_text(self, payload):
+        """
+        Returns the content delta of a single-choice OpenAI chunk that has
+        no finish reason and no usage, or None when the chunk needs loads().
+        """
+        if not self.fast_path:
+            return None
+        text = payload.decode("utf-8")
+        for key, opener, finish, usage in OPENAI_FORMATS:
+            start = text.find(key)
+            if start >= 0:
+                break
+        else:
+            return None
+        if not text.endswith(opener, 0, start):
+            return None
+        try:
+            content, end = scanstring(text, start + len(key))
+        except ValueError:
+            return None
+        # "}" right after the literal: content is the delta's only key
+        if text[end:end + 1] != "}":
+            return None
+        if text.find(key, end) >= 0 or text.find(finish, end) < 0 or usage in text:
+            return None
+        return content
+
+    def gemini_text(self, payload):
+        """
+        Returns the text of a chunk whose only candidate has a single text
+        part and no finish reason or safety ratings, or None when the chunk
+        needs loads(). Its usageMetadata, if any, is left for the caller to
+        parse lazily.
+        """
+        if not self.fast_path:
+            return None
+        text = payload.decode("utf-8")
+        for key, opener in GEMINI_FORMATS:
+            start = text.find(key)
+            if start >= 0:
+                break
+        else:
+            return None
+        if not text.endswith(opener, 0, start):
+            return None
+        try:
+            part, end = scanstring(text, start + len(key))
+        except ValueError:
+            return None
+        # "}]" right after the literal: no other keys (thought,
+        # thoughtSignature) in the part and no further parts
+        if text[end:end + 2] != "}]" or text.find(key, end) >= 0:
+            return None
+        for marker in GEMINI_SLOW:
+            if marker in text:
+                return None
+        return part
+
+
+def get_decoder(settings=None):
+    """
+    Builds a decoder from the "decoder" config section
+    ({"backend": "auto"|"jiter"|"json", "fast_path": true}).
+    """
+    settings = settings or {}
+    try:
+        return ChunkDecoder(settings.get("backend", "auto"), settings.get("fast_path", True))
+    except ValueError:
+        return ChunkDecoder("json", settings.get("fast_path", True))
@@ -0,0 +1,127 @@
+# engine.py
+# GTK-free streaming engine shared by the gedit plugin and the command line
+import os
+import json
+
+from .decoder import get_decoder
+from . import backends, tracing, recorder
+
+# -------------------------
+# Plugin paths
+# -------------------------
+PLUGIN_DIR = os.path.dirname(__file__)
+ROOT_DIR = PLUGIN_DIR
+
+# -------------------------
+# Read configuration
+# -------------------------
+CONFIG_FILE = os.path.join(os.path.dirname(PLUGIN_DIR), "hello-gpt-config.json")
+DEFAULT_CONFIG = {
+    "active_provider": "openai",
+    "openai": {"api_key": "", "model": "gpt-4o-mini", "backend": "stdlib", "stream_mode": "raw"},
+    "gemini": {"api_key": "", "model": "gemini-2.5-flash", "backend": "stdlib", "stream_mode": "raw"},
+    "timeouts": {"connect": 10, "first_byte": 60, "idle": 30},
+    "batch": {"poll_initial": 30, "poll_max": 600},
+    "rewrite": {
+        "instruction": "Rewrite the text the user sends: fix mistakes and improve it where needed, keeping "
+                       "everything else exactly as it is. Reply with the rewritten text only, without code "
+                       "fences or comments.",
+        "prediction": True
+    },
+    "completion": {"enabled": False, "delay": 0.25, "prefix_chars": 2000, "suffix_chars": 500, "max_tokens": 64,
+                   "profile": "instant", "cache_size": 256},
+    "retrieval": {"enabled": False, "provider": None, "dimensions": 256, "top_k": 6, "token_budget": 2000},
+    "lexical": {"enabled": False, "min_chars": 200000, "chunk_lines": 40, "top_k": 12, "token_budget": 6000},
+    "uploads": {"enabled": False, "min_chars": 100000, "tail_chars": 4000},
+    "scheduler": {"max_concurrent": 4, "per_provider": {"openai": 2, "gemini": 2}, "on_duplicate": "drop"},
+    "realtime": {"max_sessions": 4, "idle_close": 300, "retries": 3, "backoff": 0.5, "backoff_max": 8.0},
+    "worker": {"enabled": False},
+    "daemon": {"enabled": False, "socket": None, "idle_exit": 600},
+    "tracing": {"enabled": False},
+    "recording": {"enabled": False, "dir": None},
+    "decoder": {"backend": "auto", "fast_path": True}
+}
+
+if os.path.exists(CONFIG_FILE):
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            CONFIG = json.load(f)
+    except Exception:
+        CONFIG = DEFAULT_CONFIG
+else:
+    CONFIG = DEFAULT_CONFIG
+
+ACTIVE_PROVIDER = CONFIG.get("active_provider", "openai").lower()
+OPENAI_CONFIG = CONFIG.get("openai", {})
+GEMINI_CONFIG = CONFIG.get("gemini", {})
+
+tracing.configure(CONFIG.get("tracing"), os.path.join(os.path.dirname(PLUGIN_DIR), "hello-gpt-trace.json"))
+recorder.configure(CONFIG.get("recording"), os.path.join(os.path.dirname(PLUGIN_DIR), "recordings"))
+
+# Pulls text deltas out of SSE chunks (see decoder.py)
+DECODER = get_decoder(CONFIG.get("decoder"))
+
+# -------------------------
+# Streaming
+# -------------------------
+def current_model(provider):
+    if provider == "gemini":
+        return GEMINI_CONFIG.get("model", "gemini-2.5-flash")
+    return OPENAI_CONFIG.get("model", "gpt-4o-mini")
+
+def provider_config(provider, options=None):
+    """
+    The provider's config section; for one request, the "settings" its
+    options carry instead (the daemon serves clients with their own keys
+    and endpoints, so it must not change the shared section).
+    """
+    settings = (options or {}).get("settings")
+    if settings is not None:
+        return settings
+    return GEMINI_CONFIG if provider == "gemini" else OPENAI_CONFIG
+
+def current_backend(provider, options=None):
+    """
+    The transport configured for provider: "stdlib" (default) or "sdk".
+    """
+    return provider_config(provider, options).get("backend", backends.DEFAULT_BACKEND)
+
+def chat_stream(message, callback, provider=None, model=None, trace=None, options=None):
+    """
+    Streams a reply from the configured (or given) provider to callback,
+    which receives ("text", str), ("usage", dict), ("stall", StreamStalled),
+    ("error", str) and ("done", None) events. Stalls are only detected by
+    the stdlib and realtime backends. Timings are recorded on trace (a
+    telemetry.RequestTrace) when given; the SDK backends can't see the
+    connection, so they only mark request-sent and first-byte. options
+    may hold "system" (instructions), "prediction" (the expected output,
+    for OpenAI predicted outputs), the latency profile keys (latency.py)
+    "cancel", a backends.CancelToken: once it is cancelled only usage
+    still comes through, and the request ends with ("done", None); and
+    "settings", the provider config section to use instead of the global
+    one (see provider_config()).
+    """
+    provider = (provider or CONFIG.get("active_provider", "openai")).lower()
+    model = model or current_model(provider)
+    if provider not in backends.BACKENDS:
+        callback("error", f"Unknown GPT provider: {provider}")
+        return
+
+    cancel = (options or {}).get("cancel")
+    if cancel is not None:
+        if cancel.cancelled:
+            callback("done", None)
+            return
+        deliver = callback
+
+        def callback(event_type, data):
+            # Whatever the abort caused (a cut stream, a closed socket) is noise
+            if not cancel.cancelled or event_type == "usage":
+                deliver(event_type, data)
+
+    backend, stream = backends.load(provider, current_backend(provider, options))
+    with tracing.span("chat_stream", provider=provider, model=model, backend=backend,
+                      prompt_chars=len(message)):
+        stream(provider_config(provider, options).get("api_key"), model, message, callback, trace, options)
+    if cancel is not None and cancel.cancelled:
+        deliver("done", None)
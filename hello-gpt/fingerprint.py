@@ -0,0 +1,271 @@
+# fingerprint.py
+# Block fingerprints of a buffer, kept up to date from its edit signals.
+#
+# The text is cut into content-defined blocks: a block ends after a line
+# whose CRC-32 has its low "mask_bits" bits clear (once the block has
+# "min_chars"), or after the line that takes it past "max_chars". Each
+# block is identified by a 64-bit BLAKE2b hash, and the hashes and block
+# lengths are kept in two arrays. Because cut points depend only on the
+# text since the previous cut, the blocks of a given text are always the
+# same, however it was edited: equal prefixes have equal block hashes, in
+# this session or the next.
+#
+# insert-text / delete-range only adjust the length of the blocks an edit
+# falls in and mark them dirty; refresh() re-reads and re-cuts the dirty
+# runs (extended until a cut point lines up with the old blocks again).
+# Content digests, prefix checks and changed-region detection then cost
+# O(blocks) array work plus O(changed text), never a copy of the buffer.
+import zlib
+import hashlib
+from array import array
+
+from .engine import CONFIG
+
+DEFAULT_FINGERPRINT_CONFIG = {
+    "min_chars": 1024,
+    "max_chars": 16384,
+    # Average block of 2 ** mask_bits lines past min_chars
+    "mask_bits": 5,
+}
+
+
+def fingerprint_config():
+    config = dict(DEFAULT_FINGERPRINT_CONFIG)
+    config.update(CONFIG.get("fingerprint") or {})
+    return config
+
+def block_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def digest(hashes):
+    """
+    Hex digest of a sequence of block hashes (an array or a slice of one).
+    """
+    return hashlib.blake2b(array("Q", hashes).tobytes(), digest_size=16).hexdigest()
+
+
+class Snapshot:
+    """
+    The block hashes and lengths of a buffer at one moment; safe to hand
+    to another thread.
+    """
+    __slots__ = ("hashes", "lengths")
+
+    def __init__(self, hashes, lengths):
+        self.hashes = hashes
+        self.lengths = lengths
+
+    def digest(self):
+        return digest(self.hashes)
+
+    def prefix(self, chars):
+        """
+        (blocks, chars covered, digest) of the longest run of whole blocks
+        that fits in the first chars characters.
+        """
+        covered = 0
+        for blocks, length in enumerate(self.lengths):
+            if covered + length > chars:
+                break
+            covered += length
+        else:
+            blocks = len(self.lengths)
+        return blocks, covered, digest(self.hashes[:blocks])
+
+    def has_prefix(self, blocks, prefix_digest):
+        return blocks <= len(self.hashes) and digest(self.hashes[:blocks]) == prefix_digest
+
+    def changed_region(self, earlier):
+        """
+        (start, end in earlier, end now) of the character range that
+        differs from an earlier snapshot, or None if nothing does.
+        """
+        if self.hashes == earlier.hashes:
+            return None
+        head = 0
+        limit = min(len(self.hashes), len(earlier.hashes))
+        while head < limit and self.hashes[head] == earlier.hashes[head]:
+            head += 1
+        tail = 0
+        while (tail < limit - head
+               and self.hashes[len(self.hashes) - 1 - tail] == earlier.hashes[len(earlier.hashes) - 1 - tail]):
+            tail += 1
+        start = sum(self.lengths[:head])
+        return (start, sum(earlier.lengths[:len(earlier.lengths) - tail]),
+                sum(self.lengths[:len(self.lengths) - tail]))
+
+
+class DocumentFingerprint:
+    """
+    Block fingerprints of one buffer. Edits are reported by character
+    offset; text is read through get_text(start, end) when dirty blocks
+    are refreshed. Not thread-safe: the plugin uses it from the main loop
+    and hands snapshot()s to other threads.
+    """
+    def __init__(self, get_text, length, settings=None):
+        self.get_text = get_text
+        self.settings = settings or fingerprint_config()
+        self.mask = (1 << self.settings["mask_bits"]) - 1
+        # Edits reported so far, to tell whether a snapshot taken off the
+        # main loop still matches
+        self.edits = 0
+        self.reset(length)
+
+    def reset(self, length):
+        # One dirty block: the first refresh cuts the whole text
+        self.built = False
+        self.hashes = array("Q", [0] if length else [])
+        self.lengths = array("I", [length] if length else [])
+        self.dirty = bytearray([1] if length else [])
+        # (block, start) of the last block located; edits cluster
+        self.hint = (0, 0)
+
+    def length(self):
+        return sum(self.lengths)
+
+    def locate(self, offset):
+        """
+        (block, its start) of the block holding offset; the last block for
+        the end of the text.
+        """
+        lengths = self.lengths
+        if not lengths:
+            return 0, 0
+        block, start = self.hint
+        if block >= len(lengths):
+            block = start = 0
+        while block > 0 and offset < start:
+            block -= 1
+            start -= lengths[block]
+        while block < len(lengths) - 1 and offset >= start + lengths[block]:
+            start += lengths[block]
+            block += 1
+        self.hint = (block, start)
+        return block, start
+
+    # -------------------------
+    # Edits
+    # -------------------------
+    def insert(self, offset, chars):
+        """
+        chars characters were inserted at offset.
+        """
+        self.edits += 1
+        if not self.lengths:
+            self.reset(chars)
+            return
+        block, _ = self.locate(offset)
+        self.lengths[block] += chars
+        self.dirty[block] = 1
+
+    def delete(self, start, end):
+        """
+        The characters from start to end were deleted.
+        """
+        self.edits += 1
+        removed = end - start
+        while removed > 0 and self.lengths:
+            block, block_start = self.locate(start)
+            take = min(removed, block_start + self.lengths[block] - start)
+            if take <= 0:
+                # Past the end: out of step with the buffer
+                break
+            self.lengths[block] -= take
+            removed -= take
+            if self.lengths[block]:
+                self.dirty[block] = 1
+            else:
+                del self.lengths[block]
+                del self.hashes[block]
+                del self.dirty[block]
+                self.hint = (0, 0)
+                # The cut before it may no longer line up
+                if block < len(self.dirty):
+                    self.dirty[block] = 1
+        if self.lengths:
+            self.dirty[self.locate(start)[0]] = 1
+
+    # -------------------------
+    # Cutting
+    # -------------------------
+    def cut(self, text):
+        """
+        Cuts text into blocks; returns their (hash, length) and whether the
+        last block ended at a cut point rather than at the end of text.
+        """
+        blocks = []
+        start = position = 0
+        min_chars = self.settings["min_chars"]
+        max_chars = self.settings["max_chars"]
+        while position < len(text):
+            end = text.find("\n", position) + 1
+            if not end:
+                # A line cut short by the end of text is no cut point: the
+                # rest of it may be in the next block
+                break
+            size = end - start
+            if size >= max_chars or (size >= min_chars
+                                     and not zlib.crc32(text[position:end].encode("utf-8")) & self.mask):
+                blocks.append((block_hash(text[start:end]), size))
+                start = end
+            position = end
+        if start < len(text):
+            blocks.append((block_hash(text[start:]), len(text) - start))
+            return blocks, False
+        return blocks, True
+
+    def refresh(self):
+        """
+        Re-cuts every run of dirty blocks. Returns the characters read.
+        """
+        read = 0
+        block = offset = 0
+        while block < len(self.lengths):
+            if not self.dirty[block]:
+                offset += self.lengths[block]
+                block += 1
+                continue
+            end = block
+            while end < len(self.lengths) and self.dirty[end]:
+                end += 1
+            while True:
+                length = sum(self.lengths[block:end])
+                blocks, aligned = self.cut(self.get_text(offset, offset + length))
+                read += length
+                # The last cut must line up with the start of the next clean
+                # block; otherwise that block joins the run
+                if aligned or end == len(self.lengths):
+                    break
+                end += 1
+            self.hashes[block:end] = array("Q", [h for h, _ in blocks])
+            self.lengths[block:end] = array("I", [n for _, n in blocks])
+            self.dirty[block:end] = bytearray(len(blocks))
+            offset += length
+            block += len(blocks)
+        self.hint = (0, 0)
+        self.built = True
+        return read
+
+    def snapshot(self):
+        """
+        A Snapshot of the current text (refreshed first).
+        """
+        self.refresh()
+        return Snapshot(array("Q", self.hashes), array("I", self.lengths))
+
+    def adopt(self, snapshot, edits):
+        """
+        Takes snapshot, cut from a copy of the text on another thread, as
+        the first build, unless the buffer was edited since the copy.
+        """
+        if not self.built and edits == self.edits and sum(snapshot.lengths) == self.length():
+            self.hashes = array("Q", snapshot.hashes)
+            self.lengths = array("I", snapshot.lengths)
+            self.dirty = bytearray(len(self.lengths))
+            self.hint = (0, 0)
+            self.built = True
+        return False
+
+    def describe(self):
+        dirty = sum(self.dirty)
+        return f"{len(self.lengths)} blocks ({dirty} dirty), {self.length()} chars"
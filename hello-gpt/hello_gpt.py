@@ -0,0 +1,1170 @@
+import os
+import json
+import time
+import threading
+import functools
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GObject, GLib, Gtk, Gedit, Gdk, Pango
+
+from .engine import (
+    PLUGIN_DIR, CONFIG, CONFIG_FILE, DEFAULT_CONFIG, ACTIVE_PROVIDER, OPENAI_CONFIG, GEMINI_CONFIG,
+    current_model, current_backend, chat_stream
+)
+from .backends import BACKENDS, CancelToken
+from .completion import completion_config, completion_prompt, completion_options
+from .latency import pick_profile, profile_options
+from .retrieval import retrieval_config, EmbeddingError
+from .lexical import ChunkIndex, lexical_config, question_from
+from .uploads import uploads_config, uses_references
+from .fingerprint import DocumentFingerprint
+from .ledger import format_entry
+from .scheduler import format_stats
+from .service import get_service, shutdown_service
+from . import telemetry, tracing, profiling
+
+profiling.configure(CONFIG.get("profiling"), os.path.join(PLUGIN_DIR, "profiles"))
+
+# -------------------------
+# Batch mode
+# -------------------------
+# The runner lives on the shared service, so jobs are polled once no matter
+# how many windows are open. Unsaved documents can only be matched in this
+# session.
+def get_batch_runner():
+    return get_service().get_batch_runner(
+        lambda job, key, text: GObject.idle_add(deliver_batch_result, job, key, text),
+        lambda message: GObject.idle_add(show_app_error, message)
+    )
+
+# -------------------------
+# Worker process / daemon
+# -------------------------
+# The worker's pipe (or the daemon's socket) is read on the main loop, so
+# its events reach stream_to_doc's callback on the main thread and are
+# inserted directly.
+def watch_worker(client):
+    GLib.io_add_watch(client.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_IN | GLib.IO_HUP, client.on_readable)
+
+def held_modifier(event):
+    """
+    "control" or "shift" when held with the shortcut, which picks the
+    latency profile mapped to it.
+    """
+    if event.state & Gdk.ModifierType.CONTROL_MASK:
+        return "control"
+    if event.state & Gdk.ModifierType.SHIFT_MASK:
+        return "shift"
+    return None
+
+def get_doc_path(doc):
+    location = doc.get_file().get_location()
+    return location.get_path() if location else None
+
+def deliver_batch_result(job, key, text):
+    """
+    Appends a batch result to its document if it is open, otherwise to the
+    file it came from, or to a results file for unsaved documents.
+    """
+    service = get_service()
+    target = job["targets"][key]
+    doc = service.batch_docs.pop(key, None)
+    if doc is None and target.get("path"):
+        for open_doc in Gedit.App.get_default().get_documents():
+            if get_doc_path(open_doc) == target["path"]:
+                doc = open_doc
+                break
+
+    if doc is not None:
+        doc.insert(doc.get_end_iter(), "\n\n\n" + text)
+        return False
+
+    path = target.get("path")
+    if not path:
+        path = os.path.join(service.batch_runner.work_dir, f"{key}-{target.get('name') or 'untitled'}.txt")
+    try:
+        with open(path, "a") as f:
+            f.write("\n\n\n" + text)
+    except Exception as e:
+        show_app_error(f"Could not write batch result for {target.get('name')}: {e}")
+    return False
+
+def show_app_error(message):
+    window = Gedit.App.get_default().get_active_window()
+    dialog = Gtk.MessageDialog(
+        transient_for=window,
+        flags=0,
+        message_type=Gtk.MessageType.ERROR,
+        buttons=Gtk.ButtonsType.OK,
+        text="Error contacting GPT API"
+    )
+    dialog.format_secondary_text(message)
+    dialog.run()
+    dialog.destroy()
+    return False
+
+def backend_combo(active):
+    """
+    Transport choices for one provider's config frame.
+    """
+    combo = Gtk.ComboBoxText()
+    names = list(BACKENDS["openai"])
+    for name in names:
+        combo.append_text(name)
+    combo.set_active(names.index(active) if active in names else 0)
+    return combo
+
+# -------------------------
+# Application scope
+# -------------------------
+class HelloGPTApp(GObject.Object, Gedit.AppActivatable):
+    """
+    Creates the shared service once per gedit process and tears down its
+    clients when the plugin is unloaded.
+    """
+    __gtype_name__ = "HelloGPTApp"
+    app = GObject.Property(type=Gedit.App)
+
+    def do_activate(self):
+        service = get_service()
+        if service.has_pending_batches():
+            get_batch_runner().resume()
+
+    def do_deactivate(self):
+        shutdown_service()
+
+# -------------------------
+# Plugin class
+# -------------------------
+class HelloGPTPlugin(GObject.Object, Gedit.WindowActivatable):
+    """
+    Per window: binds the shortcuts and inserts replies into this window's
+    documents. Everything else is borrowed from the shared service.
+    """
+    __gtype_name__ = "HelloGPTPlugin"
+    window = GObject.Property(type=Gedit.Window)
+
+    def __init__(self):
+        super().__init__()
+        self.handler_id = None
+        self.tab_handler_id = None
+        self.service = None
+        # Document -> "saved" handler, for re-embedding saved files
+        self.saved_handlers = {}
+        self.tab_added_id = None
+        self.tab_removed_id = None
+        # Inline completion: the suggestion shown, the pending timer and
+        # the request in flight
+        self.ghost = None
+        self.completion_timer = None
+        self.completion_cancel = None
+        self.completion_generation = 0
+        # Long documents: document -> {"index": ChunkIndex, "handlers",
+        # "timer", "then"}
+        self.lexical = {}
+        # Uploaded documents: document -> (DocumentFingerprint, handlers)
+        self.fingerprints = {}
+
+    def do_activate(self):
+        self.service = get_service()
+        self.handler_id = self.window.connect("key-press-event", self.on_key_press)
+        self.tab_handler_id = self.window.connect("active-tab-changed", lambda *args: self.stop_completion())
+        if retrieval_config()["enabled"]:
+            for doc in self.window.get_documents():
+                self.watch_saves(doc)
+            self.tab_added_id = self.window.connect(
+                "tab-added", lambda window, tab: self.watch_saves(tab.get_document()))
+        self.tab_removed_id = self.window.connect("tab-removed", self.on_tab_removed)
+
+    def do_deactivate(self):
+        self.stop_completion()
+        for doc in list(self.saved_handlers):
+            self.unwatch_saves(doc)
+        for doc in list(self.lexical):
+            self.drop_lexical_index(doc)
+        for doc in list(self.fingerprints):
+            self.drop_fingerprint(doc)
+        for handler_id in (self.tab_added_id, self.tab_removed_id):
+            if handler_id:
+                self.window.disconnect(handler_id)
+        self.tab_added_id = self.tab_removed_id = None
+        if self.handler_id:
+            self.window.disconnect(self.handler_id)
+            self.handler_id = None
+        if self.tab_handler_id:
+            self.window.disconnect(self.tab_handler_id)
+            self.tab_handler_id = None
+
+    def do_update_state(self):
+        pass
+
+    # -------------------------
+    # Key handling
+    # -------------------------
+    def on_key_press(self, widget, event):
+        # Inline completion: Tab takes the suggestion, any other key drops it
+        # and restarts the typing pause
+        if not event.is_modifier:
+            if self.ghost and event.keyval == Gdk.KEY_Tab and not event.state & (
+                    Gdk.ModifierType.SHIFT_MASK | Gdk.ModifierType.CONTROL_MASK | Gdk.ModifierType.MOD1_MASK):
+                self.accept_ghost()
+                return True
+            self.stop_completion()
+            if not event.state & (Gdk.ModifierType.CONTROL_MASK | Gdk.ModifierType.MOD1_MASK):
+                self.schedule_completion()
+
+        # Alt+G: stream text (Shift / Ctrl pick a faster / deeper latency profile)
+        if Gdk.keyval_to_lower(event.keyval) == Gdk.KEY_g and event.state & Gdk.ModifierType.MOD1_MASK:
+            doc = self.window.get_active_document()
+            if doc:
+                model = self.check_budget()
+                if model is None:
+                    return True
+
+                document = get_doc_path(doc) or doc.get_short_name_for_display()
+                trace = telemetry.RequestTrace(ACTIVE_PROVIDER, model,
+                                               pick_profile(document, held_modifier(event)))
+                trace.mark("key_press")
+                settings = lexical_config()
+                if settings["enabled"] and doc.get_char_count() > settings["min_chars"]:
+                    # Long document: send the excerpts that match the question
+                    with tracing.span("key_handler", key="Alt+G", profile=trace.profile, excerpts=True):
+                        self.ask_long_document(doc, trace, document, settings)
+                    return True
+                with tracing.span("key_handler", key="Alt+G", profile=trace.profile):
+                    start, end = doc.get_bounds()
+                    text = doc.get_text(start, end, True)
+                    snapshot = self.fingerprint_snapshot(doc, text)
+                    status = self.service.scheduler.submit(self.stream_to_doc,
+                                                           (doc, text, trace, document, None, True, snapshot),
+                                                           provider=ACTIVE_PROVIDER, key=doc)
+                if status == "dropped":
+                    self.flash("A GPT reply is still streaming into this document")
+            return True
+
+        # Alt+R: rewrite the selection in place
+        if Gdk.keyval_to_lower(event.keyval) == Gdk.KEY_r and event.state & Gdk.ModifierType.MOD1_MASK:
+            doc = self.window.get_active_document()
+            if doc and doc.get_has_selection():
+                model = self.check_budget()
+                if model is None:
+                    return True
+
+                document = get_doc_path(doc) or doc.get_short_name_for_display()
+                trace = telemetry.RequestTrace(ACTIVE_PROVIDER, model,
+                                               pick_profile(document, held_modifier(event)))
+                trace.mark("key_press")
+                with tracing.span("key_handler", key="Alt+R", profile=trace.profile):
+                    start, end = doc.get_selection_bounds()
+                    selection = doc.get_text(start, end, True)
+                    # Marks keep the range in place while the user goes on editing
+                    marks = (doc.create_mark(None, start, True), doc.create_mark(None, end, False))
+                    status = self.service.scheduler.submit(self.rewrite_selection,
+                                                           (doc, selection, marks, trace, document),
+                                                           provider=ACTIVE_PROVIDER, key=doc)
+                if status == "dropped":
+                    for mark in marks:
+                        doc.delete_mark(mark)
+                    self.flash("A GPT reply is still streaming into this document")
+            return True
+
+        # Alt+S: latency summary in the statusbar
+        if event.keyval == Gdk.KEY_s and event.state & Gdk.ModifierType.MOD1_MASK:
+            GObject.idle_add(self.show_stats)
+            return True
+
+        # Alt+B: run one instruction over all open documents as a batch job
+        if event.keyval == Gdk.KEY_b and event.state & Gdk.ModifierType.MOD1_MASK:
+            GObject.idle_add(self.open_batch_window)
+            return True
+
+        # Alt+T: start tracing, or write the trace and stop
+        if event.keyval == Gdk.KEY_t and event.state & Gdk.ModifierType.MOD1_MASK:
+            GObject.idle_add(self.toggle_tracing)
+            return True
+
+        # Alt+P: profile the next request
+        if event.keyval == Gdk.KEY_p and event.state & Gdk.ModifierType.MOD1_MASK:
+            profiling.arm()
+            self.flash("The next GPT request will be profiled")
+            return True
+
+        # Alt+C: open config window
+        if event.keyval == Gdk.KEY_c and event.state & Gdk.ModifierType.MOD1_MASK:
+            GObject.idle_add(self.open_config_window)
+            return True
+
+        return False
+
+    def check_budget(self):
+        """
+        The model to use under the budget, or None (after telling the user)
+        when the request is blocked.
+        """
+        # Count what the daemon or other gedit instances added
+        self.service.ledger.refresh()
+        model, note = self.service.ledger.apply_budget(
+            CONFIG.get("budget"), ACTIVE_PROVIDER, current_model(ACTIVE_PROVIDER))
+        if model is None:
+            GObject.idle_add(self.show_error, note)
+        elif note:
+            self.flash(note)
+        return model
+
+    # -------------------------
+    # Streaming logic
+    # -------------------------
+    def run_chat(self, worker, text, callback, trace, document=None, options=None):
+        """
+        Streams in the worker process / daemon when there is one, else on
+        this thread.
+        """
+        if worker:
+            try:
+                worker.chat_stream(text, callback, trace.provider, trace.model, document, options)
+            except OSError as e:
+                callback("error", f"Could not reach the GPT worker: {e}")
+        else:
+            chat_stream(text, callback, trace.provider, trace.model, trace=trace, options=options)
+
+    def stream_to_doc(self, doc, text, trace=None, document=None, options=None, whole_document=False,
+                      snapshot=None):
+        trace = trace or telemetry.RequestTrace(ACTIVE_PROVIDER, current_model(ACTIVE_PROVIDER))
+        trace.mark("worker_start")
+        worker = self.service.get_worker(watch_worker) if self.service.worker_enabled() else None
+        if whole_document:
+            text, options = self.with_uploaded_prefix(text, document, trace.provider, options, snapshot)
+        text = self.with_project_context(text, document)
+        # The IO watch can run before a pending idle callback, so out of
+        # process the separator goes in with the first delta instead
+        separator = ["\n\n\n"] if worker else []
+        if not worker:
+            GObject.idle_add(self.append_to_doc, doc, "\n\n\n")
+
+        # A profiled request also profiles its inserts on the main loop
+        profile = profiling.take(f"{trace.provider}/{trace.model} {document or ''}",
+                                 os.path.basename(document or "untitled"))
+        append = functools.partial(profile.run_main, self.append_to_doc) if profile else self.append_to_doc
+
+        def callback(event_type, data):
+            if event_type == "text":
+                trace.token()
+                if worker:
+                    # Already on the main thread (see watch_worker)
+                    if separator:
+                        data = separator.pop() + data
+                    append(doc, data, trace)
+                    return
+                queued = (tracing.now(), tracing.next_id()) if tracing.ENABLED else None
+                GObject.idle_add(append, doc, data, trace, queued)
+            elif event_type == "usage":
+                if worker and worker.records_usage:
+                    return
+                entry = self.service.ledger.add(trace.provider, trace.model, document, data)
+                GObject.idle_add(self.show_usage, entry)
+            elif event_type == "ledger":
+                # Recorded by the daemon, which also knows the month's spend
+                GObject.idle_add(self.show_usage, data["entry"], data["month_spend"])
+            elif event_type == "error":
+                trace.error = data
+                GObject.idle_add(self.show_error, data)
+            elif event_type == "stall":
+                trace.error = str(data)
+                GObject.idle_add(self.show_error, str(data))
+            # "done" event doesn't need any action
+
+        with tracing.span("stream_to_doc", document=document, worker=bool(worker)):
+            options = dict(profile_options(trace.profile), **(options or {}))
+            self.run_chat(worker, text, callback, trace, document, options)
+
+        # Queued after every insert, so the record sees the last one
+        GObject.idle_add(telemetry.record, trace)
+        if profile:
+            profile.stop()
+            GObject.idle_add(self.finish_profile, profile)
+
+    def rewrite_selection(self, doc, selection, marks, trace, document=None):
+        """
+        Streams the rewrite into a shadow buffer (a list) and swaps it in
+        for the marked range once complete. The selection is sent as the
+        predicted output, so unchanged spans come back at high speed.
+        """
+        trace.mark("worker_start")
+        worker = self.service.get_worker(watch_worker) if self.service.worker_enabled() else None
+        settings = dict(DEFAULT_CONFIG["rewrite"])
+        settings.update(CONFIG.get("rewrite") or {})
+        options = dict(profile_options(trace.profile), system=settings["instruction"])
+        if settings["prediction"]:
+            options["prediction"] = selection
+        parts = []
+        failed = []
+
+        def callback(event_type, data):
+            if event_type == "text":
+                trace.token()
+                parts.append(data)
+            elif event_type == "usage":
+                if worker and worker.records_usage:
+                    return
+                entry = self.service.ledger.add(trace.provider, trace.model, document, data)
+                GObject.idle_add(self.show_usage, entry)
+            elif event_type == "ledger":
+                GObject.idle_add(self.show_usage, data["entry"], data["month_spend"])
+            elif event_type in ("error", "stall"):
+                trace.error = str(data)
+                failed.append(data)
+                GObject.idle_add(self.show_error, str(data))
+
+        with tracing.span("rewrite_selection", document=document, chars=len(selection)):
+            self.run_chat(worker, selection, callback, trace, document, options)
+
+        text = "".join(parts) if parts and not failed else None
+        GObject.idle_add(self.replace_range, doc, marks, text, trace)
+        GObject.idle_add(telemetry.record, trace)
+
+    # -------------------------
+    # Project retrieval
+    # -------------------------
+    def with_project_context(self, text, document):
+        """
+        Prepends the project's chunks that best match the end of text.
+        Runs on the scheduler thread; text is sent as is while the index
+        is still being built, or if retrieval fails.
+        """
+        if not retrieval_config()["enabled"] or not document or not os.path.isabs(document):
+            return text
+        index = self.service.project_index(document)
+        if not index.ready():
+            GObject.idle_add(self.flash, f"GPT project index is being built ({index.describe()})")
+            return text
+        try:
+            with tracing.span("retrieval", root=index.root):
+                return index.context(text, os.path.relpath(document, index.root)) + text
+        except EmbeddingError as e:
+            GObject.idle_add(self.flash, str(e))
+            return text
+
+    # -------------------------
+    # Uploaded documents
+    # -------------------------
+    def with_uploaded_prefix(self, text, document, provider, options, snapshot=None):
+        """
+        (text, options) for a request with the whole document: the part
+        after an uploaded prefix plus a reference to the upload, when there
+        is one. Otherwise the text is sent whole, and a long document's
+        stable part starts uploading for the next request. snapshot is the
+        document's fingerprint (or a function computing it).
+        """
+        settings = uploads_config()
+        if not settings["enabled"] or not uses_references(provider) or len(text) < settings["min_chars"]:
+            return text, options
+        with tracing.span("upload_reference", chars=len(text)):
+            if callable(snapshot):
+                snapshot = snapshot()
+            file, rest = self.service.uploads.reference(text, document, snapshot)
+        if file is None:
+            return text, options
+        GObject.idle_add(self.flash, f"GPT: {file['bytes'] / 1e6:.1f} MB of the document sent as its uploaded file")
+        return rest, dict(options or {}, files=[file])
+
+    def on_tab_removed(self, window, tab):
+        doc = tab.get_document()
+        self.unwatch_saves(doc)
+        self.drop_lexical_index(doc)
+        self.drop_fingerprint(doc)
+
+    def fingerprint_snapshot(self, doc, text):
+        """
+        The fingerprint snapshot of the document, whose text is text, for a
+        request that may reference an upload; None if none can. The first
+        time, a function that cuts text on the worker thread instead.
+        """
+        settings = uploads_config()
+        if not settings["enabled"] or not uses_references(ACTIVE_PROVIDER) or len(text) < settings["min_chars"]:
+            return None
+        entry = self.fingerprints.get(doc)
+        if entry is None:
+            fingerprint = DocumentFingerprint(
+                lambda start, end: doc.get_text(doc.get_iter_at_offset(start), doc.get_iter_at_offset(end), True),
+                doc.get_char_count())
+            # Connected before the default handlers, while the iters still
+            # point into the unchanged text
+            entry = self.fingerprints[doc] = (fingerprint, [
+                doc.connect("insert-text", lambda doc, location, text, length: fingerprint.insert(
+                    location.get_offset(), len(text))),
+                doc.connect("delete-range", lambda doc, start, end: fingerprint.delete(
+                    start.get_offset(), end.get_offset())),
+            ])
+        fingerprint = entry[0]
+        if fingerprint.built:
+            with tracing.span("fingerprint_refresh", blocks=len(fingerprint.lengths)):
+                return fingerprint.snapshot()
+        edits = fingerprint.edits
+
+        def first_snapshot():
+            snapshot = DocumentFingerprint(lambda start, end: text[start:end], len(text),
+                                           fingerprint.settings).snapshot()
+            GObject.idle_add(fingerprint.adopt, snapshot, edits)
+            return snapshot
+        return first_snapshot
+
+    def drop_fingerprint(self, doc):
+        entry = self.fingerprints.pop(doc, None)
+        if entry:
+            for handler_id in entry[1]:
+                doc.disconnect(handler_id)
+
+    def watch_saves(self, doc):
+        if doc not in self.saved_handlers:
+            self.saved_handlers[doc] = doc.connect("saved", self.on_doc_saved)
+
+    def unwatch_saves(self, doc):
+        handler_id = self.saved_handlers.pop(doc, None)
+        if handler_id:
+            doc.disconnect(handler_id)
+
+    def on_doc_saved(self, doc, *args):
+        path = get_doc_path(doc)
+        if not path:
+            return
+        index = self.service.project_index(path)
+        relpath = os.path.relpath(path, index.root)
+
+        def update():
+            try:
+                index.update_files([relpath])
+            except (EmbeddingError, OSError):
+                pass
+        threading.Thread(target=update, name="hello-gpt-index-update", daemon=True).start()
+
+    # -------------------------
+    # Long documents
+    # -------------------------
+    def lexical_index(self, doc, settings):
+        """
+        The document's chunk index, created on first use and kept in step
+        with its edits from then on.
+        """
+        entry = self.lexical.get(doc)
+        if entry is None:
+            def get_lines(first, count):
+                start = doc.get_iter_at_line(first)
+                if first + count < doc.get_line_count():
+                    return doc.get_text(start, doc.get_iter_at_line(first + count), True)
+                return doc.get_text(start, doc.get_end_iter(), True)
+
+            index = ChunkIndex(get_lines, doc.get_line_count(), settings["chunk_lines"])
+            entry = self.lexical[doc] = {"index": index, "timer": None, "then": None}
+            # Connected before the default handlers, while the iters still
+            # point into the unchanged text
+            entry["handlers"] = [
+                doc.connect("insert-text", lambda doc, location, text, length: self.on_lexical_edit(
+                    doc, index.insert, location.get_line(), text.count("\n"))),
+                doc.connect("delete-range", lambda doc, start, end: self.on_lexical_edit(
+                    doc, index.delete, start.get_line(), end.get_line())),
+            ]
+        return entry
+
+    def drop_lexical_index(self, doc):
+        entry = self.lexical.pop(doc, None)
+        if entry:
+            for handler_id in entry["handlers"]:
+                doc.disconnect(handler_id)
+            if entry["timer"]:
+                GLib.source_remove(entry["timer"])
+
+    def on_lexical_edit(self, doc, update, *lines):
+        with tracing.span("lexical_edit"):
+            update(*lines)
+        entry = self.lexical[doc]
+        # Re-index once typing pauses
+        if entry["timer"]:
+            GLib.source_remove(entry["timer"])
+        entry["timer"] = GLib.timeout_add(int(lexical_config()["delay"] * 1000), self.refresh_lexical_index, doc)
+
+    def refresh_lexical_index(self, doc, idle=False):
+        """
+        Indexes stale chunks in short slices between main loop events, then
+        runs the question waiting for them, if any.
+        """
+        entry = self.lexical.get(doc)
+        if entry is None:
+            return False
+        with tracing.span("lexical_refresh"):
+            done = entry["index"].refresh(lexical_config()["slice_ms"] / 1000)
+        if not done:
+            if idle:
+                return True
+            # Continue on idle rather than at the debounce interval
+            entry["timer"] = GLib.idle_add(self.refresh_lexical_index, doc, True)
+            return False
+        entry["timer"] = None
+        then, entry["then"] = entry["then"], None
+        if then:
+            then()
+        return False
+
+    def ask_long_document(self, doc, trace, document, settings):
+        """
+        Sends the question (the selection, else the last paragraph) with
+        the document's best matching chunks instead of the whole text.
+        """
+        end_line = None
+        if doc.get_has_selection():
+            question = doc.get_text(*doc.get_selection_bounds(), True)
+        else:
+            end = doc.get_end_iter()
+            start = doc.get_iter_at_offset(max(0, end.get_offset() - 2 * settings["question_chars"]))
+            question = question_from(doc.get_text(start, end, True), settings["question_chars"])
+            end_line = doc.get_line_count() - question.count("\n") - 1
+        if not question.strip():
+            self.flash("Type a question at the end of the document, or select one")
+            return
+        entry = self.lexical_index(doc, settings)
+        index = entry["index"]
+        if index.line_count() != doc.get_line_count():
+            # Out of step with the buffer (should not happen); start over
+            index.reset(doc.get_line_count())
+
+        def send():
+            with tracing.span("lexical_rank", chunks=len(index.counts)):
+                message = index.excerpts(question, settings["top_k"], settings["token_budget"], end_line)
+            status = self.service.scheduler.submit(
+                self.stream_to_doc, (doc, message, trace, document, {"system": settings["instruction"]}),
+                provider=trace.provider, key=doc)
+            if status == "dropped":
+                self.flash("A GPT reply is still streaming into this document")
+
+        if not index.stale:
+            send()
+            return
+        if index.stale > len(index.counts) // 10:
+            self.flash(f"Indexing {len(index.counts)} chunks of this document for the question")
+        entry["then"] = send
+        if entry["timer"]:
+            GLib.source_remove(entry["timer"])
+        entry["timer"] = GLib.idle_add(self.refresh_lexical_index, doc, True)
+
+    def show_stats(self):
+        summary = (telemetry.format_summary(telemetry.summarize())
+                   + " | " + format_stats(self.service.scheduler.stats()))
+        for index in list(self.service.indexes.values()):
+            summary += " | " + index.describe()
+        if uploads_config()["enabled"]:
+            summary += " | " + self.service.uploads.describe()
+        entry = self.lexical.get(self.window.get_active_document())
+        if entry:
+            summary += " | document index " + entry["index"].describe()
+        entry = self.fingerprints.get(self.window.get_active_document())
+        if entry:
+            summary += " | fingerprint " + entry[0].describe()
+        self.flash(summary)
+        return False
+
+    def show_usage(self, entry, month_spend=None):
+        if month_spend is None:
+            month_spend = self.service.ledger.month_spend()
+        self.flash(format_entry(entry, month_spend))
+        return False
+
+    def finish_profile(self, profile):
+        # pstats formatting takes a while; keep it off the main loop
+        def write():
+            try:
+                path = profile.write()
+                GObject.idle_add(self.flash, f"GPT profile written to {path}")
+            except OSError as e:
+                GObject.idle_add(self.show_error, f"Could not write profile: {e}")
+
+        threading.Thread(target=write, name="hello-gpt-profile", daemon=True).start()
+        return False
+
+    def toggle_tracing(self):
+        if not tracing.ENABLED:
+            tracing.clear()
+            tracing.enable()
+            self.flash("GPT tracing on; press Alt+T again to write the trace")
+            return False
+
+        tracing.disable()
+        try:
+            path, count = tracing.export()
+            self.flash(f"Wrote {count} trace events to {path}")
+        except OSError as e:
+            self.show_error(f"Could not write trace: {e}")
+        return False
+
+    # -------------------------
+    # Batch submission
+    # -------------------------
+    def open_batch_window(self):
+        dialog = Gtk.Dialog(
+            title="Batch Instruction",
+            transient_for=self.window,
+            flags=0,
+        )
+        dialog.add_buttons(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+                        "Submit", Gtk.ResponseType.OK)
+        dialog.set_default_size(500, -1)
+
+        content_area = dialog.get_content_area()
+        content_area.set_margin_top(10)
+        content_area.set_margin_bottom(15)
+        content_area.set_margin_start(10)
+        content_area.set_margin_end(10)
+
+        documents = self.window.get_documents()
+        label = Gtk.Label(label=f"Instruction to run over {len(documents)} open document(s):")
+        label.set_halign(Gtk.Align.START)
+        entry = Gtk.Entry()
+        entry.set_placeholder_text("e.g., Add docstrings")
+        entry.set_activates_default(True)
+        dialog.set_default_response(Gtk.ResponseType.OK)
+        content_area.pack_start(label, False, False, 5)
+        content_area.pack_start(entry, False, False, 5)
+
+        dialog.show_all()
+        response = dialog.run()
+        instruction = entry.get_text().strip()
+        dialog.destroy()
+
+        if response != Gtk.ResponseType.OK or not instruction or not documents:
+            return False
+
+        stamp = int(time.time() * 1000)
+        targets = {}
+        for i, doc in enumerate(documents):
+            key = f"{stamp}-{i}"
+            start, end = doc.get_bounds()
+            targets[key] = {
+                "path": get_doc_path(doc),
+                "name": doc.get_short_name_for_display(),
+                "text": doc.get_text(start, end, True)
+            }
+            self.service.batch_docs[key] = doc
+
+        self.service.scheduler.submit(self.submit_batch, (instruction, targets), provider=ACTIVE_PROVIDER,
+                                      priority="batch")
+        return False
+
+    def submit_batch(self, instruction, targets):
+        from .backends import openai_sdk, genai_sdk
+        if ACTIVE_PROVIDER == "openai":
+            model = OPENAI_CONFIG.get("model", "gpt-4o-mini")
+            ready = openai_sdk.AVAILABLE and OPENAI_CONFIG.get("api_key")
+        else:
+            model = GEMINI_CONFIG.get("model", "gemini-2.5-flash")
+            ready = genai_sdk.AVAILABLE and GEMINI_CONFIG.get("api_key")
+        if not ready:
+            GObject.idle_add(self.show_error, "Error connecting to the API.")
+            return
+
+        try:
+            get_batch_runner().submit(ACTIVE_PROVIDER, model, instruction, targets)
+        except Exception as e:
+            for key in targets:
+                self.service.batch_docs.pop(key, None)
+            GObject.idle_add(self.show_error, f"Batch submission failed: {e}")
+
+    # -------------------------
+    # Configuration UI
+    # -------------------------
+    def open_config_window(self):
+        global ACTIVE_PROVIDER
+
+        dialog = Gtk.Dialog(
+            title="GPT Plugin Configuration",
+            transient_for=self.window,
+            flags=0,
+        )
+        dialog.add_buttons(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+                        "Update", Gtk.ResponseType.OK)
+        dialog.set_default_size(700, 400)  # Increased height a bit
+
+        header = Gtk.HeaderBar()
+        header.set_show_close_button(False)
+        header.set_title("GPT Plugin Configuration")
+        
+        cs_label = Gtk.Label(label="CS@CUSAT")
+        cs_label.get_style_context().add_class("dim-label")
+        cs_label.set_margin_end(10)
+        header.pack_end(cs_label)
+        
+        # Set the header bar as the title bar of the dialog
+        dialog.set_titlebar(header)
+
+        content_area = dialog.get_content_area()
+        
+        # Add margin to the content area
+        content_area.set_margin_top(10)
+        content_area.set_margin_bottom(15)  # Increased bottom margin
+        content_area.set_margin_start(10)
+        content_area.set_margin_end(10)
+
+        # Create a main container with proper spacing
+        main_container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        content_area.pack_start(main_container, True, True, 0)
+
+        # Content area for the configuration
+        content_vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=15)
+        main_container.pack_start(content_vbox, True, True, 0)
+
+        # Active Provider combo
+        active_label = Gtk.Label(label="Select Active GPT Provider:")
+        active_label.set_halign(Gtk.Align.START)
+        active_combo = Gtk.ComboBoxText()
+        active_combo.append_text("openai")
+        active_combo.append_text("gemini")
+        active_combo.set_active(0 if ACTIVE_PROVIDER == "openai" else 1)
+
+        content_vbox.pack_start(active_label, False, False, 0)
+        content_vbox.pack_start(active_combo, False, False, 0)
+
+        # Horizontal box for OpenAI and Gemini
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=20)
+        content_vbox.pack_start(hbox, True, True, 0)
+
+        # -------------------------
+        # OpenAI Frame
+        # -------------------------
+        openai_frame = Gtk.Frame(label="OpenAI Configuration")
+        openai_frame.set_shadow_type(Gtk.ShadowType.ETCHED_IN)
+        openai_frame.set_margin_top(5)
+        openai_frame.set_margin_bottom(5)
+        openai_frame.set_margin_start(5)
+        openai_frame.set_margin_end(5)
+        openai_frame.get_style_context().add_class("config-frame")
+
+        openai_grid = Gtk.Grid(column_spacing=10, row_spacing=5, margin=10)
+        openai_frame.add(openai_grid)
+
+        openai_grid.attach(Gtk.Label(label="Model:"), 0, 0, 1, 1)
+        openai_model_entry = Gtk.Entry()
+        openai_model_entry.set_text(OPENAI_CONFIG.get("model", "gpt-4o-mini"))
+        openai_model_entry.set_placeholder_text("e.g., gpt-4o-mini")
+        openai_grid.attach(openai_model_entry, 1, 0, 1, 1)
+
+        openai_grid.attach(Gtk.Label(label="API Key:"), 0, 1, 1, 1)
+        openai_api_entry = Gtk.Entry()
+        openai_api_entry.set_text(OPENAI_CONFIG.get("api_key", ""))
+        openai_api_entry.set_placeholder_text("Your OpenAI API Key")
+        openai_grid.attach(openai_api_entry, 1, 1, 1, 1)
+
+        openai_grid.attach(Gtk.Label(label="Backend:"), 0, 2, 1, 1)
+        openai_backend_combo = backend_combo(current_backend("openai"))
+        openai_grid.attach(openai_backend_combo, 1, 2, 1, 1)
+
+        hbox.pack_start(openai_frame, True, True, 0)
+
+        # -------------------------
+        # Gemini Frame
+        # -------------------------
+        gemini_frame = Gtk.Frame(label="Gemini Configuration")
+        gemini_frame.set_shadow_type(Gtk.ShadowType.ETCHED_IN)
+        gemini_frame.set_margin_top(5)
+        gemini_frame.set_margin_bottom(5)
+        gemini_frame.set_margin_start(5)
+        gemini_frame.set_margin_end(5)
+        gemini_frame.get_style_context().add_class("config-frame")
+
+        gemini_grid = Gtk.Grid(column_spacing=10, row_spacing=5, margin=10)
+        gemini_frame.add(gemini_grid)
+
+        gemini_grid.attach(Gtk.Label(label="Model:"), 0, 0, 1, 1)
+        gemini_model_entry = Gtk.Entry()
+        gemini_model_entry.set_text(GEMINI_CONFIG.get("model", "gemini-2.5-flash"))
+        gemini_model_entry.set_placeholder_text("e.g., gemini-2.5-flash")
+        gemini_grid.attach(gemini_model_entry, 1, 0, 1, 1)
+
+        gemini_grid.attach(Gtk.Label(label="API Key:"), 0, 1, 1, 1)
+        gemini_api_entry = Gtk.Entry()
+        gemini_api_entry.set_text(GEMINI_CONFIG.get("api_key", ""))
+        gemini_api_entry.set_placeholder_text("Your Gemini API Key")
+        gemini_grid.attach(gemini_api_entry, 1, 1, 1, 1)
+
+        gemini_grid.attach(Gtk.Label(label="Backend:"), 0, 2, 1, 1)
+        gemini_backend_combo = backend_combo(current_backend("gemini"))
+        gemini_grid.attach(gemini_backend_combo, 1, 2, 1, 1)
+
+        hbox.pack_start(gemini_frame, True, True, 0)
+
+        # Add a spacer at the bottom to push content up and create space above buttons
+        spacer = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
+        spacer.set_size_request(-1, 20)  # 20 pixels height spacer
+        main_container.pack_start(spacer, False, False, 0)
+
+        # Add CSS styling for frames
+        css_provider = Gtk.CssProvider()
+        css = b"""
+        .config-frame {
+            border-radius: 8px;
+            border-width: 1px;
+        }
+        .active-frame {
+            border: none; /* remove border */
+            box-shadow: 0 4px 0 rgba(0, 0, 0, 0.3); /* shadow strictly at bottom */
+        }
+
+        .active-frame > label {
+            font-weight: bold;
+            color: inherit; /* remove specific color */
+        }
+        """
+        css_provider.load_from_data(css)
+        style_context = dialog.get_style_context()
+        style_context.add_provider_for_screen(
+            Gdk.Screen.get_default(),
+            css_provider,
+            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+        )
+
+        # Highlight the active provider
+        def highlight_active(provider):
+            if provider == "openai":
+                openai_frame.get_style_context().add_class("active-frame")
+                gemini_frame.get_style_context().remove_class("active-frame")
+            else:
+                gemini_frame.get_style_context().add_class("active-frame")
+                openai_frame.get_style_context().remove_class("active-frame")
+
+        highlight_active(ACTIVE_PROVIDER)
+
+        # Update highlight when combo changes
+        def on_active_changed(combo):
+            highlight_active(combo.get_active_text())
+
+        active_combo.connect("changed", on_active_changed)
+
+        dialog.show_all()
+        response = dialog.run()
+
+        if response == Gtk.ResponseType.OK:
+            # Update active provider
+            ACTIVE_PROVIDER = active_combo.get_active_text()
+            CONFIG["active_provider"] = ACTIVE_PROVIDER
+
+            # Update OpenAI config
+            CONFIG["openai"]["model"] = openai_model_entry.get_text()
+            CONFIG["openai"]["api_key"] = openai_api_entry.get_text()
+            CONFIG["openai"]["backend"] = openai_backend_combo.get_active_text()
+
+            # Update Gemini config
+            CONFIG["gemini"]["model"] = gemini_model_entry.get_text()
+            CONFIG["gemini"]["api_key"] = gemini_api_entry.get_text()
+            CONFIG["gemini"]["backend"] = gemini_backend_combo.get_active_text()
+
+            try:
+                with open(CONFIG_FILE, "w") as f:
+                    json.dump(CONFIG, f, indent=2)
+            except Exception:
+                pass
+
+            # Point batch polling at the new Gemini key
+            if self.service.batch_runner:
+                self.service.batch_runner.gemini_client = self.service.gemini_client(CONFIG["gemini"]["api_key"])
+
+        dialog.destroy()
+
+    # -------------------------
+    # Gtk helpers
+    # -------------------------
+    def append_to_doc(self, doc, text, trace=None, queued=None):
+        # queued is (enqueue time, id) from the worker while tracing
+        if queued:
+            tracing.waited("idle_add", *queued)
+            start = tracing.now()
+        end_iter = doc.get_end_iter()
+        doc.insert(end_iter, text)
+        if trace:
+            trace.inserted()
+        if queued:
+            tracing.complete("append_to_doc", start, {"chars": len(text)})
+
+    def replace_range(self, doc, marks, text, trace=None):
+        """
+        Replaces the text between marks in one undo step (text None only
+        drops the marks).
+        """
+        if text is not None:
+            start, end = (doc.get_iter_at_mark(mark) for mark in marks)
+            doc.begin_user_action()
+            try:
+                doc.delete(start, end)
+                doc.insert(doc.get_iter_at_mark(marks[0]), text)
+            finally:
+                doc.end_user_action()
+            if trace:
+                trace.inserted()
+        for mark in marks:
+            doc.delete_mark(mark)
+        return False
+
+    # -------------------------
+    # Inline completion
+    # -------------------------
+    def schedule_completion(self):
+        settings = completion_config()
+        if settings["enabled"]:
+            self.completion_timer = GLib.timeout_add(int(settings["delay"] * 1000), self.request_completion)
+
+    def stop_completion(self):
+        """
+        Drops the pending timer, the request in flight and the ghost text.
+        """
+        if self.completion_timer:
+            GLib.source_remove(self.completion_timer)
+            self.completion_timer = None
+        if self.completion_cancel:
+            self.completion_cancel.cancel()
+            self.completion_cancel = None
+        self.completion_generation += 1
+        self.clear_ghost()
+
+    def request_completion(self):
+        """
+        Timer callback once typing paused: shows a cached suggestion or
+        starts a request for the text around the cursor.
+        """
+        self.completion_timer = None
+        doc = self.window.get_active_document()
+        if not doc or doc.get_has_selection():
+            return False
+        settings = completion_config()
+        cursor = doc.get_iter_at_mark(doc.get_insert())
+        offset = cursor.get_offset()
+        prefix = doc.get_text(doc.get_iter_at_offset(max(0, offset - settings["prefix_chars"])), cursor, True)
+        suffix = doc.get_text(cursor, doc.get_iter_at_offset(offset + settings["suffix_chars"]), True)
+        if not prefix.strip():
+            return False
+
+        generation = self.completion_generation
+        cached = self.service.suggestions.get(prefix, suffix)
+        if cached:
+            self.extend_ghost(doc, generation, cached)
+            return False
+
+        # Suggestions are silently skipped once the budget blocks requests;
+        # count what the daemon or other gedit instances spent first
+        self.service.ledger.refresh()
+        model, note = self.service.ledger.apply_budget(
+            CONFIG.get("budget"), ACTIVE_PROVIDER, current_model(ACTIVE_PROVIDER))
+        if model is None:
+            return False
+        trace = telemetry.RequestTrace(ACTIVE_PROVIDER, model, "completion")
+        trace.mark("key_press")
+        self.completion_cancel = CancelToken()
+        self.service.scheduler.submit(self.fetch_completion,
+                                      (doc, prefix, suffix, trace, self.completion_cancel, generation,
+                                       get_doc_path(doc)),
+                                      provider=ACTIVE_PROVIDER)
+        return False
+
+    def fetch_completion(self, doc, prefix, suffix, trace, cancel, generation, document=None):
+        trace.mark("worker_start")
+        if cancel.cancelled:
+            return
+        worker = self.service.get_worker(watch_worker) if self.service.worker_enabled() else None
+        options = dict(completion_options(completion_config()), cancel=cancel)
+        parts = []
+
+        def callback(event_type, data):
+            if event_type == "text":
+                trace.token()
+                parts.append(data)
+                if worker:
+                    self.extend_ghost(doc, generation, data, trace)
+                else:
+                    GObject.idle_add(self.extend_ghost, doc, generation, data, trace)
+            elif event_type == "usage":
+                if not (worker and worker.records_usage):
+                    self.service.ledger.add(trace.provider, trace.model, document, data)
+            elif event_type in ("error", "stall"):
+                trace.error = str(data)
+                GObject.idle_add(self.flash, f"Inline completion failed: {data}")
+
+        with tracing.span("fetch_completion", prefix_chars=len(prefix), suffix_chars=len(suffix)):
+            self.run_chat(worker, completion_prompt(prefix, suffix), callback, trace, document, options)
+
+        if cancel.cancelled:
+            return
+        if parts and not trace.error:
+            self.service.suggestions.put(prefix, suffix, "".join(parts))
+        GObject.idle_add(telemetry.record, trace)
+
+    def extend_ghost(self, doc, generation, text, trace=None):
+        """
+        Adds text to the ghost suggestion at the cursor, unless the user
+        has typed since it was requested. The suggestion is a label laid
+        over the view, so the buffer (its undo history, modified flag and
+        the indexes following its edits) never sees it.
+        """
+        view = self.window.get_active_view()
+        if (generation != self.completion_generation or doc is not self.window.get_active_document()
+                or view is None):
+            return False
+        if self.ghost is None:
+            label = Gtk.Label(xalign=0, yalign=0)
+            label.override_font(view.get_pango_context().get_font_description())
+            attributes = Pango.AttrList()
+            attributes.insert(Pango.attr_style_new(Pango.Style.ITALIC))
+            attributes.insert(Pango.attr_foreground_new(0x8000, 0x8000, 0x8000))
+            label.set_attributes(attributes)
+            # Text window children are placed in buffer coordinates and
+            # scroll with the text
+            location = view.get_iter_location(doc.get_iter_at_mark(doc.get_insert()))
+            view.add_child_in_window(label, Gtk.TextWindowType.TEXT, location.x, location.y)
+            label.show()
+            self.ghost = {
+                "doc": doc,
+                "view": view,
+                "label": label,
+                "text": "",
+                # A click moving the cursor drops the suggestion too
+                "cursor_id": doc.connect("notify::cursor-position", lambda *args: self.stop_completion()),
+            }
+        self.ghost["text"] += text
+        self.ghost["label"].set_text(self.ghost["text"])
+        if trace:
+            trace.inserted()
+        return False
+
+    def clear_ghost(self):
+        """
+        Removes the ghost text; returns what it said.
+        """
+        ghost, self.ghost = self.ghost, None
+        if ghost is None:
+            return ""
+        ghost["doc"].disconnect(ghost["cursor_id"])
+        ghost["view"].remove(ghost["label"])
+        return ghost["text"]
+
+    def accept_ghost(self):
+        """
+        Inserts the suggestion at the cursor as one undo step.
+        """
+        doc = self.ghost["doc"]
+        if self.completion_cancel:
+            self.completion_cancel.cancel()
+            self.completion_cancel = None
+        self.completion_generation += 1
+        text = self.clear_ghost()
+        doc.begin_user_action()
+        doc.insert_at_cursor(text)
+        doc.end_user_action()
+
+    def flash(self, message):
+        statusbar = self.window.get_statusbar()
+        statusbar.flash_message(statusbar.get_context_id("hello-gpt"), message)
+
+    def show_error(self, message):
+        dialog = Gtk.MessageDialog(
+            transient_for=self.window,
+            flags=0,
+            message_type=Gtk.MessageType.ERROR,
+            buttons=Gtk.ButtonsType.OK,
+            text="Error contacting GPT API"
+        )
+        dialog.format_secondary_text(message)
+        dialog.run()
+        dialog.destroy()
@@ -0,0 +1,71 @@
+# latency.py
+# Latency profiles: named presets for how long a model may think and talk.
+#
+# A profile is a provider-neutral dict turned into request parameters by
+# backends.openai_request() / gemini_request():
+#
+#   thinking_budget    Gemini thinkingConfig.thinkingBudget (0 = off where the model
+#                      allows it, -1 = dynamic)
+#   reasoning_effort   OpenAI reasoning_effort (reasoning models only)
+#   max_output_tokens  max_tokens / max_completion_tokens / maxOutputTokens
+#   temperature
+#   stop               stop sequences
+#
+# Unset keys leave the API's default. The profile of a request comes from
+# the modifier held with the shortcut, else the document's file extension
+# ("by_extension"), else "default"; plain requests use no profile unless
+# one of those is configured. Its name is kept on the request's trace, so
+# Alt+S shows latency per profile.
+import os
+
+from .engine import CONFIG
+
+PROFILE_KEYS = ("thinking_budget", "reasoning_effort", "max_output_tokens", "temperature", "stop")
+
+DEFAULT_PROFILES_CONFIG = {
+    # Profile for requests without a modifier or extension match
+    "default": None,
+    # Held together with Alt
+    "modifiers": {"shift": "instant", "control": "deep"},
+    # e.g. {".md": "instant"}
+    "by_extension": {},
+    "presets": {
+        "instant": {"thinking_budget": 0, "reasoning_effort": "low", "max_output_tokens": 1024,
+                    "temperature": 0.3},
+        "balanced": {"thinking_budget": 1024, "reasoning_effort": "medium", "max_output_tokens": 4096,
+                     "temperature": 0.7},
+        "deep": {"thinking_budget": -1, "reasoning_effort": "high", "max_output_tokens": 16384,
+                 "temperature": 0.7},
+    },
+}
+
+
+def profiles_config():
+    config = dict(DEFAULT_PROFILES_CONFIG)
+    config.update(CONFIG.get("profiles") or {})
+    presets = {name: dict(preset) for name, preset in DEFAULT_PROFILES_CONFIG["presets"].items()}
+    # A preset in the config file only needs the keys it changes
+    for name, preset in ((CONFIG.get("profiles") or {}).get("presets") or {}).items():
+        presets.setdefault(name, {}).update(preset)
+    config["presets"] = presets
+    return config
+
+def pick_profile(document=None, modifier=None):
+    """
+    The profile name for a request: the modifier's ("shift", "control"),
+    else the document extension's, else the default (None if unset).
+    """
+    config = profiles_config()
+    name = (config["modifiers"] or {}).get(modifier) if modifier else None
+    if not name and document:
+        extension = os.path.splitext(document)[1].lower()
+        name = (config["by_extension"] or {}).get(extension)
+    name = name or config["default"]
+    return name if name in config["presets"] else None
+
+def profile_options(name):
+    """
+    Request options for profile name (empty for None or an unknown name).
+    """
+    preset = profiles_config()["presets"].get(name) or {}
+    return {key: preset[key] for key in PROFILE_KEYS if preset.get(key) is not None}
@@ -0,0 +1,244 @@
+# ledger.py
+# Append-only token usage ledger with incrementally maintained rollups
+import os
+import json
+import time
+import fcntl
+import tempfile
+import threading
+
+# -------------------------
+# Pricing (USD per 1M tokens)
+# -------------------------
+# Overridable per model with a "pricing" section in the config. Models are
+# matched exactly first, then by the longest known prefix, so dated
+# snapshots such as gpt-4o-mini-2024-07-18 find their family price.
+DEFAULT_PRICING = {
+    "gpt-4o-mini": {"input": 0.15, "cached": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached": 1.25, "output": 10.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached": 0.025, "output": 0.40},
+    "gpt-4.1": {"input": 2.00, "cached": 0.50, "output": 8.00},
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached": 0.025, "output": 0.40},
+    "gemini-2.5-flash": {"input": 0.30, "cached": 0.075, "output": 2.50},
+    "gemini-2.5-pro": {"input": 1.25, "cached": 0.31, "output": 10.00},
+    # Embeddings (retrieval.py)
+    "text-embedding-3-small": {"input": 0.02, "output": 0.0},
+    "text-embedding-3-large": {"input": 0.13, "output": 0.0},
+    "gemini-embedding-001": {"input": 0.15, "output": 0.0},
+}
+
+# One compact JSON array per ledger line, in this order
+FIELDS = ("time", "provider", "model", "document", "prompt", "cached", "output", "reasoning", "cost")
+COUNTERS = ("requests", "prompt", "cached", "output", "reasoning", "cost")
+
+
+# -------------------------
+# Usage normalisation
+# -------------------------
+def openai_usage(usage):
+    """
+    Maps an OpenAI usage dict to prompt/cached/output/reasoning counts.
+    completion_tokens already includes the reasoning tokens, and the
+    rejected tokens of a predicted output. Requests with a prediction also
+    get "accepted"/"rejected" counts (shown, not kept in the ledger).
+    """
+    prompt_details = usage.get("prompt_tokens_details") or {}
+    completion_details = usage.get("completion_tokens_details") or {}
+    counts = {
+        "prompt": usage.get("prompt_tokens") or 0,
+        "cached": prompt_details.get("cached_tokens") or 0,
+        "output": usage.get("completion_tokens") or 0,
+        "reasoning": completion_details.get("reasoning_tokens") or 0,
+    }
+    accepted = completion_details.get("accepted_prediction_tokens") or 0
+    rejected = completion_details.get("rejected_prediction_tokens") or 0
+    if accepted or rejected:
+        counts.update(accepted=accepted, rejected=rejected)
+    return counts
+
+def openai_realtime_usage(usage):
+    """
+    Maps a Realtime API response.done usage dict (input/output tokens).
+    """
+    input_details = usage.get("input_token_details") or {}
+    return {
+        "prompt": usage.get("input_tokens") or 0,
+        "cached": input_details.get("cached_tokens") or 0,
+        "output": usage.get("output_tokens") or 0,
+        "reasoning": 0,
+    }
+
+def gemini_usage(usage):
+    """
+    Maps Gemini usageMetadata to prompt/cached/output/reasoning counts.
+    Thinking tokens are billed as output but reported separately by Gemini.
+    The Live API reports output as responseTokenCount.
+    """
+    thoughts = usage.get("thoughtsTokenCount") or 0
+    return {
+        "prompt": usage.get("promptTokenCount") or 0,
+        "cached": usage.get("cachedContentTokenCount") or 0,
+        "output": (usage.get("candidatesTokenCount") or usage.get("responseTokenCount") or 0) + thoughts,
+        "reasoning": thoughts,
+    }
+
+
+# -------------------------
+# Ledger
+# -------------------------
+class UsageLedger:
+    """
+    Appends one line per request to path and keeps per-day, per-month,
+    per-model and per-document totals in a rollup file next to it. The
+    rollup remembers how far into the ledger it has counted, so loading
+    only replays lines written after the last save. Several processes (the
+    plugin, the daemon, other gedit instances) may write: appends hold a
+    lock on the ledger file and first count what the others added.
+    """
+    def __init__(self, path, pricing=None):
+        self.path = path
+        self.rollup_path = os.path.splitext(path)[0] + "-rollup.json"
+        self.pricing = dict(DEFAULT_PRICING)
+        self.pricing.update(pricing or {})
+        self.lock = threading.Lock()
+        with self.lock:
+            self.rollup = self._load_rollup()
+            self._catch_up()
+
+    def _load_rollup(self):
+        try:
+            with open(self.rollup_path, "r") as f:
+                return json.load(f)
+        except Exception:
+            return {"offset": 0, "days": {}, "months": {}, "models": {}, "documents": {}}
+
+    def _save_rollup(self):
+        # A temp file of our own: another process may be saving too
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.rollup_path) + ".",
+                                            suffix=".tmp", dir=os.path.dirname(self.rollup_path) or ".")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.rollup, f, separators=(",", ":"))
+            os.replace(tmp_path, self.rollup_path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _catch_up(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.rollup["offset"])
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._apply(dict(zip(FIELDS, json.loads(line))))
+                    self.rollup["offset"] += len(line)
+        except (OSError, ValueError):
+            return
+        self._save_rollup()
+
+    def _apply(self, entry):
+        day = time.strftime("%Y-%m-%d", time.localtime(entry["time"]))
+        buckets = (
+            ("days", day), ("months", day[:7]),
+            ("models", f"{entry['provider']}/{entry['model']}"),
+            ("documents", entry["document"] or "untitled"),
+        )
+        for table, key in buckets:
+            totals = self.rollup[table].setdefault(key, dict.fromkeys(COUNTERS, 0))
+            totals["requests"] += 1
+            for name in COUNTERS[1:]:
+                totals[name] += entry[name]
+
+    def refresh(self):
+        """
+        Counts lines other processes (the daemon, other gedit instances)
+        appended since the last look.
+        """
+        with self.lock:
+            self._catch_up()
+
+    def price(self, model):
+        if model in self.pricing:
+            return self.pricing[model]
+        matches = [name for name in self.pricing if model.startswith(name)]
+        return self.pricing[max(matches, key=len)] if matches else None
+
+    def cost(self, model, usage):
+        price = self.price(model)
+        if not price:
+            return 0.0
+        uncached = max(usage["prompt"] - usage["cached"], 0)
+        return (uncached * price["input"]
+                + usage["cached"] * price.get("cached", price["input"])
+                + usage["output"] * price["output"]) / 1e6
+
+    def add(self, provider, model, document, usage):
+        """
+        Records one request and returns its ledger entry (with cost).
+        """
+        entry = dict(usage, time=round(time.time(), 3), provider=provider, model=model, document=document)
+        entry["cost"] = round(self.cost(model, usage), 8)
+        line = (json.dumps([entry[name] for name in FIELDS], separators=(",", ":")) + "\n").encode("utf-8")
+
+        with self.lock:
+            try:
+                with open(self.path, "ab") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    # Lines up to the end are the other writers'; count them
+                    # so the offset stays in step with the file
+                    self._catch_up()
+                    f.write(line)
+                    f.flush()
+                    self._apply(entry)
+                    self.rollup["offset"] += len(line)
+                    self._save_rollup()
+            except OSError:
+                return entry
+        return entry
+
+    def totals(self, table, key):
+        with self.lock:
+            return dict(self.rollup[table].get(key) or dict.fromkeys(COUNTERS, 0))
+
+    def month_spend(self):
+        return self.totals("months", time.strftime("%Y-%m"))["cost"]
+
+    def day_spend(self):
+        return self.totals("days", time.strftime("%Y-%m-%d"))["cost"]
+
+    def apply_budget(self, budget, provider, model):
+        """
+        Checks the "budget" config ({"monthly_usd", "daily_usd", "action",
+        "downgrade_model": {provider: model}}). Returns (model, message):
+        model is None when the request is blocked, or the cheaper model when
+        it was downgraded; message explains why, or is None within budget.
+        """
+        budget = budget or {}
+        exceeded = None
+        if budget.get("monthly_usd") is not None and self.month_spend() >= budget["monthly_usd"]:
+            exceeded = f"monthly budget of ${budget['monthly_usd']:.2f}"
+        elif budget.get("daily_usd") is not None and self.day_spend() >= budget["daily_usd"]:
+            exceeded = f"daily budget of ${budget['daily_usd']:.2f}"
+        if not exceeded:
+            return model, None
+
+        cheaper = (budget.get("downgrade_model") or {}).get(provider)
+        if budget.get("action") == "downgrade" and cheaper:
+            return cheaper, f"Spent the {exceeded}; using {cheaper} instead of {model}"
+        return None, f"Spent the {exceeded}; request blocked"
+
+
+def format_entry(entry, month_spend):
+    cached = f" ({entry['cached']} cached)" if entry["cached"] else ""
+    reasoning = f" incl. {entry['reasoning']} reasoning" if entry["reasoning"] else ""
+    prediction = (f" · prediction {entry['accepted']} accepted / {entry['rejected']} rejected"
+                  if "accepted" in entry else "")
+    return (f"{entry['model']}: {entry['prompt']} in{cached} / {entry['output']} out{reasoning} tokens"
+            f"{prediction} · ${entry['cost']:.4f} · this month ${month_spend:.2f}")
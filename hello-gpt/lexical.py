@@ -0,0 +1,315 @@
+# lexical.py
+# Questions about long documents ("lexical": {"enabled": true}).
+#
+# For a document over "min_chars", Alt+G does not send the whole buffer:
+# the question (the selection, else the last paragraph) is ranked with
+# BM25 against chunks of "chunk_lines" lines and only the best chunks that
+# fit the token budget are sent with it. No network or embeddings involved.
+#
+# The index follows the buffer's insert-text / delete-range signals. An
+# edit only adjusts the line counts of the chunks it touches and marks
+# them stale; stale chunks are re-tokenised in short idle slices once
+# typing pauses, or all at once before a query. A chunk's postings live in
+# a "slot": re-indexing it appends a new slot and kills the old one, so
+# posting lists are append-only arrays (slot ids and term frequencies),
+# compacted when dead postings outnumber live ones.
+import re
+import math
+import time
+import heapq
+from array import array
+from collections import Counter
+
+from .engine import CONFIG
+
+DEFAULT_LEXICAL_CONFIG = {
+    "enabled": False,
+    # Documents shorter than this are still sent whole
+    "min_chars": 200000,
+    "chunk_lines": 40,
+    "top_k": 12,
+    # Tokens of excerpts per question (estimated at 4 characters a token)
+    "token_budget": 6000,
+    # Characters of the last paragraph used as the question
+    "question_chars": 2000,
+    # Typing pause before stale chunks are re-indexed (seconds) and the
+    # longest an idle slice may run (ms)
+    "delay": 0.5,
+    "slice_ms": 8,
+    "instruction": "Answer the user's question about a long document. You are given excerpts of it, "
+                   "each headed by its line numbers, chosen by keyword search; cite line numbers and "
+                   "say so if the excerpts do not contain the answer.",
+}
+
+TOKEN = re.compile(r"\w+")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Compaction never runs below this many dead postings
+MIN_COMPACT = 65536
+
+
+def lexical_config():
+    config = dict(DEFAULT_LEXICAL_CONFIG)
+    config.update(CONFIG.get("lexical") or {})
+    return config
+
+def question_from(text, limit):
+    """
+    The last paragraph of text (after the last blank line), at most limit
+    characters.
+    """
+    text = text.rstrip()
+    start = max(text.rfind("\n\n"), text.rfind("\n\r\n"))
+    return text[start + 1:].strip()[-limit:]
+
+
+class ChunkIndex:
+    """
+    BM25 over the chunks of one buffer. Chunks are runs of lines in buffer
+    order; edits are reported by line (insert, delete) and chunk text is
+    read through get_lines(first_line, count) when a chunk is indexed.
+    Not thread-safe: the plugin uses it from the main loop only.
+    """
+    def __init__(self, get_lines, line_count, chunk_lines=40):
+        self.get_lines = get_lines
+        self.chunk_lines = max(1, chunk_lines)
+        self.reset(line_count)
+
+    def reset(self, line_count):
+        """
+        Drops all postings and lays out line_count lines as stale chunks.
+        """
+        full, rest = divmod(max(1, line_count), self.chunk_lines)
+        self.counts = array("I", [self.chunk_lines] * full + ([rest] if rest else []))
+        # Per chunk: its slot, or -1 while stale
+        self.slots = array("i", [-1] * len(self.counts))
+        self.stale = len(self.counts)
+        # Per slot: token count and whether it is still a chunk's
+        self.lengths = array("I")
+        self.alive = bytearray()
+        self.live_slots = 0
+        self.live_length = 0
+        # term -> (slot ids, term frequencies)
+        self.postings = {}
+        self.live_postings = 0
+        self.dead_postings = 0
+        # Per slot: its posting count, so killing it can update the totals
+        self.slot_terms = array("I")
+
+    def line_count(self):
+        return sum(self.counts)
+
+    def locate(self, line):
+        """
+        (chunk position, its first line) of the chunk holding line; the
+        last chunk for a line past the end.
+        """
+        first = 0
+        for position, count in enumerate(self.counts):
+            if line < first + count:
+                return position, first
+            first += count
+        return len(self.counts) - 1, first - self.counts[-1]
+
+    # -------------------------
+    # Edits
+    # -------------------------
+    def insert(self, line, added_lines):
+        """
+        Text was inserted on line, adding added_lines line breaks.
+        """
+        position, _ = self.locate(line)
+        self._invalidate(position)
+        if added_lines:
+            self.counts[position] += added_lines
+            self._split(position)
+
+    def delete(self, start_line, end_line):
+        """
+        The text from a point on start_line to one on end_line was deleted,
+        joining the two lines.
+        """
+        position, _ = self.locate(start_line)
+        self._invalidate(position)
+        # Lines start_line + 1 to end_line go; once a chunk has lost its
+        # share, the next one starts at the same line number
+        removed = end_line - start_line
+        line = start_line + 1
+        while removed > 0:
+            position, first = self.locate(line)
+            if line >= first + self.counts[position]:
+                # Past the end: the layout is out of step with the buffer
+                break
+            take = min(removed, first + self.counts[position] - line)
+            self.counts[position] -= take
+            removed -= take
+            self._invalidate(position)
+            if not self.counts[position] and len(self.counts) > 1:
+                self._remove(position)
+        # Chunks shrunk by deletes are merged with the next one
+        position, _ = self.locate(start_line)
+        if position + 1 < len(self.counts) and self.counts[position] + self.counts[position + 1] <= self.chunk_lines:
+            self._invalidate(position + 1)
+            self.counts[position] += self.counts[position + 1]
+            self._remove(position + 1)
+
+    def _remove(self, position):
+        # Only stale chunks are removed
+        del self.counts[position]
+        del self.slots[position]
+        self.stale -= 1
+
+    def _split(self, position):
+        # A chunk grown past twice the chunk size is cut into chunk_lines pieces
+        count = self.counts[position]
+        if count <= 2 * self.chunk_lines:
+            return
+        pieces = [self.chunk_lines] * (count // self.chunk_lines)
+        if count % self.chunk_lines:
+            pieces[-1] += count % self.chunk_lines
+        self.counts[position:position + 1] = array("I", pieces)
+        self.slots[position:position + 1] = array("i", [-1] * len(pieces))
+        self.stale += len(pieces) - 1
+
+    def _invalidate(self, position):
+        slot = self.slots[position]
+        if slot < 0:
+            return
+        self.alive[slot] = 0
+        self.live_slots -= 1
+        self.live_length -= self.lengths[slot]
+        self.live_postings -= self.slot_terms[slot]
+        self.dead_postings += self.slot_terms[slot]
+        self.slots[position] = -1
+        self.stale += 1
+
+    # -------------------------
+    # Indexing
+    # -------------------------
+    def _index(self, position, first):
+        terms = Counter(TOKEN.findall(self.get_lines(first, self.counts[position]).lower()))
+        slot = len(self.lengths)
+        for term, frequency in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = (array("I"), array("H"))
+            posting[0].append(slot)
+            posting[1].append(min(frequency, 65535))
+        length = sum(terms.values())
+        self.lengths.append(length)
+        self.alive.append(1)
+        self.slot_terms.append(len(terms))
+        self.slots[position] = slot
+        self.live_slots += 1
+        self.live_length += length
+        self.live_postings += len(terms)
+        self.stale -= 1
+
+    def refresh(self, budget=None):
+        """
+        Indexes stale chunks, for at most budget seconds when given.
+        Returns True once none are left.
+        """
+        deadline = time.perf_counter() + budget if budget is not None else None
+        first = 0
+        for position, count in enumerate(self.counts):
+            if not self.stale:
+                break
+            if self.slots[position] < 0:
+                self._index(position, first)
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+            first += count
+        if not self.stale and self.dead_postings > max(self.live_postings, MIN_COMPACT):
+            self.compact()
+        return not self.stale
+
+    def compact(self):
+        """
+        Drops the postings of dead slots and renumbers the live ones.
+        """
+        renumber = array("i", [-1] * len(self.lengths))
+        lengths = array("I")
+        slot_terms = array("I")
+        for slot, alive in enumerate(self.alive):
+            if alive:
+                renumber[slot] = len(lengths)
+                lengths.append(self.lengths[slot])
+                slot_terms.append(self.slot_terms[slot])
+        postings = {}
+        for term, (slots, frequencies) in self.postings.items():
+            kept = [(renumber[slot], frequency) for slot, frequency in zip(slots, frequencies) if renumber[slot] >= 0]
+            if kept:
+                postings[term] = (array("I", [slot for slot, _ in kept]), array("H", [f for _, f in kept]))
+        self.postings = postings
+        self.slots = array("i", [renumber[slot] if slot >= 0 else -1 for slot in self.slots])
+        self.lengths = lengths
+        self.slot_terms = slot_terms
+        self.alive = bytearray([1]) * len(lengths)
+        self.dead_postings = 0
+
+    # -------------------------
+    # Ranking
+    # -------------------------
+    def rank(self, question, top_k):
+        """
+        The top_k chunks for question as (score, first line, line count),
+        best first. Stale chunks are indexed first.
+        """
+        self.refresh()
+        if not self.live_slots:
+            return []
+        average = self.live_length / self.live_slots
+        alive = self.alive
+        lengths = self.lengths
+        scores = {}
+        for term in set(TOKEN.findall(question.lower())):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            matches = [(slot, frequency) for slot, frequency in zip(*posting) if alive[slot]]
+            if not matches:
+                continue
+            idf = math.log(1 + (self.live_slots - len(matches) + 0.5) / (len(matches) + 0.5))
+            for slot, frequency in matches:
+                norm = K1 * (1 - B + B * lengths[slot] / average)
+                scores[slot] = scores.get(slot, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        wanted = {slot: score for slot, score in best}
+        found = []
+        first = 0
+        for position, count in enumerate(self.counts):
+            if self.slots[position] in wanted:
+                found.append((wanted[self.slots[position]], first, count))
+            first += count
+        found.sort(key=lambda item: -item[0])
+        return found
+
+    def excerpts(self, question, top_k, token_budget, end_line=None):
+        """
+        The prompt for question: the best chunks that fit token_budget, in
+        document order, each headed by its (1-based) line numbers. Lines
+        from end_line on (where the question itself is) are left out.
+        """
+        budget = token_budget * 4
+        chosen = []
+        for score, first, count in self.rank(question, top_k + 1):
+            if end_line is not None:
+                count = min(count, end_line - first)
+            if count <= 0 or len(chosen) == top_k:
+                continue
+            text = self.get_lines(first, count)
+            if not text.strip() or len(text) > budget:
+                continue
+            budget -= len(text)
+            chosen.append((first, count, text))
+        parts = [f"--- lines {first + 1}-{first + count} ---\n{text.rstrip()}\n"
+                 for first, count, text in sorted(chosen)]
+        return "Excerpts of the document:\n\n" + "\n".join(parts) + f"\n---\n\nQuestion: {question}"
+
+    def describe(self):
+        return (f"{len(self.counts)} chunks ({self.stale} stale), {len(self.postings)} terms, "
+                f"{self.live_postings} postings ({self.dead_postings} dead)")
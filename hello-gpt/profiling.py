@@ -0,0 +1,170 @@
+# profiling.py
+# Opt-in cProfile and tracemalloc capture of single requests.
+#
+# The worker thread runs under one cProfile profiler and the main-thread
+# inserts for the same request under another, while tracemalloc compares
+# snapshots taken before and after the stream. Each request gets a text
+# report (top-N functions and allocation sites) plus a .prof file of the
+# worker that snakeviz or pstats can open.
+import io
+import os
+import re
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+
+# -------------------------
+# Settings
+# -------------------------
+ENABLED = False
+ARMED = False
+TOP_N = 25
+MEMORY = True
+OUTPUT_DIR = None
+_lock = threading.Lock()
+
+
+def configure(settings, default_dir):
+    """
+    Applies the "profiling" config section ({"enabled", "top", "memory", "dir"}).
+    """
+    global ENABLED, TOP_N, MEMORY, OUTPUT_DIR
+    settings = settings or {}
+    ENABLED = bool(settings.get("enabled"))
+    TOP_N = settings.get("top", TOP_N)
+    MEMORY = settings.get("memory", MEMORY)
+    OUTPUT_DIR = settings.get("dir") or default_dir
+
+def arm():
+    """
+    Profiles the next request only.
+    """
+    global ARMED
+    ARMED = True
+
+def take(label, name):
+    """
+    Returns a started RequestProfile when every request is profiled or the
+    next one was armed, otherwise None. name ends up in the report file name.
+    """
+    global ARMED
+    with _lock:
+        if not (ENABLED or ARMED):
+            return None
+        ARMED = False
+    try:
+        return RequestProfile(label, name).start()
+    except ValueError:
+        # Another profiler is already running (Python 3.12+ allows one)
+        return None
+
+
+# -------------------------
+# One profiled request
+# -------------------------
+class RequestProfile:
+    def __init__(self, label, name):
+        self.label = label
+        self.name = name
+        self.worker = cProfile.Profile()
+        self.main = cProfile.Profile()
+        self.main_calls = 0
+        self.main_error = None
+        self.started = None
+        self.wall = None
+        self.owns_tracemalloc = False
+        self.before = self.after = None
+        self.peak = None
+
+    def start(self):
+        if MEMORY:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.owns_tracemalloc = True
+            tracemalloc.reset_peak()
+            self.before = tracemalloc.take_snapshot()
+        self.started = time.monotonic()
+        try:
+            self.worker.enable()
+        except ValueError:
+            if self.owns_tracemalloc:
+                tracemalloc.stop()
+            raise
+        return self
+
+    def stop(self):
+        """
+        Called on the worker thread once the stream has finished.
+        """
+        self.worker.disable()
+        self.wall = time.monotonic() - self.started
+        if self.before is not None:
+            self.after = tracemalloc.take_snapshot()
+            self.peak = tracemalloc.get_traced_memory()[1]
+            if self.owns_tracemalloc:
+                tracemalloc.stop()
+
+    def run_main(self, func, *args):
+        """
+        idle_add target that runs func on the main loop under the main-thread
+        profiler. Python 3.12+ allows one active profiler per process, so
+        main-thread work goes unprofiled there while the worker's is active.
+        """
+        if self.main_error is None:
+            try:
+                self.main.enable()
+            except ValueError as e:
+                self.main_error = str(e)
+        try:
+            func(*args)
+        finally:
+            if self.main_error is None:
+                self.main.disable()
+            self.main_calls += 1
+        return False
+
+    # -------------------------
+    # Reports
+    # -------------------------
+    def report(self, top_n=None):
+        top_n = top_n or TOP_N
+        out = io.StringIO()
+        out.write(f"Request: {self.label}\n")
+        out.write(f"Wall time: {self.wall:.3f}s\n")
+        if self.peak is not None:
+            out.write(f"Peak traced memory: {self.peak / 1024:.1f} KiB\n")
+
+        out.write("\n=== Worker thread (cumulative) ===\n")
+        pstats.Stats(self.worker, stream=out).sort_stats("cumulative").print_stats(top_n)
+        out.write("\n=== Worker thread (own time) ===\n")
+        pstats.Stats(self.worker, stream=out).sort_stats("tottime").print_stats(top_n)
+
+        out.write(f"\n=== Main thread inserts ({self.main_calls} callbacks) ===\n")
+        if self.main_error:
+            out.write(f"Not profiled: {self.main_error}\n")
+        elif self.main_calls:
+            pstats.Stats(self.main, stream=out).sort_stats("tottime").print_stats(top_n)
+
+        if self.after is not None:
+            out.write("\n=== Allocations during the request (by line) ===\n")
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+            after = self.after.filter_traces(filters)
+            before = self.before.filter_traces(filters)
+            for stat in after.compare_to(before, "lineno")[:top_n]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def write(self, directory=None):
+        """
+        Writes <stamp>-<name>.txt and .prof and returns the text path.
+        """
+        directory = directory or OUTPUT_DIR
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.name)[:60]
+        base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}")
+        with open(base + ".txt", "w") as f:
+            f.write(self.report())
+        self.worker.dump_stats(base + ".prof")
+        return base + ".txt"
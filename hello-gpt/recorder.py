@@ -0,0 +1,246 @@
+# recorder.py
+# Opt-in recording of provider streams for offline replay.
+#
+# While recording, every streaming request of the stdlib (urllib) and SDK
+# (httpx) backends is saved as one JSON file: method, URL and headers with
+# API keys redacted, the request body, the response status and headers,
+# and the response body as a list of [seconds since the request was sent,
+# data] chunks. A chunk is what one read from the socket delivered, so a
+# file keeps the provider's real chunking and pacing, not only its events.
+# tools/mock_server.py --replay plays the files back at their recorded
+# pace or faster (--replay-speed), which makes benchmark runs on real
+# streams repeatable offline.
+#
+# Chunk data is stored as text; bytes that are not UTF-8 on their own (a
+# character split between two reads) are kept as surrogate escapes, so
+# decode() gives back the exact bytes. Realtime WebSocket sessions are not
+# recorded.
+import io
+import os
+import json
+import time
+import itertools
+import threading
+import urllib.error
+import urllib.parse
+
+# -------------------------
+# Settings
+# -------------------------
+ENABLED = False
+OUTPUT_DIR = None
+_counter = itertools.count(1)
+_lock = threading.Lock()
+
+# Headers and query parameters that carry credentials
+SECRET_HEADERS = ("authorization", "x-goog-api-key", "api-key", "openai-organization", "openai-project",
+                  "cookie", "set-cookie")
+SECRET_PARAMS = ("key", "api_key")
+REDACTED = "REDACTED"
+
+
+def configure(settings, default_dir):
+    """
+    Applies the "recording" config section ({"enabled", "dir"}).
+    """
+    global OUTPUT_DIR
+    settings = settings or {}
+    OUTPUT_DIR = settings.get("dir") or default_dir
+    if settings.get("enabled"):
+        enable()
+
+def enable(path=None):
+    global ENABLED, OUTPUT_DIR
+    if path:
+        OUTPUT_DIR = path
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def redact_url(url):
+    parts = urllib.parse.urlsplit(url)
+    query = [(name, REDACTED if name in SECRET_PARAMS else value)
+             for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query, safe=":")))
+
+def redact_headers(headers):
+    return [[name, REDACTED if name.lower() in SECRET_HEADERS else value] for name, value in headers]
+
+def encode(data):
+    return data.decode("utf-8", "surrogateescape")
+
+def decode(text):
+    return text.encode("utf-8", "surrogateescape")
+
+
+class Recording:
+    """
+    One request and its streamed response, written to OUTPUT_DIR by
+    finish(). Fed from the thread that reads the stream.
+    """
+    def __init__(self, provider, backend, method, url, headers, body):
+        self.start = time.monotonic()
+        try:
+            body = json.loads(body) if body else None
+        except ValueError:
+            body = encode(body)
+        self.record = {"provider": provider, "backend": backend, "time": time.time(),
+                       "request": {"method": method, "url": redact_url(url),
+                                   "headers": redact_headers(headers), "body": body},
+                       "status": None, "headers": [], "chunks": [], "error": None}
+        self.done = False
+
+    def response(self, status, headers):
+        self.record["status"] = status
+        self.record["headers"] = redact_headers(headers)
+
+    def chunk(self, data, at=None):
+        """
+        data arrived at at (time.monotonic(), default now).
+        """
+        self.record["chunks"].append([round((at or time.monotonic()) - self.start, 6), encode(data)])
+
+    def append(self, data):
+        # More of the last chunk's bytes, read from the same socket read
+        if not self.record["chunks"]:
+            return self.chunk(data)
+        self.record["chunks"][-1][1] += encode(data)
+
+    def finish(self, error=None):
+        if self.done:
+            return
+        self.done = True
+        self.record["error"] = error
+        with _lock:
+            number = next(_counter)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{number:04d}-{self.record['provider']}.json"
+        try:
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            with open(os.path.join(OUTPUT_DIR, name), "w") as f:
+                json.dump(self.record, f, indent=1)
+        except OSError:
+            pass
+
+
+# -------------------------
+# urllib (stdlib backend)
+# -------------------------
+def record_response(provider, request, response):
+    """
+    Records response, the open stream for a urllib request, as the stdlib
+    backend reads it. A new chunk starts with each read of the socket;
+    response.close() writes the file.
+    """
+    recording = Recording(provider, "stdlib", request.get_method(), request.full_url,
+                          request.header_items(), request.data)
+    recording.response(response.status, response.getheaders())
+    # Time of the last socket read whose bytes were not handed out yet
+    arrived = [None]
+    raw = getattr(response.fp, "raw", None)
+    if raw is not None:
+        readinto = raw.readinto
+
+        def timed_readinto(buffer):
+            count = readinto(buffer)
+            arrived[0] = time.monotonic()
+            return count
+        raw.readinto = timed_readinto
+
+    read = response.read
+    close = response.close
+
+    def recorded_read(*args):
+        data = read(*args)
+        if data:
+            if arrived[0] is not None:
+                recording.chunk(data, arrived[0])
+                arrived[0] = None
+            else:
+                recording.append(data)
+        return data
+
+    def recorded_close():
+        recording.finish()
+        close()
+
+    response.read = recorded_read
+    response.close = recorded_close
+    return response
+
+def record_http_error(provider, request, error):
+    """
+    Records an HTTP error reply and returns an equivalent HTTPError whose
+    body can still be read.
+    """
+    recording = Recording(provider, "stdlib", request.get_method(), request.full_url,
+                          request.header_items(), request.data)
+    try:
+        body = error.read()
+    except OSError:
+        body = b""
+    recording.response(error.code, list(error.headers.items()) if error.headers else [])
+    if body:
+        recording.chunk(body)
+    recording.finish()
+    return urllib.error.HTTPError(error.url, error.code, error.reason, error.headers, io.BytesIO(body))
+
+
+# -------------------------
+# httpx (SDK backends)
+# -------------------------
+def httpx_transport(provider, transport=None):
+    """
+    An httpx transport recording the requests sent through it, for the
+    SDK clients; wraps transport (default: a new httpx.HTTPTransport).
+    """
+    import httpx
+
+    class RecordingStream(httpx.SyncByteStream):
+        def __init__(self, stream, recording):
+            self.stream = stream
+            self.recording = recording
+
+        def __iter__(self):
+            try:
+                # httpx yields what each socket read delivered
+                for data in self.stream:
+                    self.recording.chunk(data)
+                    yield data
+            except Exception as e:
+                self.recording.finish(str(e))
+                raise
+
+        def close(self):
+            try:
+                self.stream.close()
+            finally:
+                self.recording.finish()
+
+    class RecordingTransport(httpx.BaseTransport):
+        def __init__(self, transport):
+            self.transport = transport
+
+        def handle_request(self, request):
+            try:
+                body = request.content
+            except httpx.RequestNotRead:
+                body = b""
+            recording = Recording(provider, "sdk", request.method, str(request.url),
+                                  request.headers.multi_items(), body)
+            try:
+                response = self.transport.handle_request(request)
+            except Exception as e:
+                recording.finish(str(e))
+                raise
+            recording.response(response.status_code, response.headers.multi_items())
+            return httpx.Response(response.status_code, headers=response.headers,
+                                  stream=RecordingStream(response.stream, recording),
+                                  extensions=response.extensions)
+
+        def close(self):
+            self.transport.close()
+
+    return RecordingTransport(transport or httpx.HTTPTransport())
+
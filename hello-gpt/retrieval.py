@@ -0,0 +1,506 @@
+# retrieval.py
+# Project-aware context from a local embedding index ("retrieval":
+# {"enabled": true}).
+#
+# The files of the document's project (the nearest parent directory with a
+# .git, pyproject.toml, ... marker; without one, only the files next to the
+# document, not its subdirectories) are cut into chunks of whole lines and
+# embedded through the provider's embeddings endpoint. Vectors are kept
+# normalised in a flat float32 file, memory-mapped for queries, next to a
+# JSON manifest with each file's mtime, size, content hash and rows. A
+# rescan only re-embeds files whose hash changed, and the plugin re-embeds
+# a file when it is saved. Each request embeds the end of the document and
+# prepends the best-scoring chunks of other files that fit the token
+# budget. Building runs on a background thread (plus a small pool for the
+# embedding calls); requests made before the index is ready go without
+# context.
+#
+# Scoring uses numpy when it is importable, else math.sumprod (3.12+) or a
+# plain loop over the mapped floats.
+import os
+import json
+import math
+import mmap
+import time
+import array
+import heapq
+import hashlib
+import operator
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .engine import CONFIG, provider_config
+
+DEFAULT_RETRIEVAL_CONFIG = {
+    "enabled": False,
+    # Embedding provider; default: the active provider
+    "provider": None,
+    "models": {"openai": "text-embedding-3-small", "gemini": "gemini-embedding-001"},
+    "dimensions": 256,
+    "top_k": 6,
+    # Tokens of context per request (estimated at 4 characters a token)
+    "token_budget": 2000,
+    # Characters of the document (from its end) the query embeds
+    "query_chars": 2000,
+    "chunk_chars": 1500,
+    "batch_size": 64,
+    "workers": 4,
+    "max_file_bytes": 262144,
+    "max_files": 20000,
+    "exclude_dirs": [".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", "build", "dist",
+                     ".tox", ".mypy_cache", ".cache", "target"],
+}
+
+PROJECT_MARKERS = (".git", ".hg", "pyproject.toml", "setup.py", "package.json", "Cargo.toml", "go.mod",
+                   "Makefile", "meson.build")
+
+OPENAI_BASE_URL = "https://api.openai.com/v1/"
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/"
+
+# Manifest saves while building, at most this often (seconds)
+SAVE_INTERVAL = 2.0
+
+
+def retrieval_config():
+    config = dict(DEFAULT_RETRIEVAL_CONFIG)
+    config.update(CONFIG.get("retrieval") or {})
+    config["provider"] = (config["provider"] or CONFIG.get("active_provider", "openai")).lower()
+    return config
+
+def index_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "hello-gpt", "index")
+
+def project_root(path):
+    """
+    (directory, recursive): the nearest parent directory of path with a
+    project marker, indexed with its subdirectories; else the file's own
+    directory, indexed without them (a file in ~ or /tmp must not index
+    everything below it).
+    """
+    directory = start = os.path.dirname(os.path.abspath(path))
+    while True:
+        if any(os.path.exists(os.path.join(directory, marker)) for marker in PROJECT_MARKERS):
+            return directory, True
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return start, False
+        directory = parent
+
+
+# -------------------------
+# Embeddings
+# -------------------------
+class EmbeddingError(Exception):
+    pass
+
+
+def post_json(url, body, headers, retries=3):
+    """
+    POSTs body and returns the decoded reply, retrying rate limits, server
+    errors and connection failures with backoff.
+    """
+    data = json.dumps(body).encode("utf-8")
+    for attempt in range(retries + 1):
+        request = urllib.request.Request(url, data=data, headers=dict(headers, **{"Content-Type": "application/json"}))
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code not in (429, 500, 502, 503, 504) or attempt == retries:
+                raise EmbeddingError(f"Embedding request failed: HTTP {e.code} {e.reason}")
+        except (urllib.error.URLError, OSError) as e:
+            if attempt == retries:
+                raise EmbeddingError(f"Embedding request failed: {e}")
+        time.sleep(2 ** attempt)
+
+def embed(texts, settings, query=False):
+    """
+    Returns (normalised vectors, prompt tokens) for texts. Gemini does not
+    report embedding usage, so its tokens are estimated.
+    """
+    provider = settings["provider"]
+    model = settings["models"][provider]
+    section = provider_config(provider)
+    api_key = section.get("api_key")
+    if not api_key:
+        raise EmbeddingError(f"{provider.capitalize()} API key is missing")
+
+    if provider == "openai":
+        body = {"model": model, "input": texts}
+        if model.startswith("text-embedding-3"):
+            body["dimensions"] = settings["dimensions"]
+        reply = post_json(f"{section.get('base_url', OPENAI_BASE_URL).rstrip('/')}/embeddings", body,
+                          {"Authorization": f"Bearer {api_key}"})
+        vectors = [item["embedding"] for item in sorted(reply["data"], key=lambda item: item["index"])]
+        tokens = (reply.get("usage") or {}).get("prompt_tokens") or 0
+    else:
+        task = "RETRIEVAL_QUERY" if query else "RETRIEVAL_DOCUMENT"
+        body = {"requests": [{"model": f"models/{model}", "content": {"parts": [{"text": text}]},
+                              "taskType": task, "outputDimensionality": settings["dimensions"]}
+                             for text in texts]}
+        base_url = section.get("base_url", GEMINI_BASE_URL).rstrip("/")
+        reply = post_json(f"{base_url}/v1beta/models/{model}:batchEmbedContents?key={api_key}", body, {})
+        vectors = [item["values"] for item in reply["embeddings"]]
+        tokens = sum(len(text) for text in texts) // 4
+
+    if len(vectors) != len(texts) or any(len(vector) != settings["dimensions"] for vector in vectors):
+        raise EmbeddingError("Embedding reply does not match the request (model or dimensions)")
+    return [normalise(vector) for vector in vectors], tokens
+
+def normalise(vector):
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+# -------------------------
+# Chunking
+# -------------------------
+def read_text(path, max_bytes):
+    """
+    (text, sha1 of the bytes) of a text file, or None for binary or
+    oversized files.
+    """
+    with open(path, "rb") as f:
+        data = f.read(max_bytes + 1)
+    if len(data) > max_bytes or b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", "replace"), hashlib.sha1(data).hexdigest()
+
+def chunk_text(text, chunk_chars):
+    """
+    Yields (start, end, first line, last line) of chunks of whole lines of
+    about chunk_chars characters; a longer line is a chunk of its own.
+    """
+    start = size = 0
+    line = first_line = 1
+    offset = 0
+    for piece in text.splitlines(keepends=True):
+        if size and size + len(piece) > chunk_chars:
+            yield start, offset, first_line, line - 1
+            start, size, first_line = offset, 0, line
+        size += len(piece)
+        offset += len(piece)
+        line += 1
+    if text[start:].strip():
+        yield start, len(text), first_line, line - 1
+
+
+# -------------------------
+# Index
+# -------------------------
+class ProjectIndex:
+    """
+    The embedding index of one project directory (its top level only
+    unless recursive). build() and update_files() may run on any thread;
+    context() is called from request threads and answers from whatever has
+    been indexed so far.
+    """
+    def __init__(self, root, settings=None, on_usage=None, recursive=True):
+        self.root = root
+        self.recursive = recursive
+        self.settings = settings or retrieval_config()
+        self.on_usage = on_usage
+        self.dimensions = self.settings["dimensions"]
+        self.path = os.path.join(index_dir(), hashlib.sha1(root.encode("utf-8")).hexdigest()[:16])
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = False
+        self.error = None
+        self.stats = {"build_s": None, "files_embedded": 0, "chunks_embedded": 0, "last_query_s": None}
+        self.last_save = 0.0
+        self._map = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            expected = self.dimensions * 4 * len(manifest["chunks"])
+            if (manifest["model"] != self.model() or manifest["dimensions"] != self.dimensions
+                    or os.path.getsize(self.vectors_path) < expected):
+                raise ValueError("stale index")
+            # Rows appended after the last manifest save; their files still
+            # have their old hashes, so the rescan embeds them again
+            os.truncate(self.vectors_path, expected)
+        except (OSError, ValueError, KeyError):
+            manifest = {"model": self.model(), "dimensions": self.dimensions, "files": {}, "chunks": []}
+            os.makedirs(self.path, exist_ok=True)
+            open(self.vectors_path, "wb").close()
+        self.manifest = manifest
+        # An index from an earlier session answers queries while it is rescanned
+        self.complete = bool(manifest["files"])
+
+    def model(self):
+        return f"{self.settings['provider']}/{self.settings['models'][self.settings['provider']]}"
+
+    def _save(self, force=False):
+        if not force and time.monotonic() - self.last_save < SAVE_INTERVAL:
+            return
+        self.last_save = time.monotonic()
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, separators=(",", ":"))
+        os.replace(tmp_path, self.manifest_path)
+
+    def ready(self):
+        return self.complete and bool(self.manifest["files"])
+
+    def building(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    # -------------------------
+    # Building
+    # -------------------------
+    def start(self):
+        """
+        Starts a background rescan unless one is running.
+        """
+        with self.lock:
+            if self.building() or self.stopped:
+                return
+            self.thread = threading.Thread(target=self.build, name="hello-gpt-index", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+
+    def walk(self):
+        exclude = set(self.settings["exclude_dirs"])
+        count = 0
+        for directory, dirs, files in os.walk(self.root):
+            if self.recursive:
+                dirs[:] = sorted(d for d in dirs if d not in exclude and not d.startswith("."))
+            else:
+                dirs[:] = []
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue
+                yield os.path.relpath(os.path.join(directory, name), self.root)
+                count += 1
+                if count >= self.settings["max_files"]:
+                    return
+
+    def build(self):
+        """
+        Rescans the project: embeds new and changed files, drops deleted ones.
+        """
+        start = time.monotonic()
+        self.error = None
+        try:
+            seen = set()
+            batch = []
+            for relpath in self.walk():
+                if self.stopped:
+                    return
+                seen.add(relpath)
+                batch.append(relpath)
+                if len(batch) >= 256:
+                    self.update_files(batch)
+                    batch = []
+            self.update_files(batch)
+            with self.lock:
+                for relpath in [p for p in self.manifest["files"] if p not in seen]:
+                    self._drop(relpath)
+                self._compact()
+                self._save(force=True)
+            self.complete = True
+        except EmbeddingError as e:
+            self.error = str(e)
+        self.stats["build_s"] = time.monotonic() - start
+
+    def update_files(self, relpaths):
+        """
+        Re-embeds the files (relative to the root) whose content changed
+        since they were indexed.
+        """
+        changed = []
+        for relpath in relpaths:
+            path = os.path.join(self.root, relpath)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                with self.lock:
+                    self._drop(relpath)
+                continue
+            with self.lock:
+                entry = self.manifest["files"].get(relpath)
+                if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    continue
+            try:
+                result = read_text(path, self.settings["max_file_bytes"])
+            except OSError:
+                continue
+            if result is None:
+                continue
+            text, digest = result
+            if entry and entry["hash"] == digest:
+                with self.lock:
+                    entry["mtime"], entry["size"] = stat.st_mtime_ns, stat.st_size
+                continue
+            changed.append((relpath, text, digest, stat))
+        if changed:
+            self._embed_files(changed)
+
+    def _embed_files(self, files):
+        chunks = []
+        for relpath, text, digest, stat in files:
+            for start, end, first_line, last_line in chunk_text(text, self.settings["chunk_chars"]):
+                # The path helps match "where is X defined" queries
+                chunks.append((relpath, start, end, first_line, last_line, f"{relpath}\n{text[start:end]}"))
+
+        size = max(1, self.settings["batch_size"])
+        batches = [chunks[i:i + size] for i in range(0, len(chunks), size)]
+        with ThreadPoolExecutor(max_workers=max(1, self.settings["workers"])) as pool:
+            results = list(pool.map(lambda batch: embed([c[5] for c in batch], self.settings), batches))
+
+        with self.lock:
+            rows = {}
+            with open(self.vectors_path, "ab") as f:
+                for batch, (vectors, tokens) in zip(batches, results):
+                    for chunk, vector in zip(batch, vectors):
+                        f.write(array.array("f", vector).tobytes())
+                        rows.setdefault(chunk[0], []).append(len(self.manifest["chunks"]))
+                        self.manifest["chunks"].append(list(chunk[:5]))
+                    if self.on_usage:
+                        self.on_usage(self.settings["provider"], self.settings["models"][self.settings["provider"]],
+                                      {"prompt": tokens, "cached": 0, "output": 0, "reasoning": 0})
+            for relpath, text, digest, stat in files:
+                self._drop(relpath)
+                self.manifest["files"][relpath] = {"mtime": stat.st_mtime_ns, "size": stat.st_size,
+                                                   "hash": digest, "rows": rows.get(relpath, [])}
+            self.stats["files_embedded"] += len(files)
+            self.stats["chunks_embedded"] += len(chunks)
+            self._save()
+
+    def _drop(self, relpath):
+        # Rows stay in the vector file as tombstones until _compact()
+        entry = self.manifest["files"].pop(relpath, None)
+        for row in (entry or {}).get("rows", []):
+            self.manifest["chunks"][row] = None
+
+    def _compact(self):
+        """
+        Rewrites the vector file without dead rows once they are the majority.
+        """
+        chunks = self.manifest["chunks"]
+        live = [row for row, chunk in enumerate(chunks) if chunk is not None]
+        if len(chunks) < 1024 or len(live) * 2 > len(chunks):
+            return
+        width = self.dimensions * 4
+        renumber = {}
+        tmp_path = self.vectors_path + ".tmp"
+        with open(self.vectors_path, "rb") as src, open(tmp_path, "wb") as dst:
+            for row in live:
+                src.seek(row * width)
+                dst.write(src.read(width))
+                renumber[row] = len(renumber)
+        os.replace(tmp_path, self.vectors_path)
+        self.manifest["chunks"] = [chunks[row] for row in live]
+        for entry in self.manifest["files"].values():
+            entry["rows"] = [renumber[row] for row in entry["rows"]]
+        self._unmap()
+
+    # -------------------------
+    # Querying
+    # -------------------------
+    def _vectors(self):
+        """
+        The vector file mapped into memory, remapped when it has grown.
+        Call with the lock held.
+        """
+        size = os.path.getsize(self.vectors_path)
+        if self._map is None or len(self._map) != size:
+            self._unmap()
+            if not size:
+                return None
+            with open(self.vectors_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def search(self, vector, top_k, exclude=None):
+        """
+        The top_k (score, chunk, hash of its file) triples over live rows,
+        best first. Scores are computed under the lock, so _compact() can
+        neither renumber the rows nor unmap the vectors meanwhile.
+        """
+        with self.lock:
+            mapped = self._vectors()
+            if mapped is None:
+                return []
+            chunks = self.manifest["chunks"]
+            best = self._score(mapped, chunks, vector, top_k, exclude)
+            return [(score, chunks[row], self.manifest["files"][chunks[row][0]]["hash"]) for score, row in best]
+
+    def _score(self, mapped, chunks, vector, top_k, exclude):
+        count = len(chunks)
+        width = self.dimensions
+        if numpy is not None:
+            matrix = numpy.frombuffer(mapped, dtype=numpy.float32, count=count * width).reshape(count, width)
+            scores = (matrix @ numpy.asarray(vector, dtype=numpy.float32)).tolist()
+        else:
+            flat = memoryview(mapped).cast("f")
+            dot = getattr(math, "sumprod", None) or (lambda a, b: sum(map(operator.mul, a, b)))
+            scores = [dot(vector, flat[row * width:(row + 1) * width]) for row in range(count)]
+        live = ((score, row) for row, score in enumerate(scores)
+                if chunks[row] is not None and chunks[row][0] != exclude)
+        return heapq.nlargest(top_k, live)
+
+    def context(self, text, exclude=None):
+        """
+        The prompt prefix for a request about text: the best chunks of
+        other files within the token budget, or "" if nothing fits.
+        """
+        start = time.monotonic()
+        vectors, tokens = embed([text[-self.settings["query_chars"]:]], self.settings, query=True)
+        if self.on_usage:
+            self.on_usage(self.settings["provider"], self.settings["models"][self.settings["provider"]],
+                          {"prompt": tokens, "cached": 0, "output": 0, "reasoning": 0})
+        budget = self.settings["token_budget"] * 4
+        parts = []
+        for score, chunk, digest in self.search(vectors[0], self.settings["top_k"], exclude):
+            relpath, chunk_start, chunk_end, first_line, last_line = chunk
+            # Read as when it was chunked, so the offsets fit (no newline
+            # translation)
+            try:
+                result = read_text(os.path.join(self.root, relpath), self.settings["max_file_bytes"])
+            except OSError:
+                continue
+            if result is None or result[1] != digest:
+                # Changed since it was embedded; the offsets no longer fit
+                continue
+            chunk = result[0][chunk_start:chunk_end]
+            block = f"--- {relpath} (lines {first_line}-{last_line}) ---\n{chunk.rstrip()}\n"
+            if len(block) > budget:
+                continue
+            budget -= len(block)
+            parts.append(block)
+        self.stats["last_query_s"] = time.monotonic() - start
+        if not parts:
+            return ""
+        return "Relevant parts of other files in this project:\n\n" + "\n".join(parts) + "\n---\n\n"
+
+    def describe(self):
+        files = len(self.manifest["files"])
+        chunks = sum(1 for chunk in self.manifest["chunks"] if chunk is not None)
+        state = "indexing" if self.building() else (f"error: {self.error}" if self.error else "ready")
+        timings = ""
+        if self.stats["build_s"] is not None:
+            timings += f" build {self.stats['build_s']:.1f}s"
+        if self.stats["last_query_s"] is not None:
+            timings += f" query {self.stats['last_query_s'] * 1000:.0f}ms"
+        return f"index {os.path.basename(self.root)}: {files} files {chunks} chunks {state}{timings}"
@@ -0,0 +1,170 @@
+# scheduler.py
+# Orders and limits GPT requests across all windows.
+#
+# Jobs run on their own daemon threads once a slot is free under both the
+# global cap and their provider's cap. Waiting jobs are started by priority
+# class, then in arrival order, so an interactive request goes ahead of any
+# queued background or batch work; running jobs are never interrupted.
+# Jobs carry an optional key (the document): a new job replaces a waiting
+# one with the same key, and one whose key is still streaming is dropped
+# (or, with "on_duplicate": "queue", waits for it to finish).
+import time
+import bisect
+import itertools
+import threading
+from collections import deque
+
+from .telemetry import percentile
+from . import tracing
+
+# -------------------------
+# Settings
+# -------------------------
+PRIORITIES = {"interactive": 0, "background": 1, "batch": 2}
+
+DEFAULT_SCHEDULER_CONFIG = {
+    "max_concurrent": 4,
+    "per_provider": {"openai": 2, "gemini": 2},
+    "on_duplicate": "drop",
+}
+
+# Recent queue waits kept for the percentiles
+WAIT_HISTORY = 256
+
+
+class Job:
+    __slots__ = ("func", "args", "provider", "key", "priority", "queued")
+
+    def __init__(self, func, args, provider, key, priority):
+        self.func = func
+        self.args = args
+        self.provider = provider
+        self.key = key
+        self.priority = priority
+        self.queued = time.monotonic()
+
+
+# -------------------------
+# Scheduler
+# -------------------------
+class Scheduler:
+    """
+    submit() is safe to call from any thread. Counters and waits are read
+    with stats(); while tracing is on, queue depth and running jobs are
+    also recorded as a "scheduler" counter track.
+    """
+    def __init__(self, settings=None):
+        config = dict(DEFAULT_SCHEDULER_CONFIG)
+        config.update(settings or {})
+        self.max_concurrent = max(1, config["max_concurrent"])
+        self.per_provider = config["per_provider"] or {}
+        self.on_duplicate = config["on_duplicate"]
+
+        self.lock = threading.Lock()
+        self.queue = []          # sorted (priority, seq, job)
+        self.waiting = {}        # key -> queued job
+        self.active_keys = set()
+        self.running = 0
+        self.running_by_provider = {}
+        self.seq = itertools.count()
+        self.counters = dict.fromkeys(("submitted", "started", "completed", "dropped", "replaced"), 0)
+        self.max_depth = 0
+        self.waits = {name: deque(maxlen=WAIT_HISTORY) for name in PRIORITIES}
+
+    def submit(self, func, args=(), provider=None, key=None, priority="interactive"):
+        """
+        Runs func(*args) on a worker thread when a slot is free. Returns
+        "queued", "replaced" (a waiting job with the same key was dropped
+        in favour of this one) or "dropped" (this one was not queued).
+        """
+        job = Job(func, args, provider, key, priority)
+        status = "queued"
+        with self.lock:
+            self.counters["submitted"] += 1
+            if key is not None:
+                if key in self.active_keys and self.on_duplicate != "queue":
+                    self.counters["dropped"] += 1
+                    return "dropped"
+                previous = self.waiting.pop(key, None)
+                if previous is not None:
+                    self._remove(previous)
+                    self.counters["replaced"] += 1
+                    status = "replaced"
+                self.waiting[key] = job
+            bisect.insort(self.queue, (PRIORITIES[priority], next(self.seq), job))
+            self.max_depth = max(self.max_depth, len(self.queue))
+            ready = self._take_ready()
+        self._start(ready)
+        return status
+
+    def _remove(self, job):
+        for index, entry in enumerate(self.queue):
+            if entry[2] is job:
+                del self.queue[index]
+                return
+
+    def _take_ready(self):
+        """
+        Pops every job that may start now. Called with the lock held.
+        """
+        ready = []
+        index = 0
+        while index < len(self.queue) and self.running < self.max_concurrent:
+            job = self.queue[index][2]
+            cap = self.per_provider.get(job.provider)
+            if (cap is not None and self.running_by_provider.get(job.provider, 0) >= cap) \
+                    or job.key in self.active_keys:
+                index += 1
+                continue
+            del self.queue[index]
+            if job.key is not None:
+                self.waiting.pop(job.key, None)
+                self.active_keys.add(job.key)
+            self.running += 1
+            self.running_by_provider[job.provider] = self.running_by_provider.get(job.provider, 0) + 1
+            self.counters["started"] += 1
+            self.waits[job.priority].append(time.monotonic() - job.queued)
+            ready.append(job)
+        if tracing.ENABLED:
+            tracing.counter("scheduler", queued=len(self.queue), running=self.running)
+        return ready
+
+    def _start(self, jobs):
+        for job in jobs:
+            threading.Thread(target=self._run, args=(job,), name=f"hello-gpt-{job.priority}",
+                             daemon=True).start()
+
+    def _run(self, job):
+        try:
+            job.func(*job.args)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.running_by_provider[job.provider] -= 1
+                self.active_keys.discard(job.key)
+                self.counters["completed"] += 1
+                ready = self._take_ready()
+            self._start(ready)
+
+    # -------------------------
+    # Metrics
+    # -------------------------
+    def stats(self):
+        """
+        Returns queue depth, running jobs, counters and p50/p95 queue waits
+        (seconds) per priority class.
+        """
+        with self.lock:
+            stats = dict(self.counters, queued=len(self.queue), max_queued=self.max_depth,
+                         running=self.running)
+            waits = {name: list(values) for name, values in self.waits.items()}
+        for name, values in waits.items():
+            stats[f"{name}_wait_p50"] = percentile(values, 0.5)
+            stats[f"{name}_wait_p95"] = percentile(values, 0.95)
+        return stats
+
+
+def format_stats(stats):
+    return (f"queue {stats['queued']} (max {stats['max_queued']}) running {stats['running']} "
+            f"wait p50/p95 {stats['interactive_wait_p50']:.2f}/{stats['interactive_wait_p95']:.2f}s "
+            f"{stats['dropped']} duplicate(s) dropped, {stats['replaced']} replaced")
@@ -0,0 +1,184 @@
+# service.py
+# Process-wide state shared by every gedit window.
+#
+# gedit creates one WindowActivatable per window. They all borrow this one
+# service, created by the AppActivatable (or by whichever window asks
+# first), instead of owning clients or queues. Opening more windows
+# therefore adds no SDK clients, connection pools, ledgers or scheduler
+# threads.
+import os
+import sys
+import json
+import threading
+
+from .engine import PLUGIN_DIR, CONFIG
+from .ledger import UsageLedger
+from .scheduler import Scheduler
+from .worker import WorkerClient
+from .daemon import connect_daemon
+from .completion import SuggestionCache, completion_config
+from .uploads import UploadCache
+
+USAGE_FILE = os.path.join(os.path.dirname(PLUGIN_DIR), "hello-gpt-usage.jsonl")
+BATCH_STATE_FILE = os.path.join(os.path.dirname(PLUGIN_DIR), "hello-gpt-batches.json")
+UPLOADS_FILE = os.path.join(os.path.dirname(PLUGIN_DIR), "hello-gpt-uploads.json")
+
+
+class HelloGPTService:
+    """
+    Owns the request scheduler, usage ledger, batch runner, worker process,
+    inline suggestion cache, project indexes, uploaded files and the SDK
+    client registry. Windows only bind shortcuts and insert into their own
+    documents.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.ledger = UsageLedger(USAGE_FILE, config.get("pricing"))
+        self.scheduler = Scheduler(config.get("scheduler"))
+        self.suggestions = SuggestionCache(completion_config()["cache_size"])
+        self.batch_runner = None
+        self.worker = None
+        # Batch request key -> open document, for unsaved documents
+        self.batch_docs = {}
+        # Project root -> ProjectIndex
+        self.indexes = {}
+        self.uploads = UploadCache(UPLOADS_FILE)
+        self.lock = threading.Lock()
+
+    # -------------------------
+    # SDK clients
+    # -------------------------
+    def gemini_client(self, api_key=None):
+        """
+        The shared genai.Client for api_key (one per key and base URL).
+        """
+        from .backends import genai_sdk
+        return genai_sdk.get_client(api_key)
+
+    def close_clients(self):
+        """
+        Closes the SDK clients' connection pools and open realtime
+        sessions. Only backends that were actually used are touched, so
+        nothing is imported here.
+        """
+        genai_sdk = sys.modules.get(f"{__package__}.backends.genai_sdk")
+        if genai_sdk:
+            for client in list(genai_sdk.CLIENTS.values()):
+                try:
+                    client.close()
+                except Exception:
+                    pass
+            genai_sdk.CLIENTS.clear()
+        realtime = sys.modules.get(f"{__package__}.backends.realtime")
+        if realtime:
+            realtime.close_sessions()
+
+    # -------------------------
+    # Worker process
+    # -------------------------
+    def worker_enabled(self):
+        return bool((self.config.get("worker") or {}).get("enabled")
+                    or (self.config.get("daemon") or {}).get("enabled"))
+
+    def daemon_enabled(self):
+        return bool((self.config.get("daemon") or {}).get("enabled"))
+
+    def get_worker(self, watch=None):
+        """
+        The out-of-process client: a connection to the per-user daemon when
+        it is enabled, else a private worker process. (Re)connected on first
+        use; watch(client) hooks it into a main loop, without one a reader
+        thread reads it. Returns None if neither can be reached, in which
+        case requests run in-process.
+        """
+        with self.lock:
+            if self.worker is None or not self.worker.alive():
+                try:
+                    if self.daemon_enabled():
+                        self.worker = connect_daemon(self.config.get("daemon"))
+                    else:
+                        self.worker = WorkerClient().start()
+                except OSError:
+                    self.worker = None
+                if self.worker is None:
+                    return None
+                if watch:
+                    watch(self.worker)
+                else:
+                    self.worker.start_reader()
+            return self.worker
+
+    # -------------------------
+    # Batch mode
+    # -------------------------
+    def get_batch_runner(self, on_result, on_error):
+        """
+        Creates the batch runner on first use. The batch APIs need the
+        SDKs, so they are imported here rather than at startup.
+        """
+        from .batch import BatchRunner
+        from .backends import openai_sdk
+        with self.lock:
+            if self.batch_runner is None:
+                self.batch_runner = BatchRunner(BATCH_STATE_FILE, on_result, on_error, self.config.get("batch"))
+        if openai_sdk.AVAILABLE:
+            openai_sdk.configure()
+        if self.batch_runner.gemini_client is None:
+            self.batch_runner.gemini_client = self.gemini_client()
+        return self.batch_runner
+
+    def has_pending_batches(self):
+        try:
+            with open(BATCH_STATE_FILE, "r") as f:
+                return bool(json.load(f))
+        except Exception:
+            return False
+
+    # -------------------------
+    # Project retrieval
+    # -------------------------
+    def project_index(self, path):
+        """
+        The embedding index of the project path belongs to, created (and
+        its first scan started) on first use. Embedding usage goes to the
+        ledger under the project root.
+        """
+        from .retrieval import ProjectIndex, project_root
+        root, recursive = project_root(path)
+        with self.lock:
+            index = self.indexes.get(root)
+            if index is None:
+                index = ProjectIndex(root, on_usage=lambda provider, model, usage:
+                                     self.ledger.add(provider, model, root, usage), recursive=recursive)
+                self.indexes[root] = index
+                index.start()
+        return index
+
+    def shutdown(self):
+        for index in self.indexes.values():
+            index.stop()
+        if self.worker:
+            self.worker.stop()
+        self.close_clients()
+
+
+# -------------------------
+# The shared instance
+# -------------------------
+SERVICE = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    global SERVICE
+    with _service_lock:
+        if SERVICE is None:
+            SERVICE = HelloGPTService(CONFIG)
+        return SERVICE
+
+def shutdown_service():
+    global SERVICE
+    with _service_lock:
+        service, SERVICE = SERVICE, None
+    if service:
+        service.shutdown()
@@ -0,0 +1,137 @@
+# telemetry.py
+# Per-request latency records kept in an in-memory ring buffer
+import time
+import threading
+from collections import deque
+
+# -------------------------
+# Request records
+# -------------------------
+# Marks in lifecycle order. Not every transport can see every mark (the SDKs
+# hide connect/TLS), so missing marks are simply left out of the summaries.
+MARKS = (
+    "key_press", "worker_start", "connect_done", "tls_done", "request_sent",
+    "first_byte", "first_token", "first_insert", "last_token", "last_insert"
+)
+
+RING_SIZE = 256
+
+
+class RequestTrace:
+    """
+    Monotonic timestamps and counters for one request. Marks are plain
+    attribute writes so recording stays far below the cost of the stream.
+    """
+    __slots__ = MARKS + ("provider", "model", "profile", "bytes_in", "bytes_out", "chunks", "tokens", "error")
+
+    def __init__(self, provider, model, profile=None):
+        for name in MARKS:
+            setattr(self, name, None)
+        self.provider = provider
+        self.model = model
+        # Latency profile name (latency.py), if the request used one
+        self.profile = profile
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.error = None
+
+    def mark(self, name):
+        setattr(self, name, time.monotonic())
+
+    def mark_once(self, name):
+        if getattr(self, name) is None:
+            setattr(self, name, time.monotonic())
+
+    def token(self):
+        now = time.monotonic()
+        if self.first_token is None:
+            self.first_token = now
+        self.last_token = now
+        self.tokens += 1
+
+    def inserted(self):
+        now = time.monotonic()
+        if self.first_insert is None:
+            self.first_insert = now
+        self.last_insert = now
+
+    def span(self, start, end):
+        start, end = getattr(self, start), getattr(self, end)
+        if start is None or end is None:
+            return None
+        return end - start
+
+    def tokens_per_second(self):
+        duration = self.span("first_token", "last_token")
+        if not duration or self.tokens < 2:
+            return None
+        return (self.tokens - 1) / duration
+
+
+# -------------------------
+# Ring buffer and summaries
+# -------------------------
+RECORDS = deque(maxlen=RING_SIZE)
+RECORDS_LOCK = threading.Lock()
+
+# (label, start mark, end mark) reported by summarize()
+SPANS = (
+    ("ttft", "key_press", "first_token"),
+    ("network", "worker_start", "first_byte"),
+    ("insert_lag", "first_token", "first_insert"),
+    ("total", "key_press", "last_insert"),
+)
+
+
+def record(trace):
+    with RECORDS_LOCK:
+        RECORDS.append(trace)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def summarize(records=None):
+    """
+    Returns {(provider, model, profile): {"count", "errors", "<span>_p50",
+    "<span>_p95", "tokens_per_s_p50"}} over the finished requests in the ring.
+    """
+    if records is None:
+        with RECORDS_LOCK:
+            records = list(RECORDS)
+
+    groups = {}
+    for trace in records:
+        groups.setdefault((trace.provider, trace.model, trace.profile), []).append(trace)
+
+    summary = {}
+    for key, traces in groups.items():
+        ok = [t for t in traces if not t.error]
+        row = {"count": len(traces), "errors": len(traces) - len(ok)}
+        for label, start, end in SPANS:
+            values = [v for v in (t.span(start, end) for t in ok) if v is not None]
+            row[f"{label}_p50"] = percentile(values, 0.5)
+            row[f"{label}_p95"] = percentile(values, 0.95)
+        rates = [r for r in (t.tokens_per_second() for t in ok) if r is not None]
+        row["tokens_per_s_p50"] = percentile(rates, 0.5)
+        summary[key] = row
+    return summary
+
+def format_summary(summary):
+    if not summary:
+        return "No GPT requests recorded yet"
+    lines = []
+    for (provider, model, profile), row in sorted(summary.items(), key=lambda item: str(item[0])):
+        name = f"{provider}/{model} [{profile}]" if profile else f"{provider}/{model}"
+        lines.append(
+            f"{name} n={row['count']} err={row['errors']} "
+            f"ttft p50/p95 {row['ttft_p50']:.2f}/{row['ttft_p95']:.2f}s "
+            f"total p50/p95 {row['total_p50']:.2f}/{row['total_p95']:.2f}s "
+            f"net {row['network_p50']:.2f}s insert {row['insert_lag_p50'] * 1000:.0f}ms "
+            f"{row['tokens_per_s_p50']:.0f} tok/s"
+        )
+    return " | ".join(lines)
@@ -0,0 +1,186 @@
+# tracing.py
+# Opt-in Chrome/Perfetto trace-event recorder for the request lifecycle.
+#
+# Events go into a bounded ring and are written as trace-event JSON that
+# chrome://tracing and ui.perfetto.dev open directly. While tracing is off
+# span() hands back a shared no-op object and hot loops test ENABLED first,
+# so the disabled cost is one global lookup per call site.
+import os
+import json
+import time
+import atexit
+import itertools
+import threading
+from collections import deque
+
+# -------------------------
+# State
+# -------------------------
+ENABLED = False
+RING_SIZE = 200000
+OUTPUT_FILE = None
+
+EVENTS = deque(maxlen=RING_SIZE)
+THREAD_NAMES = {}
+IDS = itertools.count(1)
+_atexit_registered = False
+
+
+def now():
+    """
+    Trace clock in microseconds.
+    """
+    return time.perf_counter() * 1e6
+
+def _tid():
+    tid = threading.get_ident()
+    if tid not in THREAD_NAMES:
+        THREAD_NAMES[tid] = threading.current_thread().name
+    return tid
+
+
+# -------------------------
+# Recording
+# -------------------------
+class Span:
+    """
+    Context manager recording one complete ("X") event on the current thread.
+    """
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = now()
+        return self
+
+    def __exit__(self, *exc_info):
+        complete(self.name, self.start, self.args)
+        return False
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+
+def span(name, **args):
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(name, args)
+
+def complete(name, start, args=None):
+    """
+    Records a span from start (a now() value) to now and returns the end
+    time, so back-to-back spans can chain without a second clock read.
+    """
+    end = now()
+    EVENTS.append(("X", name, start, end - start, _tid(), args))
+    return end
+
+def instant(name, **args):
+    EVENTS.append(("i", name, now(), None, _tid(), args or None))
+
+def counter(name, **values):
+    """
+    Records a counter ("C") event, drawn as a stacked graph (e.g. queue depth).
+    """
+    EVENTS.append(("C", name, now(), None, _tid(), values))
+
+def next_id():
+    return next(IDS)
+
+def waited(name, queued, event_id):
+    """
+    Records the time between queued (taken on another thread) and now as
+    an async slice, e.g. how long an idle_add callback sat in the main
+    loop queue.
+    """
+    tid = _tid()
+    EVENTS.append(("b", name, queued, event_id, tid, None))
+    EVENTS.append(("e", name, now(), event_id, tid, None))
+
+
+# -------------------------
+# Control and export
+# -------------------------
+def enable(ring_size=None, path=None):
+    global ENABLED, EVENTS, OUTPUT_FILE, _atexit_registered
+    if ring_size and ring_size != EVENTS.maxlen:
+        EVENTS = deque(EVENTS, maxlen=ring_size)
+    if path:
+        OUTPUT_FILE = path
+    if not _atexit_registered:
+        atexit.register(_write_at_exit)
+        _atexit_registered = True
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def clear():
+    EVENTS.clear()
+
+def configure(settings, default_path):
+    """
+    Applies the "tracing" config section ({"enabled", "ring_size", "file"}).
+    """
+    global OUTPUT_FILE
+    settings = settings or {}
+    OUTPUT_FILE = settings.get("file") or default_path
+    if settings.get("enabled"):
+        enable(settings.get("ring_size"))
+
+def to_chrome(events=None):
+    pid = os.getpid()
+    if events is None:
+        events = list(EVENTS)
+
+    trace_events = [{"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+                     "args": {"name": "hello-gpt"}}]
+    for tid, name in list(THREAD_NAMES.items()):
+        trace_events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid,
+                             "args": {"name": name}})
+
+    for phase, name, ts, extra, tid, args in events:
+        event = {"ph": phase, "name": name, "ts": round(ts, 3), "pid": pid, "tid": tid, "cat": "hello-gpt"}
+        if phase == "X":
+            event["dur"] = round(extra, 3)
+        elif phase == "i":
+            event["s"] = "t"
+        elif phase in ("b", "e"):
+            event["id"] = extra
+        if args:
+            event["args"] = args
+        trace_events.append(event)
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+def export(path=None):
+    """
+    Writes the ring to path (default: the configured trace file) and
+    returns (path, event count).
+    """
+    path = path or OUTPUT_FILE
+    events = list(EVENTS)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(to_chrome(events), f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path, len(events)
+
+def _write_at_exit():
+    if ENABLED and OUTPUT_FILE and EVENTS:
+        try:
+            export()
+        except OSError:
+            pass
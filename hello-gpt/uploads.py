@@ -0,0 +1,267 @@
+# uploads.py
+# Upload-once references to large documents ("uploads": {"enabled": true}).
+#
+# Asking several questions about the same large file resends all of it
+# with every Alt+G. With uploads enabled, the stable part of a long
+# document (all but its last "tail_chars", where the question is typed)
+# is uploaded once through the Gemini Files API on a background thread.
+# Later requests whose text still starts with exactly that content send a
+# fileData reference to it plus only the rest of the text. Uploads are
+# keyed by the block digest of the document's fingerprint (fingerprint.py;
+# else the SHA-256 of their content) and kept (in
+# hello-gpt-uploads.json) until shortly before the API deletes them, 48
+# hours after upload; changed content is simply uploaded again.
+#
+# The transfer is the Files API's resumable protocol: a start request,
+# then chunks of "chunk_bytes" (a multiple of 256 KiB), resumed from the
+# offset the server reports after a failed chunk.
+#
+# Only Gemini's stdlib and SDK backends use references: Chat Completions
+# accepts uploaded files only as PDFs, and realtime sessions take text.
+import os
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+import urllib.error
+
+from .engine import CONFIG, GEMINI_CONFIG, current_backend
+
+DEFAULT_UPLOADS_CONFIG = {
+    "enabled": False,
+    # Documents shorter than this are always sent inline
+    "min_chars": 100000,
+    # The end of the document that is never uploaded
+    "tail_chars": 4000,
+    "chunk_bytes": 8 * 1024 * 1024,
+    # Seconds an upload is used for (the API keeps files for 48 hours)
+    "ttl": 46 * 3600,
+    "retries": 5,
+}
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/"
+UPLOAD_GRANULARITY = 256 * 1024
+MIME_TYPE = "text/plain"
+
+
+def uploads_config():
+    config = dict(DEFAULT_UPLOADS_CONFIG)
+    config.update(CONFIG.get("uploads") or {})
+    return config
+
+def uses_references(provider):
+    return provider == "gemini" and current_backend(provider) in ("stdlib", "sdk")
+
+
+# -------------------------
+# Resumable upload
+# -------------------------
+class UploadError(Exception):
+    pass
+
+
+def upload_request(url, data=None, headers=None):
+    request = urllib.request.Request(url, data=data, headers=headers or {}, method="POST")
+    return urllib.request.urlopen(request, timeout=120)
+
+def retryable(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, (urllib.error.URLError, OSError))
+
+def resumable_upload(data, display_name, settings, api_key, base_url):
+    """
+    Uploads data to the Gemini Files API and returns its file resource.
+    """
+    for attempt in range(settings["retries"] + 1):
+        try:
+            with upload_request(f"{base_url.rstrip('/')}/upload/v1beta/files?key={api_key}",
+                                json.dumps({"file": {"display_name": display_name}}).encode("utf-8"),
+                                {"X-Goog-Upload-Protocol": "resumable", "X-Goog-Upload-Command": "start",
+                                 "X-Goog-Upload-Header-Content-Length": str(len(data)),
+                                 "X-Goog-Upload-Header-Content-Type": MIME_TYPE,
+                                 "Content-Type": "application/json"}) as response:
+                upload_url = response.headers.get("X-Goog-Upload-URL")
+            break
+        except (urllib.error.URLError, OSError) as e:
+            if not retryable(e) or attempt == settings["retries"]:
+                raise UploadError(f"Gemini upload failed to start: {e}")
+            time.sleep(min(2 ** attempt, 30))
+    if not upload_url:
+        raise UploadError("Gemini did not start the upload")
+
+    chunk_bytes = max(UPLOAD_GRANULARITY, settings["chunk_bytes"] // UPLOAD_GRANULARITY * UPLOAD_GRANULARITY)
+    offset = 0
+    failures = 0
+    while True:
+        chunk = data[offset:offset + chunk_bytes]
+        last = offset + len(chunk) >= len(data)
+        try:
+            with upload_request(upload_url, chunk,
+                                {"X-Goog-Upload-Command": "upload, finalize" if last else "upload",
+                                 "X-Goog-Upload-Offset": str(offset)}) as response:
+                reply = response.read()
+        except (urllib.error.URLError, OSError) as e:
+            if not retryable(e):
+                raise UploadError(f"Gemini upload failed: {e}")
+            failures += 1
+            if failures > settings["retries"]:
+                raise UploadError(f"Gemini upload failed: {e}")
+            time.sleep(min(2 ** failures, 30))
+            # Continue from what the server actually has
+            try:
+                with upload_request(upload_url, b"", {"X-Goog-Upload-Command": "query"}) as response:
+                    offset = int(response.headers.get("X-Goog-Upload-Size-Received", offset))
+            except (urllib.error.URLError, OSError, ValueError):
+                pass
+            continue
+        if last:
+            return json.loads(reply)["file"]
+        offset += len(chunk)
+        failures = 0
+
+def wait_active(file, api_key, base_url, timeout=60):
+    """
+    Polls a file still PROCESSING until it is ACTIVE.
+    """
+    deadline = time.monotonic() + timeout
+    while file.get("state", "ACTIVE") == "PROCESSING" and time.monotonic() < deadline:
+        time.sleep(1)
+        url = f"{base_url.rstrip('/')}/v1beta/{file['name']}?key={api_key}"
+        with urllib.request.urlopen(url, timeout=30) as response:
+            file = json.loads(response.read())
+    if file.get("state", "ACTIVE") != "ACTIVE":
+        raise UploadError(f"Gemini file {file.get('name')} is {file.get('state')}")
+    return file
+
+
+# -------------------------
+# Upload cache
+# -------------------------
+class UploadCache:
+    """
+    Content key -> uploaded file, saved to path. reference() is called
+    from request threads; uploads run on their own threads.
+    """
+    def __init__(self, path, settings=None):
+        self.path = path
+        self.settings = settings or uploads_config()
+        self.lock = threading.Lock()
+        self.uploading = set()
+        self.requests = 0
+        self.bytes_saved = 0
+        self.error = None
+        try:
+            with open(path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _save(self):
+        now = time.time()
+        self.entries = {key: entry for key, entry in self.entries.items() if entry["expires"] > now}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def account(self):
+        """
+        Identifies the API key and endpoint; files belong to one project.
+        """
+        base_url = GEMINI_CONFIG.get("base_url", GEMINI_BASE_URL)
+        return hashlib.sha256(f"{GEMINI_CONFIG.get('api_key')}|{base_url}".encode("utf-8")).hexdigest()[:16]
+
+    def reference(self, text, document, snapshot=None):
+        """
+        (file, rest of text) when text starts with an uploaded document
+        prefix, else (None, text) after starting an upload of its stable
+        part, if it is long enough. With the buffer's fingerprint snapshot,
+        the prefix is cut and matched by block hashes instead of hashing
+        the text.
+        """
+        account = self.account()
+        now = time.time()
+        with self.lock:
+            candidates = sorted((entry for entry in self.entries.values()
+                                 if entry["document"] == document and entry["account"] == account
+                                 and entry["expires"] > now and entry["chars"] <= len(text)),
+                                key=lambda entry: -entry["chars"])
+        if snapshot is not None:
+            # The stable part ends at the last block boundary before the tail
+            blocks, cut, prefix = snapshot.prefix(len(text) - self.settings["tail_chars"])
+        else:
+            # ... or at the last line break before it
+            blocks = prefix = None
+            cut = text.rfind("\n", 0, len(text) - self.settings["tail_chars"]) + 1
+        for entry in candidates:
+            if snapshot is not None and "prefix" in entry:
+                if not snapshot.has_prefix(entry["blocks"], entry["prefix"]):
+                    continue
+            elif hashlib.sha256(text[:entry["chars"]].encode("utf-8")).hexdigest() != entry["hash"]:
+                continue
+            with self.lock:
+                self.requests += 1
+                self.bytes_saved += entry["bytes"]
+            if cut - entry["chars"] >= self.settings["min_chars"]:
+                # So much was added since that it is worth a new upload
+                self.start_upload(text[:cut], document, account, blocks, prefix)
+            return entry, text[entry["chars"]:]
+
+        if cut >= self.settings["min_chars"]:
+            self.start_upload(text[:cut], document, account, blocks, prefix)
+        return None, text
+
+    def start_upload(self, text, document, account, blocks=None, prefix=None):
+        data = text.encode("utf-8")
+        # Keyed by the block digest when there is one; hashing the text is
+        # left to the upload thread
+        key = f"blocks-{blocks}-{prefix}" if prefix else hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if key in self.uploading:
+                return
+            entry = self.entries.get(key)
+            if entry and entry["account"] == account and entry["expires"] > time.time():
+                # Same content under another name
+                entry["document"] = document
+                self._save()
+                return
+            self.uploading.add(key)
+        threading.Thread(target=self.upload, args=(data, key, len(text), document, account, blocks, prefix),
+                         name="hello-gpt-upload", daemon=True).start()
+
+    def upload(self, data, key, chars, document, account, blocks=None, prefix=None):
+        api_key = GEMINI_CONFIG.get("api_key")
+        base_url = GEMINI_CONFIG.get("base_url", GEMINI_BASE_URL)
+        try:
+            file = resumable_upload(data, os.path.basename(document or "document"), self.settings, api_key, base_url)
+            file = wait_active(file, api_key, base_url)
+            entry = {"hash": hashlib.sha256(data).hexdigest(), "uri": file["uri"], "name": file["name"],
+                     "mime_type": file.get("mimeType", MIME_TYPE), "bytes": len(data), "chars": chars,
+                     "document": document, "account": account, "expires": time.time() + self.settings["ttl"]}
+            if prefix:
+                entry.update(blocks=blocks, prefix=prefix)
+            with self.lock:
+                self.entries[key] = entry
+                self._save()
+            self.error = None
+        except (UploadError, urllib.error.URLError, OSError, ValueError, KeyError) as e:
+            self.error = str(e)
+        finally:
+            with self.lock:
+                self.uploading.discard(key)
+
+    def describe(self):
+        with self.lock:
+            files = len(self.entries)
+            uploading = len(self.uploading)
+        summary = f"uploads {files} files, {self.bytes_saved / 1e6:.1f} MB not resent in {self.requests} requests"
+        if uploading:
+            summary += f", {uploading} uploading"
+        if self.error:
+            summary += f", last error: {self.error}"
+        return summary
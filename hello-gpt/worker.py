@@ -0,0 +1,312 @@
+# worker.py
+# Optional out-of-process worker ("worker": {"enabled": true}).
+#
+# A helper process (python3 <plugin-dir> --worker) runs chat_stream() for
+# every request, so TLS, JSON parsing and SDK models never take the GIL
+# from gedit's main thread. Requests go to its stdin as JSON lines; events
+# come back on its stdout as length-prefixed frames. Inside gedit the pipe
+# is read by a GLib IO watch on the main loop, so the gedit process does
+# little more than insert text; headless callers use a reader thread.
+import os
+import sys
+import abc
+import json
+import shutil
+import struct
+import itertools
+import threading
+import subprocess
+
+from .engine import PLUGIN_DIR, chat_stream, provider_config
+from .backends import CancelToken
+from .backends.stdlib import StreamStalled
+
+# request id, event code, payload length
+FRAME = struct.Struct("!IBI")
+# "ledger" is only sent by the daemon (daemon.py), which records usage itself.
+# "end" is sent once chat_stream() has returned; its payload is the message
+# of an exception it raised, if any, which the parent reports as an "error".
+EVENTS = ("text", "usage", "stall", "error", "done", "ledger", "end")
+EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+# Events after which a request gets no more callbacks. Backends may send
+# "error" and then carry on (a length warning, a safety stop), and end HTTP
+# errors without a "done", so only the end of chat_stream() is final.
+FINAL_EVENTS = ("end",)
+
+
+# -------------------------
+# Child side
+# -------------------------
+def serve(infile=None, outfile=None, handle=None):
+    """
+    Worker main loop: one thread per request (or handle(request, write)
+    for each), frames written under a lock. A {"cancel": id} line cancels
+    that request. Returns when the parent closes the pipe.
+    """
+    infile = infile or sys.stdin.buffer
+    if outfile is None:
+        # Stray prints must not end up between frames
+        outfile, sys.stdout = sys.stdout.buffer, sys.stderr
+    lock = threading.Lock()
+    # request id -> CancelToken, until its final event
+    pending = {}
+
+    def write(request_id, event_type, payload):
+        with lock:
+            if event_type in FINAL_EVENTS:
+                pending.pop(request_id, None)
+            outfile.write(FRAME.pack(request_id, EVENT_CODES[event_type], len(payload)) + payload)
+            outfile.flush()
+
+    for line in infile:
+        request = json.loads(line)
+        if "cancel" in request:
+            with lock:
+                token = pending.get(request["cancel"])
+            if token:
+                token.cancel()
+            continue
+        token = CancelToken()
+        with lock:
+            pending[request["id"]] = token
+        request["options"] = dict(request.get("options") or {}, cancel=token)
+        if handle:
+            handle(request, write)
+        else:
+            threading.Thread(target=run_request, args=(request, write), daemon=True).start()
+    return 0
+
+def run_request(request, write, ledger=None):
+    # The parent's live settings (keys changed in the config dialog, base
+    # URL) for this request only: the daemon serves several parents
+    if request.get("settings"):
+        request["options"] = dict(request.get("options") or {},
+                                  settings=dict(provider_config(request["provider"]), **request["settings"]))
+
+    def callback(event_type, data):
+        if event_type == "text":
+            payload = data.encode("utf-8")
+        elif event_type == "usage":
+            payload = json.dumps(data).encode("utf-8")
+        elif event_type == "stall":
+            # The fields, so the parent can rebuild the StreamStalled
+            payload = json.dumps({"provider": data.provider, "phase": data.phase, "waited": data.waited,
+                                  "budget": data.budget, "received": data.received}).encode("utf-8")
+        else:
+            payload = str(data or "").encode("utf-8")
+        write(request["id"], event_type, payload)
+        if event_type == "usage" and ledger is not None:
+            entry = ledger.add(request["provider"], request["model"], request.get("document"), data)
+            write(request["id"], "ledger", json.dumps({"entry": entry, "month_spend": ledger.month_spend()})
+                  .encode("utf-8"))
+
+    error = ""
+    try:
+        chat_stream(request["message"], callback, request["provider"], request["model"],
+                    options=request.get("options"))
+    except Exception as e:
+        error = f"GPT worker error: {e}"
+    try:
+        write(request["id"], "end", error.encode("utf-8"))
+    except OSError:
+        # The client went away mid-stream
+        pass
+
+
+# -------------------------
+# Parent side
+# -------------------------
+def python_executable():
+    """
+    Inside gedit sys.executable may be gedit itself, not a Python.
+    """
+    if os.path.basename(sys.executable or "").startswith("python"):
+        return sys.executable
+    return shutil.which("python3")
+
+class FrameClient(abc.ABC):
+    """
+    Sends requests and routes the frames coming back to per-request
+    callbacks. Call on_readable() whenever fileno() is readable (from a GLib
+    IO watch), or start_reader() to read it on a thread instead. Subclasses
+    provide the connection: WorkerClient here, DaemonClient in daemon.py.
+    """
+    # Whether the other side writes the usage ledger (see "ledger" events)
+    records_usage = False
+
+    def __init__(self):
+        self.callbacks = {}
+        self.ids = itertools.count(1)
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+        self.closed = False
+
+    @abc.abstractmethod
+    def fileno(self):
+        """
+        The file descriptor frames are read from.
+        """
+
+    @abc.abstractmethod
+    def send(self, data):
+        """
+        Writes data (request lines) to the other side; raises OSError.
+        """
+
+    def alive(self):
+        return not self.closed
+
+    def stop(self):
+        pass
+
+    def start_reader(self):
+        def read():
+            while self.on_readable():
+                pass
+        threading.Thread(target=read, name="hello-gpt-worker-reader", daemon=True).start()
+        return self
+
+    def submit(self, message, callback, provider, model, document=None, options=None):
+        """
+        Sends one request; callback gets the usual chat_stream() events on
+        whichever thread reads the connection, then ("end", None) once the
+        request is over. A CancelToken in options["cancel"] is forwarded as
+        a cancel line.
+        """
+        request_id = next(self.ids)
+        options = dict(options or {})
+        cancel = options.pop("cancel", None)
+        line = json.dumps({"id": request_id, "provider": provider, "model": model, "message": message,
+                           "document": document, "options": options,
+                           "settings": provider_config(provider)}) + "\n"
+        with self.lock:
+            self.callbacks[request_id] = callback
+            try:
+                self.send(line.encode("utf-8"))
+            except OSError:
+                self.callbacks.pop(request_id, None)
+                raise
+        if cancel is not None:
+            cancel.hook(lambda: self.cancel(request_id))
+        return request_id
+
+    def cancel(self, request_id):
+        with self.lock:
+            if request_id not in self.callbacks or self.closed:
+                return
+            try:
+                self.send((json.dumps({"cancel": request_id}) + "\n").encode("utf-8"))
+            except OSError:
+                pass
+
+    def chat_stream(self, message, callback, provider, model, document=None, options=None):
+        """
+        Blocking equivalent of engine.chat_stream() for worker threads (it
+        keeps scheduler slots held until the reply has finished).
+        """
+        finished = threading.Event()
+
+        def relay(event_type, data):
+            if event_type in FINAL_EVENTS:
+                finished.set()
+            else:
+                callback(event_type, data)
+
+        self.submit(message, relay, provider, model, document, options)
+        finished.wait()
+
+    def on_readable(self, *args):
+        """
+        Reads what is available and dispatches complete frames. Returns
+        False once the other side has gone away (which also ends an IO watch).
+        """
+        try:
+            data = os.read(self.fileno(), 65536)
+        except OSError:
+            data = b""
+        if not data:
+            self._exited()
+            return False
+
+        buffer = self.buffer
+        buffer += data
+        offset = 0
+        while len(buffer) - offset >= FRAME.size:
+            request_id, code, length = FRAME.unpack_from(buffer, offset)
+            end = offset + FRAME.size + length
+            if len(buffer) < end:
+                break
+            payload = bytes(buffer[offset + FRAME.size:end])
+            offset = end
+            self._dispatch(request_id, EVENTS[code], payload)
+        del buffer[:offset]
+        return True
+
+    def _dispatch(self, request_id, event_type, payload):
+        with self.lock:
+            if event_type in FINAL_EVENTS:
+                callback = self.callbacks.pop(request_id, None)
+            else:
+                callback = self.callbacks.get(request_id)
+        if callback is None:
+            return
+        if event_type in ("usage", "ledger"):
+            callback(event_type, json.loads(payload))
+        elif event_type == "stall":
+            callback(event_type, StreamStalled(**json.loads(payload)))
+        elif event_type == "end":
+            try:
+                if payload:
+                    callback("error", payload.decode("utf-8"))
+            finally:
+                callback(event_type, None)
+        elif event_type == "done":
+            callback(event_type, None)
+        else:
+            callback(event_type, payload.decode("utf-8"))
+
+    def _exited(self):
+        with self.lock:
+            self.closed = True
+            callbacks, self.callbacks = self.callbacks, {}
+        for callback in callbacks.values():
+            try:
+                callback("error", "Lost the connection to the GPT worker")
+            finally:
+                callback("end", None)
+
+
+class WorkerClient(FrameClient):
+    """
+    A private worker process talking over its stdin/stdout.
+    """
+    def __init__(self):
+        super().__init__()
+        self.process = None
+
+    def start(self):
+        python = python_executable()
+        if not python:
+            raise OSError("No python3 found for the GPT worker")
+        self.process = subprocess.Popen(
+            [python, PLUGIN_DIR, "--worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0, close_fds=True
+        )
+        return self
+
+    def fileno(self):
+        return self.process.stdout.fileno()
+
+    def send(self, data):
+        self.process.stdin.write(data)
+
+    def alive(self):
+        return not self.closed and self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.alive():
+            self.process.stdin.close()
+            try:
+                self.process.wait(2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
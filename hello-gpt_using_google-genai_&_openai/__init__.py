@@ -1,3 +0,0 @@
-# __init__.py
-# Simply imports the main plugin class
-from .hello_gpt import HelloGPTPlugin
@@ -7,8 +7,8 @@
 PLUGIN_NAME="hello-gpt"
 PLUGIN_URL="https://github.com/4n54n/Hello-GPT/raw/refs/heads/main/install/hello-gpt.zip"
 PLUGIN_DIR="$HOME/.local/share/gedit/plugins"
-OPENAI_DIR="$PLUGIN_DIR/openai-gpt-core"
-GOOGLE_DIR="$PLUGIN_DIR/google"
+OPENAI_DIR="$PLUGIN_DIR/$PLUGIN_NAME/openai-gpt-core"
+GOOGLE_DIR="$PLUGIN_DIR/$PLUGIN_NAME/google"
 
 GREEN="\e[32m"
 YELLOW="\e[33m"
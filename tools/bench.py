@@ -0,0 +1,266 @@
+"""
+End-to-end streaming benchmark for the plugin's transport backends against
+the offline mock server (tools/mock_server.py); no API keys needed. With
+--replay DIR every backend is fed the same recorded streams: .sse bodies,
+or the plugin's recordings (recorder.py) at --replay-speed times their
+recorded pace.
+
+Each backend/provider pair runs in its own subprocess so CPU time and peak
+RSS are not mixed up with the mock server or with each other. Inserts go
+through a simulated main loop (a queue drained by one thread, standing in
+for GObject.idle_add + append_to_doc), so the insert cost is the scheduling
+hop plus a Python-side append, not GtkTextBuffer work.
+
+    python3 tools/bench.py --runs 5 --tokens 1000 --rate 0 --out bench.json
+    python3 tools/bench.py --replay captures/ --rate 0
+    python3 tools/bench.py --replay recordings/ --replay-speed 0
+
+--stream-modes compares the SDK backends' "sdk" (pydantic models per
+chunk) and "raw" paths side by side, and --memory adds a tracemalloc pass per pair
+(kept out of the CPU numbers) reporting peak traced memory per run.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import types
+import argparse
+import platform
+import resource
+import threading
+import subprocess
+import tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+sys.path.insert(0, TOOLS_DIR)
+
+import mock_server
+
+PLUGIN_DIR = os.path.join(REPO_DIR, "hello-gpt")
+BACKENDS = ("stdlib", "sdk")
+
+# -------------------------
+# Loading the plugin headless
+# -------------------------
+def load_package():
+    """
+    Registers the plugin directory as an importable package without
+    running its __init__.py (which needs gedit) and returns the package name.
+    """
+    name = "hello_gpt_bench"
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = [PLUGIN_DIR]
+        sys.modules[name] = package
+    return name
+
+def load_engine(backend, provider, base_url, stream_mode=None):
+    engine = __import__(f"{load_package()}.engine", fromlist=["engine"])
+    section = engine.provider_config(provider)
+    section["api_key"] = "mock-key"
+    section["base_url"] = base_url + ("/v1/" if provider == "openai" else "/")
+    section["backend"] = backend
+    if stream_mode and stream_mode != "default":
+        section["stream_mode"] = stream_mode
+    return engine
+
+
+# -------------------------
+# Simulated gedit main loop
+# -------------------------
+class MainLoop:
+    """
+    Single consumer thread standing in for the GTK main loop.
+    """
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.insert_time = 0.0
+        self.inserts = 0
+        self.max_delay = 0.0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def idle_add(self, func, *args):
+        self.queue.put((time.perf_counter(), func, args))
+
+    def run(self):
+        while True:
+            queued, func, args = self.queue.get()
+            if func is None:
+                return
+            start = time.perf_counter()
+            self.max_delay = max(self.max_delay, start - queued)
+            func(*args)
+            self.insert_time += time.perf_counter() - start
+
+    def drain(self):
+        done = threading.Event()
+        self.idle_add(done.set)
+        done.wait()
+
+    def append_to_doc(self, doc, text):
+        doc.append(text)
+        self.inserts += 1
+
+
+# -------------------------
+# Worker (one backend/provider)
+# -------------------------
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def run_worker(backend, provider, base_url, runs, stream_mode=None, memory=False):
+    try:
+        engine = load_engine(backend, provider, base_url, stream_mode)
+        # load() falls back to stdlib when the SDK is missing
+        loaded, _ = engine.backends.load(provider, backend)
+    except Exception as e:
+        return {"skipped": f"engine import failed: {e}"}
+    if loaded != backend:
+        return {"skipped": f"{provider} SDK is not importable in this Python"}
+
+    loop = MainLoop()
+    samples = run_samples(engine, provider, loop, runs)
+    result = summarize_samples(samples, loop, runs)
+
+    if memory:
+        # A separate pass: tracemalloc slows every allocation down
+        tracemalloc.start()
+        peaks = []
+        for _ in range(runs):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            run_samples(engine, provider, loop, 1)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        result["traced_peak_kb"] = max(peaks) / 1024
+    return result
+
+def run_samples(engine, provider, loop, runs):
+    samples = []
+    for _ in range(runs):
+        doc = []
+        sample = {"ttft": None, "chunks": 0, "chars": 0, "error": None}
+        start = time.perf_counter()
+        run_cpu = time.process_time()
+
+        def callback(event_type, data):
+            if event_type == "text":
+                if sample["ttft"] is None:
+                    sample["ttft"] = time.perf_counter() - start
+                sample["chunks"] += 1
+                sample["chars"] += len(data)
+                loop.idle_add(loop.append_to_doc, doc, data)
+            elif event_type in ("error", "stall"):
+                sample["error"] = str(data)
+
+        engine.chat_stream("Benchmark prompt", callback, provider, "mock-model")
+        loop.drain()
+        sample["total"] = time.perf_counter() - start
+        sample["cpu"] = time.process_time() - run_cpu
+        samples.append(sample)
+    return samples
+
+def summarize_samples(samples, loop, runs):
+    ok = [s for s in samples if not s["error"]]
+    chunks = sum(s["chunks"] for s in ok)
+    cpu = sum(s["cpu"] for s in samples)
+    return {
+        "runs": runs,
+        "errors": [s["error"] for s in samples if s["error"]],
+        "ttft_p50": percentile([s["ttft"] for s in ok if s["ttft"] is not None], 0.5),
+        "ttft_p95": percentile([s["ttft"] for s in ok if s["ttft"] is not None], 0.95),
+        "total_p50": percentile([s["total"] for s in ok], 0.5),
+        "chars_per_s": sum(s["chars"] for s in ok) / max(sum(s["total"] for s in ok), 1e-9),
+        "chunks_per_run": chunks / len(ok) if ok else 0,
+        "cpu_ms_per_run": 1000 * cpu / runs,
+        "cpu_us_per_chunk": 1e6 * cpu / chunks if chunks else None,
+        "insert_us_mean": 1e6 * loop.insert_time / loop.inserts if loop.inserts else None,
+        "insert_max_queue_delay_ms": 1000 * loop.max_delay,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+# -------------------------
+# Driver
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark plugin streaming paths offline")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--providers", nargs="+", default=["openai", "gemini"], choices=["openai", "gemini"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--stream-modes", nargs="+", default=["default"],
+                        help="SDK backend stream modes to compare, e.g. sdk raw")
+    parser.add_argument("--memory", action="store_true", help="add a tracemalloc pass")
+    parser.add_argument("--worker", nargs=4, metavar=("BACKEND", "PROVIDER", "BASE_URL", "MODE"),
+                        help=argparse.SUPPRESS)
+    mock_server.add_scenario_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        backend, provider, base_url, mode = args.worker
+        print(json.dumps(run_worker(backend, provider, base_url, args.runs, mode, args.memory)))
+        return 0
+
+    scenario = mock_server.scenario_from_args(args)
+    server = mock_server.serve(0, **scenario)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = []
+    for backend in args.backends:
+        # Stream modes only exist in the SDK backends
+        modes = args.stream_modes if backend == "sdk" else ["default"]
+        for provider in args.providers:
+            for mode in modes:
+                command = [sys.executable, os.path.abspath(__file__), "--runs", str(args.runs),
+                           "--worker", backend, provider, base_url, mode]
+                if args.memory:
+                    command.append("--memory")
+                output = subprocess.run(command, capture_output=True, text=True)
+                try:
+                    result = json.loads(output.stdout.strip().splitlines()[-1])
+                except (IndexError, ValueError):
+                    result = {"skipped": f"worker crashed: {output.stderr.strip()[-500:]}"}
+                result.update(backend=backend, provider=provider, stream_mode=mode)
+                results.append(result)
+                print(format_result(result), file=sys.stderr)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scenario": scenario,
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}", file=sys.stderr)
+    return 0
+
+def format_result(result):
+    name = f"{result['backend']:>6}/{result['provider']:<6}"
+    if result.get("stream_mode", "default") != "default":
+        name += f" [{result['stream_mode']}]"
+    if "skipped" in result:
+        return f"{name} skipped: {result['skipped']}"
+
+    def number(key, scale=1.0, unit=""):
+        value = result.get(key)
+        return "-" if value is None else f"{value * scale:.1f}{unit}"
+
+    return (f"{name} ttft p50 {number('ttft_p50', 1000, 'ms')} "
+            f"total p50 {number('total_p50', 1000, 'ms')} "
+            f"{number('chars_per_s')} chars/s cpu {number('cpu_us_per_chunk', unit='us')}/chunk "
+            f"insert {number('insert_us_mean', unit='us')} rss {result['peak_rss_kb']} KB "
+            + (f"traced peak {number('traced_peak_kb', unit=' KB')} " if "traced_peak_kb" in result else "")
+            + f"errors {len(result['errors'])}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
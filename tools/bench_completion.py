@@ -0,0 +1,178 @@
+"""
+Inline completion latency (hello-gpt/completion.py) against the offline
+mock server: a simulated typist enters text key by key and pauses now and
+then, and a controller that behaves like the plugin's (debounce timer,
+cancel on every key, suggestion cache) requests a suggestion for each
+pause. Reported per backend: time from the last keystroke to the first
+suggestion character (which includes the "delay"), the request part of
+it, and how many requests were cancelled or answered from the cache.
+
+    python3 tools/bench_completion.py --ttft 0.15 --delay 0.25 --pauses 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import mock_server
+from bench import BACKENDS, load_package, load_engine, percentile
+from bench_keystroke import start_mock_server
+
+TEXT = ("def parse(line):\n    key, value = line.split('=', 1)\n    return key.strip(), value.strip()\n"
+        "for line in open(path):\n    settings.update([parse(line)])\n")
+
+
+# -------------------------
+# Plugin-like controller
+# -------------------------
+class Controller:
+    """
+    Debounces keys, cancels the request in flight on every key and serves
+    repeated contexts from a SuggestionCache, as the plugin does.
+    """
+    def __init__(self, engine, completion, cancel_token, provider, delay):
+        self.engine = engine
+        self.completion = completion
+        self.cancel_token = cancel_token
+        self.provider = provider
+        self.delay = delay
+        self.settings = completion.completion_config()
+        self.cache = completion.SuggestionCache(self.settings["cache_size"])
+        self.timer = None
+        self.cancel = None
+        self.last_key = None
+        self.lock = threading.Lock()
+        self.samples = []
+        self.counts = {"requests": 0, "cancelled": 0, "cache_hits": 0, "errors": 0}
+
+    def key(self, text):
+        with self.lock:
+            self.last_key = time.perf_counter()
+            if self.timer:
+                self.timer.cancel()
+            if self.cancel:
+                self.cancel.cancel()
+                self.cancel = None
+            self.timer = threading.Timer(self.delay, self.fire, (text, self.last_key))
+            self.timer.start()
+
+    def fire(self, text, last_key):
+        fired = time.perf_counter()
+        prefix = text[-self.settings["prefix_chars"]:]
+        if self.cache.get(prefix, ""):
+            self.counts["cache_hits"] += 1
+            self.samples.append({"from_key": time.perf_counter() - last_key, "request": 0.0})
+            return
+        with self.lock:
+            if self.last_key != last_key:
+                return
+            self.cancel = cancel = self.cancel_token()
+        self.counts["requests"] += 1
+        threading.Thread(target=self.request, args=(prefix, cancel, last_key, fired), daemon=True).start()
+
+    def request(self, prefix, cancel, last_key, fired):
+        first = []
+        parts = []
+
+        def callback(event_type, data):
+            if event_type == "text":
+                if not first:
+                    first.append(time.perf_counter())
+                parts.append(data)
+            elif event_type in ("error", "stall"):
+                self.counts["errors"] += 1
+
+        options = dict(self.completion.completion_options(self.settings), cancel=cancel)
+        self.engine.chat_stream(self.completion.completion_prompt(prefix, ""), callback, self.provider,
+                                "mock-model", options=options)
+        if cancel.cancelled:
+            self.counts["cancelled"] += 1
+        elif first:
+            self.cache.put(prefix, "", "".join(parts))
+            self.samples.append({"from_key": first[0] - last_key, "request": first[0] - fired})
+
+
+# -------------------------
+# Typist
+# -------------------------
+def type_text(controller, pauses, key_interval, pause, burst):
+    """
+    Types TEXT (repeated as needed), pausing after every burst characters
+    until pauses pauses have been made.
+    """
+    typed = ""
+    made = 0
+    while made < pauses:
+        for char in TEXT:
+            typed += char
+            controller.key(typed)
+            time.sleep(key_interval)
+            if len(typed) % burst == 0:
+                time.sleep(pause)
+                made += 1
+                if made >= pauses:
+                    break
+    time.sleep(pause)
+
+def run_backend(backend, args, base_url):
+    engine = load_engine(backend, args.provider, base_url)
+    package = load_package()
+    completion = __import__(f"{package}.completion", fromlist=["completion"])
+    backends = __import__(f"{package}.backends", fromlist=["backends"])
+    controller = Controller(engine, completion, backends.CancelToken, args.provider, args.delay)
+    # Pay imports and the first connection before measuring
+    engine.chat_stream("warm up", lambda *event: None, args.provider, "mock-model")
+    type_text(controller, args.pauses, args.key_interval / 1000, args.pause / 1000, args.burst)
+
+    from_key = [s["from_key"] for s in controller.samples]
+    request = [s["request"] for s in controller.samples if s["request"]]
+    return dict(controller.counts, backend=backend, provider=args.provider, suggestions=len(from_key),
+                from_key_p50_ms=1000 * percentile(from_key, 0.5), from_key_p95_ms=1000 * percentile(from_key, 0.95),
+                request_p50_ms=1000 * percentile(request, 0.5), request_p95_ms=1000 * percentile(request, 0.95))
+
+def format_result(result):
+    return (f"{result['backend']:>7}/{result['provider']}: {result['suggestions']} suggestions | "
+            f"from last key p50 {result['from_key_p50_ms']:.0f}ms p95 {result['from_key_p95_ms']:.0f}ms | "
+            f"request p50 {result['request_p50_ms']:.0f}ms p95 {result['request_p95_ms']:.0f}ms | "
+            f"{result['requests']} requests, {result['cancelled']} cancelled, "
+            f"{result['cache_hits']} cache hits, {result['errors']} errors")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inline completion latency with debounce and cancellation")
+    parser.add_argument("--backends", nargs="+", default=["stdlib"], choices=list(BACKENDS))
+    parser.add_argument("--provider", default="openai", choices=["openai", "gemini"])
+    parser.add_argument("--delay", type=float, default=0.25, help="typing pause before a request (s)")
+    parser.add_argument("--pauses", type=int, default=20, help="typing pauses to measure")
+    parser.add_argument("--burst", type=int, default=12, help="characters typed between pauses")
+    parser.add_argument("--key-interval", type=float, default=60.0, help="ms between keystrokes")
+    parser.add_argument("--pause", type=float, default=800.0, help="ms of each pause")
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    mock_server.add_scenario_arguments(parser)
+    parser.set_defaults(tokens=16, rate=0, ttft=0.15)
+    args = parser.parse_args(argv)
+
+    server, base_url = start_mock_server(args)
+    try:
+        results = []
+        for backend in args.backends:
+            result = run_backend(backend, args, base_url)
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+    finally:
+        server.terminate()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"scenario": mock_server.scenario_from_args(args), "delay": args.delay,
+                       "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Memory and startup of N headless "gedit" processes running the plugin's
+engine in-process, against the same N processes sharing one per-user daemon
+("daemon": {"enabled": true}, see hello-gpt/daemon.py).
+
+Each client process loads the plugin package, sends one request to the mock
+server and then stays alive, so resident memory can be summed over all of
+them (plus the daemon's) at the same time. Startup is the time from
+spawning a client to its first finished reply.
+
+    python3 tools/bench_daemon.py --clients 4 --backend sdk --provider gemini
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import mock_server
+from bench import PLUGIN_DIR, BACKENDS, load_package, load_engine
+from bench_keystroke import start_mock_server
+
+MODES = ("inprocess", "daemon")
+
+
+# -------------------------
+# Client process
+# -------------------------
+def run_client(mode, backend, provider, base_url, socket):
+    """
+    One stand-in gedit process: prints its timings, then waits for stdin
+    to close.
+    """
+    start = time.perf_counter()
+    engine = load_engine(backend, provider, base_url)
+    events = []
+    if mode == "daemon":
+        daemon = __import__(f"{load_package()}.daemon", fromlist=["daemon"])
+        client = daemon.connect_daemon({"socket": socket})
+        if client is None:
+            print(json.dumps({"error": "daemon unreachable"}), flush=True)
+            return 1
+        client.start_reader()
+        loaded = time.perf_counter()
+        client.chat_stream("Benchmark prompt", lambda event_type, data: events.append(event_type),
+                           provider, "mock-model")
+    else:
+        loaded = time.perf_counter()
+        engine.chat_stream("Benchmark prompt", lambda event_type, data: events.append(event_type),
+                           provider, "mock-model")
+    done = time.perf_counter()
+    print(json.dumps({"load_s": loaded - start, "request_s": done - loaded,
+                      "ok": "done" in events, "text_events": events.count("text")}), flush=True)
+    sys.stdin.read()
+    return 0
+
+
+# -------------------------
+# Driver
+# -------------------------
+def rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def start_daemon(socket):
+    """
+    Starts the daemon the way the plugin does and waits until it listens.
+    """
+    process = subprocess.Popen([sys.executable, PLUGIN_DIR, "--daemon", "--socket", socket],
+                               stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+    start = time.perf_counter()
+    while not os.path.exists(socket):
+        if process.poll() is not None or time.perf_counter() - start > 10:
+            raise OSError("daemon did not start")
+        time.sleep(0.01)
+    return process, time.perf_counter() - start
+
+def run_mode(mode, args, base_url):
+    socket = os.path.join(tempfile.mkdtemp(prefix="hello-gpt-bench-"), "daemon.sock")
+    daemon, daemon_start = (start_daemon(socket) if mode == "daemon" else (None, None))
+    clients = []
+    try:
+        results = []
+        for _ in range(args.clients):
+            spawned = time.perf_counter()
+            process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--client", mode,
+                                        args.backend, args.provider, base_url, socket],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            clients.append(process)
+            result = json.loads(process.stdout.readline() or '{"error": "client crashed"}')
+            result["startup_s"] = time.perf_counter() - spawned
+            results.append(result)
+
+        client_rss = [rss_kb(process.pid) for process in clients]
+        daemon_rss = rss_kb(daemon.pid) if daemon else 0
+    finally:
+        for process in clients:
+            process.stdin.close()
+            process.wait()
+        if daemon:
+            daemon.terminate()
+            daemon.wait()
+
+    ok = [r for r in results if r.get("ok")]
+    return {
+        "mode": mode,
+        "clients": args.clients,
+        "failed": len(results) - len(ok),
+        "client_rss_kb": client_rss,
+        "daemon_rss_kb": daemon_rss,
+        "total_rss_kb": sum(client_rss) + daemon_rss,
+        "daemon_start_s": daemon_start,
+        "first_startup_s": results[0]["startup_s"] if results else None,
+        "mean_startup_s": sum(r["startup_s"] for r in results) / len(results) if results else None,
+        "mean_request_s": sum(r["request_s"] for r in ok) / len(ok) if ok else None,
+    }
+
+def format_result(result):
+    daemon = (f" + daemon {result['daemon_rss_kb'] / 1024:.1f} MB (listening after "
+              f"{result['daemon_start_s']:.2f}s)" if result["daemon_start_s"] is not None else "")
+    return (f"{result['mode']:>9}: {result['clients']} clients {sum(result['client_rss_kb']) / 1024:.1f} MB"
+            f"{daemon} = {result['total_rss_kb'] / 1024:.1f} MB | startup first {result['first_startup_s']:.2f}s "
+            f"mean {result['mean_startup_s']:.2f}s | request mean {result['mean_request_s'] or 0:.3f}s "
+            f"failed {result['failed']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory/startup: N in-process copies vs one daemon")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--backend", default="stdlib", choices=list(BACKENDS))
+    parser.add_argument("--provider", default="openai", choices=["openai", "gemini"])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    parser.add_argument("--client", nargs=5, metavar=("MODE", "BACKEND", "PROVIDER", "BASE_URL", "SOCKET"),
+                        help=argparse.SUPPRESS)
+    mock_server.add_scenario_arguments(parser)
+    parser.set_defaults(tokens=200, rate=0)
+    args = parser.parse_args(argv)
+
+    if args.client:
+        return run_client(*args.client)
+
+    server, base_url = start_mock_server(args)
+    try:
+        results = []
+        for mode in args.modes:
+            result = run_mode(mode, args, base_url)
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+    finally:
+        server.terminate()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"backend": args.backend, "provider": args.provider,
+                       "scenario": mock_server.scenario_from_args(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+CPU cost of decoding SSE chunks: the old json.loads + dict walk against
+each ChunkDecoder configuration (json/jiter, with and without the fast
+path). Reports microseconds per chunk and CPU saved per 1,000 chunks, and
+checks every configuration extracts exactly the same text.
+
+Chunks are either synthesized in the providers' wire format or read from
+a captured stream (the raw body of a streaming response, e.g. saved with
+curl -N):
+
+    python3 tools/bench_decode.py --chunks 5000
+    python3 tools/bench_decode.py --input openai.sse --provider openai
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+from bench import load_package
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+         "tempor incididunt ut labore et dolore magna aliqua \"quoted\" naïve\n").split(" ")
+
+# -------------------------
+# Recorded or synthesized streams
+# -------------------------
+def synthesize(provider, count):
+    """
+    Payloads shaped like the live APIs: compact OpenAI chunks with usage,
+    logprobs and obfuscation fields, spaced Gemini chunks with cumulative
+    usageMetadata, each ending with a finish/usage chunk.
+    """
+    payloads = []
+    for i in range(count):
+        text = " " + WORDS[i % len(WORDS)]
+        if provider == "openai":
+            payloads.append(json.dumps({
+                "id": "chatcmpl-CPxZ3", "object": "chat.completion.chunk", "created": 1760000000,
+                "model": "gpt-4o-mini-2024-07-18", "service_tier": "default",
+                "system_fingerprint": "fp_560af6e559",
+                "choices": [{"index": 0, "delta": {"content": text}, "logprobs": None, "finish_reason": None}],
+                "usage": None, "obfuscation": "Qm3xT"
+            }, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        else:
+            payloads.append(json.dumps({
+                "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}],
+                "usageMetadata": {"promptTokenCount": 8, "candidatesTokenCount": i + 1,
+                                  "totalTokenCount": i + 9,
+                                  "promptTokensDetails": [{"modality": "TEXT", "tokenCount": 8}]},
+                "modelVersion": "gemini-2.5-flash", "responseId": "mock-response"
+            }).encode("utf-8"))
+
+    if provider == "openai":
+        payloads.append(b'{"id":"chatcmpl-CPxZ3","object":"chat.completion.chunk","choices":'
+                        b'[{"index":0,"delta":{},"logprobs":null,"finish_reason":"stop"}],"usage":null}')
+        payloads.append(b'{"id":"chatcmpl-CPxZ3","object":"chat.completion.chunk","choices":[],'
+                        b'"usage":{"prompt_tokens":8,"completion_tokens":%d,"total_tokens":%d}}'
+                        % (count, count + 8))
+    else:
+        payloads.append(json.dumps({
+            "candidates": [{"content": {"parts": [{"text": ""}], "role": "model"},
+                            "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": 8, "candidatesTokenCount": count,
+                              "totalTokenCount": count + 8},
+            "modelVersion": "gemini-2.5-flash"
+        }).encode("utf-8"))
+    return payloads
+
+def read_capture(path):
+    payloads = []
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(b"data: ") and line != b"data: [DONE]":
+                payloads.append(line[6:])
+    return payloads
+
+
+# -------------------------
+# Extraction paths
+# -------------------------
+def baseline_openai(payloads):
+    out = []
+    for payload in payloads:
+        data = json.loads(payload.decode("utf-8"))
+        content = (data.get("choices") or [{}])[0].get("delta", {}).get("content", "")
+        if content:
+            out.append(content)
+    return out
+
+def baseline_gemini(payloads):
+    out = []
+    for payload in payloads:
+        data = json.loads(payload.decode("utf-8"))
+        if "candidates" in data and data["candidates"]:
+            candidate = data["candidates"][0]
+            if "content" in candidate and "parts" in candidate["content"]:
+                for part in candidate["content"]["parts"]:
+                    if part.get("text"):
+                        out.append(part["text"])
+    return out
+
+def decoded_openai(decoder, payloads):
+    out = []
+    for payload in payloads:
+        content = decoder.openai_text(payload)
+        if content is None:
+            data = decoder.loads(payload)
+            content = (data.get("choices") or [{}])[0].get("delta", {}).get("content", "")
+        if content:
+            out.append(content)
+    return out
+
+def decoded_gemini(decoder, payloads):
+    out = []
+    for payload in payloads:
+        text = decoder.gemini_text(payload)
+        if text is None:
+            data = decoder.loads(payload)
+            for candidate in data.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        out.append(part["text"])
+        elif text:
+            out.append(text)
+    return out
+
+def cpu_per_chunk(func, payloads, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        result = func(payloads)
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(payloads), result
+
+
+# -------------------------
+# Driver
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SSE chunk decoding")
+    parser.add_argument("--provider", choices=["openai", "gemini"], nargs="+", default=["openai", "gemini"])
+    parser.add_argument("--input", help="captured SSE body (use with a single --provider)")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    decoder_module = __import__(f"{load_package()}.decoder", fromlist=["decoder"])
+    configs = [("json", False), ("json", True), ("jiter", False), ("jiter", True)]
+
+    for provider in args.provider:
+        payloads = read_capture(args.input) if args.input else synthesize(provider, args.chunks)
+        baseline = baseline_openai if provider == "openai" else baseline_gemini
+        decoded = decoded_openai if provider == "openai" else decoded_gemini
+        base_cost, expected = cpu_per_chunk(baseline, payloads, args.repeat)
+        print(f"{provider}: {len(payloads)} chunks, json.loads + dict walk "
+              f"{base_cost * 1e6:.2f} us/chunk ({base_cost * 1e6:.2f} ms per 1,000 chunks)")
+
+        for backend, fast_path in configs:
+            name = f"{backend}{' + fast path' if fast_path else ''}"
+            try:
+                decoder = decoder_module.ChunkDecoder(backend, fast_path)
+            except ValueError as e:
+                print(f"  {name:<18} skipped: {e}")
+                continue
+            cost, result = cpu_per_chunk(lambda p: decoded(decoder, p), payloads, args.repeat)
+            status = "ok" if result == expected else "TEXT MISMATCH"
+            print(f"  {name:<18} {cost * 1e6:6.2f} us/chunk, saves "
+                  f"{(base_cost - cost) * 1e6:5.2f} ms CPU per 1,000 chunks "
+                  f"({100 * (1 - cost / base_cost):.0f}%) {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Document fingerprint performance (hello-gpt/fingerprint.py) on a synthetic
+log: the first cut, per-edit cost of the insert-text / delete-range
+updates, refreshing after an edit and after a burst of edits, and taking a
+snapshot plus a prefix check against an earlier one. Also checks that the
+incrementally updated blocks equal those of a fresh cut. The buffer is a
+string standing in for the GtkTextBuffer.
+
+    python3 tools/bench_fingerprint.py --mb 20 --edits 500
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+from bench import load_package, percentile
+from bench_lexical import make_log
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Block fingerprint build, edit and refresh times")
+    parser.add_argument("--mb", type=float, default=20.0, help="document size in MB")
+    parser.add_argument("--edits", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=50, help="edits between refreshes in the burst run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    fingerprint = __import__(f"{load_package()}.fingerprint", fromlist=["fingerprint"])
+    rng = random.Random(args.seed)
+    buffer = ["".join(make_log(args.mb, args.seed))]
+    get_text = lambda start, end: buffer[0][start:end]
+    document = fingerprint.DocumentFingerprint(get_text, len(buffer[0]))
+
+    start = time.perf_counter()
+    first = document.snapshot()
+    build_s = time.perf_counter() - start
+
+    def edit():
+        text = buffer[0]
+        offset = rng.randrange(len(text))
+        started = time.perf_counter()
+        if rng.random() < 0.7:
+            document.insert(offset, 1)
+            elapsed = time.perf_counter() - started
+            buffer[0] = text[:offset] + "x" + text[offset:]
+        else:
+            end = min(len(text), offset + rng.choice((1, 40, 2000)))
+            document.delete(offset, end)
+            elapsed = time.perf_counter() - started
+            buffer[0] = text[:offset] + text[end:]
+        return elapsed
+
+    edit_times = []
+    refresh_times = []
+    for _ in range(args.edits):
+        edit_times.append(edit())
+        start = time.perf_counter()
+        document.refresh()
+        refresh_times.append(time.perf_counter() - start)
+
+    for _ in range(args.burst):
+        edit()
+    start = time.perf_counter()
+    burst_read = document.refresh()
+    burst_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = document.snapshot()
+    blocks, _, prefix = first.prefix(len(buffer[0]) // 2)
+    snapshot.has_prefix(blocks, prefix)
+    snapshot_s = time.perf_counter() - start
+
+    fresh = fingerprint.DocumentFingerprint(get_text, len(buffer[0])).snapshot()
+    canonical = snapshot.hashes == fresh.hashes and snapshot.lengths == fresh.lengths
+
+    result = {"mb": args.mb, "blocks": len(snapshot.lengths), "build_s": build_s, "edits": args.edits,
+              "edit_p50_ms": 1000 * percentile(edit_times, 0.5), "edit_max_ms": 1000 * max(edit_times),
+              "refresh_p50_ms": 1000 * percentile(refresh_times, 0.5),
+              "refresh_p95_ms": 1000 * percentile(refresh_times, 0.95),
+              "burst": args.burst, "burst_refresh_ms": 1000 * burst_s, "burst_read_chars": burst_read,
+              "snapshot_ms": 1000 * snapshot_s, "canonical": canonical}
+    print(f"{result['mb']:.0f} MB, {result['blocks']} blocks | build {result['build_s']:.2f}s | "
+          f"edit p50 {result['edit_p50_ms']:.3f}ms max {result['edit_max_ms']:.2f}ms | "
+          f"refresh p50 {result['refresh_p50_ms']:.1f}ms p95 {result['refresh_p95_ms']:.1f}ms | "
+          f"{result['burst']} edits then refresh {result['burst_refresh_ms']:.0f}ms "
+          f"({result['burst_read_chars'] / 1e6:.1f} MB read) | snapshot + prefix {result['snapshot_ms']:.1f}ms | "
+          f"{'matches' if canonical else 'DIFFERS FROM'} a fresh cut", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0 if canonical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Keystroke latency while a reply streams in, with the plugin's requests run
+in-process (the default) and in the worker process ("worker": {"enabled":
+true}, see hello-gpt/worker.py).
+
+A simulated gedit main loop (a select() loop with an idle queue and IO
+watches, like GLib's) handles a synthetic keystroke every --interval ms
+and records how long each one waited. In-process, the stream runs on a
+thread of this process and every delta is an idle callback; with the
+worker, deltas arrive on a pipe watched by the loop. The mock server runs
+in its own process so it does not compete for this one's GIL.
+
+    python3 tools/bench_keystroke.py --rate 200 --tokens 2000 --streams 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import selectors
+import threading
+import subprocess
+from collections import deque
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import mock_server
+from bench import BACKENDS, load_package, load_engine, percentile
+
+MODES = ("inprocess", "worker")
+
+
+# -------------------------
+# Simulated gedit main loop
+# -------------------------
+class SelectLoop:
+    """
+    Runs idle callbacks and fd watches on the thread that calls run().
+    """
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.pending = deque()
+        self.wake_read, self.wake_write = os.pipe()
+        self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+
+    def idle_add(self, func, *args):
+        self.pending.append((func, args))
+        os.write(self.wake_write, b"x")
+
+    def io_add_watch(self, fd, func):
+        self.selector.register(fd, selectors.EVENT_READ, func)
+
+    def run(self, until):
+        while not until():
+            for key, _ in self.selector.select(0.1):
+                if key.data is None:
+                    os.read(self.wake_read, 4096)
+                    while self.pending:
+                        func, args = self.pending.popleft()
+                        func(*args)
+                elif not key.data():
+                    self.selector.unregister(key.fd)
+
+
+# -------------------------
+# One measured run
+# -------------------------
+def start_mock_server(args):
+    command = [sys.executable, os.path.join(TOOLS_DIR, "mock_server.py"), "--port", "0"]
+    for key, value in mock_server.scenario_from_args(args).items():
+        if value is not None:
+            command += [f"--{key.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    return process, line.split()[-1].rstrip("/")
+
+def run_mode(mode, engine, worker_module, provider, streams, interval):
+    loop = SelectLoop()
+    doc = []
+    latencies = []
+    state = {"remaining": streams, "chars": 0, "errors": []}
+    stop = threading.Event()
+
+    def append(text):
+        doc.append(text)
+        state["chars"] += len(text)
+
+    def finished():
+        state["remaining"] -= 1
+
+    def callback(event_type, data, direct):
+        if event_type == "text":
+            if direct:
+                append(data)
+            else:
+                loop.idle_add(append, data)
+        elif event_type in ("error", "stall"):
+            state["errors"].append(str(data))
+        if event_type in worker_module.FINAL_EVENTS:
+            if direct:
+                finished()
+            else:
+                loop.idle_add(finished)
+
+    def keystroke(posted):
+        latencies.append(time.perf_counter() - posted)
+
+    def type_keys():
+        while not stop.wait(interval):
+            loop.idle_add(keystroke, time.perf_counter())
+
+    client = None
+    if mode == "worker":
+        client = worker_module.WorkerClient().start()
+        loop.io_add_watch(client.fileno(), client.on_readable)
+        # Pay the worker's imports before measuring
+        warm = []
+        client.submit("warm up", lambda event_type, data: warm.append(event_type), provider, "mock-model")
+        loop.run(lambda: warm and warm[-1] in worker_module.FINAL_EVENTS)
+    else:
+        engine.chat_stream("warm up", lambda *event: None, provider, "mock-model")
+
+    start = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(streams):
+        if client:
+            client.submit("Benchmark prompt", lambda t, d: callback(t, d, True), provider, "mock-model")
+        else:
+            threading.Thread(target=engine.chat_stream, daemon=True,
+                             args=("Benchmark prompt", lambda t, d: callback(t, d, False), provider,
+                                   "mock-model")).start()
+    typist = threading.Thread(target=type_keys, daemon=True)
+    typist.start()
+    loop.run(lambda: state["remaining"] <= 0)
+    stop.set()
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    if client:
+        client.stop()
+
+    return {
+        "mode": mode,
+        "keystrokes": len(latencies),
+        "key_p50_ms": 1000 * percentile(latencies, 0.5) if latencies else None,
+        "key_p95_ms": 1000 * percentile(latencies, 0.95) if latencies else None,
+        "key_p99_ms": 1000 * percentile(latencies, 0.99) if latencies else None,
+        "key_max_ms": 1000 * max(latencies) if latencies else None,
+        "gedit_cpu_ms": 1000 * cpu,
+        "wall_s": wall,
+        "chars": state["chars"],
+        "errors": state["errors"],
+    }
+
+def format_result(result):
+    if "skipped" in result:
+        return f"{result['mode']:>9} skipped: {result['skipped']}"
+    return (f"{result['mode']:>9} keystroke p50 {result['key_p50_ms']:.2f}ms p95 {result['key_p95_ms']:.2f}ms "
+            f"p99 {result['key_p99_ms']:.2f}ms max {result['key_max_ms']:.2f}ms | "
+            f"gedit-side cpu {result['gedit_cpu_ms']:.0f}ms over {result['wall_s']:.1f}s "
+            f"{result['chars']} chars errors {len(result['errors'])}")
+
+
+# -------------------------
+# Driver
+# -------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keystroke latency in-process vs. worker process")
+    parser.add_argument("--backend", default="stdlib", choices=list(BACKENDS))
+    parser.add_argument("--provider", default="openai", choices=["openai", "gemini"])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--streams", type=int, default=1, help="concurrent replies")
+    parser.add_argument("--interval", type=float, default=10.0, help="ms between keystrokes")
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    mock_server.add_scenario_arguments(parser)
+    parser.set_defaults(rate=200.0, tokens=2000)
+    args = parser.parse_args(argv)
+
+    server, base_url = start_mock_server(args)
+    try:
+        engine = load_engine(args.backend, args.provider, base_url)
+        worker_module = __import__(f"{load_package()}.worker", fromlist=["worker"])
+        results = []
+        for mode in args.modes:
+            try:
+                result = run_mode(mode, engine, worker_module, args.provider, args.streams,
+                                  args.interval / 1000)
+            except OSError as e:
+                result = {"mode": mode, "skipped": str(e)}
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+    finally:
+        server.terminate()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"backend": args.backend, "provider": args.provider, "streams": args.streams,
+                       "scenario": mock_server.scenario_from_args(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Long-document index performance (hello-gpt/lexical.py) on a synthetic
+log: full build, per-edit cost of the insert-text / delete-range updates,
+re-indexing the chunks an edit burst left stale, and ranking questions.
+The buffer is a list of lines standing in for the GtkTextBuffer.
+
+    python3 tools/bench_lexical.py --mb 20 --edits 2000 --queries 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+from bench import load_package, percentile
+
+SERVICES = ("auth", "billing", "gateway", "scheduler", "storage", "search", "mailer", "ledger")
+LEVELS = ("INFO", "INFO", "INFO", "DEBUG", "WARN", "ERROR")
+EVENTS = ("request served in {n}ms", "cache miss for key user:{n}", "retrying upstream call attempt {n}",
+          "connection reset by peer after {n} bytes", "disk usage at {n} percent", "queue depth {n}",
+          "token refresh failed with status {n}", "worker {n} restarted after timeout")
+
+
+def make_log(megabytes, seed):
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < megabytes * 1e6:
+        line = (f"2026-10-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d} "
+                f"{rng.choice(LEVELS)} {rng.choice(SERVICES)} "
+                f"{rng.choice(EVENTS).format(n=rng.randint(1, 99999))}\n")
+        lines.append(line)
+        size += len(line)
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="BM25 chunk index build, edit and ranking times")
+    parser.add_argument("--mb", type=float, default=20.0, help="document size in MB")
+    parser.add_argument("--chunk-lines", type=int, default=40)
+    parser.add_argument("--edits", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    lexical = __import__(f"{load_package()}.lexical", fromlist=["lexical"])
+    rng = random.Random(args.seed)
+    lines = make_log(args.mb, args.seed)
+    index = lexical.ChunkIndex(lambda first, count: "".join(lines[first:first + count]), len(lines),
+                               args.chunk_lines)
+
+    start = time.perf_counter()
+    index.refresh()
+    build_s = time.perf_counter() - start
+
+    # Edits as the buffer signals report them: typing, new lines, deleted lines
+    edit_times = []
+    for _ in range(args.edits):
+        line = rng.randrange(len(lines))
+        kind = rng.random()
+        start = time.perf_counter()
+        if kind < 0.7:
+            index.insert(line, 0)
+            lines[line] = "x" + lines[line]
+        elif kind < 0.85:
+            index.insert(line, 1)
+            lines.insert(line, "inserted line\n")
+        elif line + 3 < len(lines):
+            index.delete(line, line + 3)
+            lines[line:line + 3] = []
+        edit_times.append(time.perf_counter() - start)
+    stale = index.stale
+    start = time.perf_counter()
+    index.refresh()
+    refresh_s = time.perf_counter() - start
+
+    query_times = []
+    for _ in range(args.queries):
+        question = (f"why did {rng.choice(SERVICES)} log {rng.choice(LEVELS).lower()} "
+                    f"{rng.choice(EVENTS).split()[0]} {rng.choice(EVENTS).split()[-1]}?")
+        start = time.perf_counter()
+        index.rank(question, args.top_k)
+        query_times.append(time.perf_counter() - start)
+
+    result = {"mb": args.mb, "lines": len(lines), "chunks": len(index.counts), "terms": len(index.postings),
+              "build_s": build_s, "edits": args.edits,
+              "edit_p50_ms": 1000 * percentile(edit_times, 0.5), "edit_max_ms": 1000 * max(edit_times),
+              "stale_after_edits": stale, "refresh_ms": 1000 * refresh_s,
+              "rank_p50_ms": 1000 * percentile(query_times, 0.5), "rank_p95_ms": 1000 * percentile(query_times, 0.95)}
+    print(f"{result['mb']:.0f} MB, {result['lines']} lines, {result['chunks']} chunks, {result['terms']} terms | "
+          f"build {result['build_s']:.1f}s | edit p50 {result['edit_p50_ms']:.3f}ms max {result['edit_max_ms']:.2f}ms | "
+          f"re-index {result['stale_after_edits']} stale chunks {result['refresh_ms']:.0f}ms | "
+          f"rank p50 {result['rank_p50_ms']:.0f}ms p95 {result['rank_p95_ms']:.0f}ms", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
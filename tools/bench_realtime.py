@@ -0,0 +1,119 @@
+"""
+Time to first token of the "realtime" backend (persistent WebSocket
+sessions, hello-gpt/backends/realtime.py) against the SSE backends, over a
+conversation in which each turn appends the reply and a new question to
+the document, as repeated Alt+G presses do. SSE runs against
+tools/mock_server.py, realtime against tools/mock_realtime.py, both with
+the same scenario.
+
+    python3 tools/bench_realtime.py --turns 10 --ttft 0.2 --tokens 100 --rate 0
+    python3 tools/bench_realtime.py --close-after-turns 3    # with reconnects
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import mock_server
+import mock_realtime
+from bench import load_engine, percentile
+
+TRANSPORTS = ("stdlib", "sdk", "realtime")
+
+
+def run_conversation(engine, provider, turns):
+    """
+    Returns one {"ttft", "total", "error", "usage"} dict per turn.
+    """
+    document = "Write a sentence about streaming."
+    samples = []
+    for turn in range(turns):
+        sample = {"ttft": None, "error": None, "usage": None}
+        parts = []
+        start = time.perf_counter()
+
+        def callback(event_type, data):
+            if event_type == "text":
+                if sample["ttft"] is None:
+                    sample["ttft"] = time.perf_counter() - start
+                parts.append(data)
+            elif event_type == "usage":
+                sample["usage"] = data
+            elif event_type in ("error", "stall"):
+                sample["error"] = str(data)
+
+        engine.chat_stream(document, callback, provider, "mock-model")
+        sample["total"] = time.perf_counter() - start
+        samples.append(sample)
+        document += "\n\n\n" + "".join(parts) + f"\nAnd another one ({turn + 1})."
+    return samples
+
+def summarize(transport, provider, samples, server):
+    ok = [s for s in samples if not s["error"]]
+    first, rest = ok[:1], ok[1:]
+    return {
+        "transport": transport,
+        "provider": provider,
+        "turns": len(samples),
+        "errors": [s["error"] for s in samples if s["error"]],
+        "first_ttft_ms": 1000 * first[0]["ttft"] if first and first[0]["ttft"] is not None else None,
+        "followup_ttft_p50_ms": 1000 * (percentile([s["ttft"] for s in rest if s["ttft"] is not None], 0.5) or 0),
+        "followup_ttft_p95_ms": 1000 * (percentile([s["ttft"] for s in rest if s["ttft"] is not None], 0.95) or 0),
+        "total_p50_ms": 1000 * (percentile([s["total"] for s in ok], 0.5) or 0),
+        "connections": server.counter.get("connections") if hasattr(server, "counter") else None,
+        "last_usage": ok[-1]["usage"] if ok else None,
+    }
+
+def format_result(result):
+    if "skipped" in result:
+        return f"{result['transport']:>8}/{result['provider']:<6} skipped: {result['skipped']}"
+    first = result["first_ttft_ms"]
+    connections = f" over {result['connections']} connection(s)" if result["connections"] is not None else ""
+    return (f"{result['transport']:>8}/{result['provider']:<6} ttft first "
+            f"{'-' if first is None else f'{first:.1f}ms'} follow-up p50 {result['followup_ttft_p50_ms']:.1f}ms "
+            f"p95 {result['followup_ttft_p95_ms']:.1f}ms total p50 {result['total_p50_ms']:.1f}ms | "
+            f"{result['turns']} turns{connections} errors {len(result['errors'])}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TTFT: persistent WebSocket sessions vs SSE")
+    parser.add_argument("--transports", nargs="+", default=["stdlib", "realtime"], choices=list(TRANSPORTS))
+    parser.add_argument("--providers", nargs="+", default=["openai", "gemini"], choices=["openai", "gemini"])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    mock_realtime.add_scenario_arguments(parser)
+    parser.set_defaults(tokens=100, rate=0)
+    args = parser.parse_args(argv)
+
+    scenario = mock_realtime.scenario_from_args(args)
+    results = []
+    for transport in args.transports:
+        for provider in args.providers:
+            if transport == "realtime":
+                server = mock_realtime.serve(0, **scenario)
+                base_url = f"http://127.0.0.1:{server.port}"
+            else:
+                server = mock_server.serve(0, **{k: v for k, v in scenario.items() if k in mock_server.DEFAULT_SCENARIO})
+                base_url = f"http://127.0.0.1:{server.server_port}"
+            engine = load_engine(transport, provider, base_url)
+            loaded, _ = engine.backends.load(provider, transport)
+            if loaded != transport:
+                result = {"transport": transport, "provider": provider,
+                          "skipped": "not importable in this Python"}
+            else:
+                result = summarize(transport, provider, run_conversation(engine, provider, args.turns), server)
+            server.shutdown()
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"scenario": scenario, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
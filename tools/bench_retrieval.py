@@ -0,0 +1,125 @@
+"""
+Project index performance (hello-gpt/retrieval.py) against the offline
+mock server's embedding endpoints: generates a synthetic project, builds
+its index from scratch, rescans it unchanged, re-embeds a few edited
+files and runs queries. The index goes to a temporary cache directory.
+
+    python3 tools/bench_retrieval.py --files 10000 --queries 50
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import mock_server
+from bench import load_package, load_engine, percentile
+from bench_keystroke import start_mock_server
+
+NAMES = ("parse", "render", "config", "cache", "buffer", "stream", "token", "index", "window", "request",
+         "reply", "ledger", "budget", "worker", "socket", "profile", "trace", "batch", "schedule", "session")
+
+
+def make_project(root, files, lines, seed):
+    """
+    files Python-like files of about lines lines each, in nested packages.
+    """
+    rng = random.Random(seed)
+    open(os.path.join(root, "pyproject.toml"), "w").close()
+    for number in range(files):
+        directory = os.path.join(root, f"pkg{number % 50}", f"mod{number % 7}")
+        os.makedirs(directory, exist_ok=True)
+        body = []
+        for _ in range(lines // 4):
+            a, b = rng.sample(NAMES, 2)
+            body.append(f"def {a}_{b}_{number}(value):\n    result = {a}(value)\n"
+                        f"    return {b}(result)\n\n")
+        with open(os.path.join(directory, f"file{number}.py"), "w") as f:
+            f.write("".join(body))
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def index_bytes(index):
+    return sum(os.path.getsize(os.path.join(index.path, name)) for name in os.listdir(index.path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project embedding index build, update and query times")
+    parser.add_argument("--provider", default="openai", choices=["openai", "gemini"])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=80, help="lines per file")
+    parser.add_argument("--edits", type=int, default=5, help="files edited before the incremental update")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    mock_server.add_scenario_arguments(parser)
+    parser.set_defaults(rate=0)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="hello-gpt-retrieval-")
+    os.environ["XDG_CACHE_HOME"] = os.path.join(workdir, "cache")
+    root = os.path.join(workdir, "project")
+    os.makedirs(root)
+    make_project(root, args.files, args.lines, args.seed)
+
+    server, base_url = start_mock_server(args)
+    try:
+        engine = load_engine("stdlib", args.provider, base_url)
+        engine.CONFIG["retrieval"] = {"provider": args.provider, "workers": args.workers,
+                                      "dimensions": args.dimensions}
+        retrieval = __import__(f"{load_package()}.retrieval", fromlist=["retrieval"])
+        backend = "numpy" if retrieval.numpy is not None else "pure Python"
+
+        index = retrieval.ProjectIndex(root)
+        build_s, _ = timed(index.build)
+        if index.error:
+            print(f"index build failed: {index.error}", file=sys.stderr)
+            return 1
+        chunks = sum(1 for chunk in index.manifest["chunks"] if chunk is not None)
+        rescan_s, _ = timed(retrieval.ProjectIndex(root).build)
+
+        rng = random.Random(args.seed)
+        edited = rng.sample(sorted(index.manifest["files"]), min(args.edits, len(index.manifest["files"])))
+        for relpath in edited:
+            with open(os.path.join(root, relpath), "a") as f:
+                f.write("def edited(value):\n    return value\n")
+        update_s, _ = timed(index.update_files, edited)
+
+        queries = []
+        for _ in range(args.queries):
+            a, b = rng.sample(NAMES, 2)
+            elapsed, _ = timed(index.context, f"result = {a}(value)\nreturn {b}(result)", None)
+            queries.append(elapsed)
+
+        result = {"provider": args.provider, "scoring": backend, "files": args.files, "chunks": chunks,
+                  "build_s": build_s, "files_per_s": args.files / build_s, "rescan_s": rescan_s,
+                  "update_s": update_s, "edited": len(edited), "index_bytes": index_bytes(index),
+                  "query_p50_ms": 1000 * percentile(queries, 0.5), "query_p95_ms": 1000 * percentile(queries, 0.95)}
+    finally:
+        server.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{result['provider']} ({result['scoring']}): {result['files']} files {result['chunks']} chunks | "
+          f"build {result['build_s']:.1f}s ({result['files_per_s']:.0f} files/s) | "
+          f"unchanged rescan {result['rescan_s']:.2f}s | "
+          f"{result['edited']} edited files {result['update_s'] * 1000:.0f}ms | "
+          f"index {result['index_bytes'] / 1e6:.1f} MB | "
+          f"query p50 {result['query_p50_ms']:.0f}ms p95 {result['query_p95_ms']:.0f}ms", file=sys.stderr)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"scenario": mock_server.scenario_from_args(args), "result": result}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
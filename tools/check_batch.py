@@ -0,0 +1,81 @@
+"""
+Runs the plugin's batch mode (hello-gpt/batch.py) end to end against the
+fake batch server (tools/fake_batch_server.py): writes the JSONL for a few
+documents, uploads and submits it through the OpenAI SDK, polls until the
+batch completes and checks that every document gets its answer back.
+Needs the vendored openai SDK; no API key.
+
+The fake server only emulates the OpenAI Files and Batches endpoints, so
+only the OpenAI path is checked; the Gemini path (genai files/batches)
+needs the real API.
+
+    python3 tools/check_batch.py --documents 5 --polls 3
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+import fake_batch_server
+from bench import load_engine, load_package
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch mode against the fake batch server")
+    parser.add_argument("--documents", type=int, default=3)
+    parser.add_argument("--polls", type=int, default=2, help="status polls before the batch completes")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    server = fake_batch_server.serve(0, args.polls)
+    workdir = tempfile.mkdtemp(prefix="hello-gpt-batch-")
+    try:
+        load_engine("stdlib", "openai", f"http://127.0.0.1:{server.server_port}")
+        batch = __import__(f"{load_package()}.batch", fromlist=["batch"])
+        openai_sdk = __import__(f"{load_package()}.backends.openai_sdk", fromlist=["openai_sdk"])
+        if not openai_sdk.AVAILABLE:
+            print("the vendored openai SDK can't be imported", file=sys.stderr)
+            return 1
+        openai_sdk.configure()
+
+        results = {}
+        errors = []
+        finished = threading.Event()
+
+        def on_result(job, key, text):
+            results[key] = text
+            if len(results) == args.documents:
+                finished.set()
+
+        def on_error(message):
+            errors.append(message)
+            finished.set()
+
+        runner = batch.BatchRunner(os.path.join(workdir, "batches.json"), on_result, on_error,
+                                   {"poll_initial": 0.05, "poll_max": 0.2})
+        targets = {f"doc-{i}": {"path": None, "name": f"Document {i}", "text": f"Text of document {i}"}
+                   for i in range(args.documents)}
+        start = time.perf_counter()
+        job_id = runner.submit("openai", "gpt-4o-mini", "Summarise", targets)
+        finished.wait(args.timeout)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    expected = {key: fake_batch_server.answer({"messages": [{"content": batch.build_prompt("Summarise", t["text"])}]})
+                for key, t in targets.items()}
+    ok = not errors and results == expected and not runner.jobs
+    print(f"batch {job_id}: {len(results)}/{args.documents} results in {elapsed:.2f}s"
+          f"{' | errors: ' + '; '.join(errors) if errors else ''} | {'ok' if ok else 'FAILED'}", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Local stand-in for the OpenAI Files and Batches endpoints.
+
+Point the plugin at it with "base_url": "http://127.0.0.1:8765/v1/" in the
+"openai" section of hello-gpt-config.json, then press Alt+B. Each batch
+request is answered with an echo of its prompt after a few status polls.
+tools/check_batch.py runs batch.py against it without gedit. The Gemini
+batch API is not emulated.
+
+    python3 tools/fake_batch_server.py --port 8765 --polls 2
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------------
+# In-memory state
+# -------------------------
+FILES = {}
+BATCHES = {}
+LOCK = threading.Lock()
+POLLS_TO_COMPLETE = 2
+
+
+def new_id(prefix, table):
+    return f"{prefix}-{len(table) + 1}"
+
+def answer(body):
+    prompt = body["messages"][-1]["content"]
+    return f"[fake batch] {prompt.splitlines()[0] if prompt else ''}"
+
+def run_batch(batch):
+    lines = []
+    for line in FILES[batch["input_file_id"]]["data"].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        lines.append(json.dumps({
+            "id": f"req-{request['custom_id']}",
+            "custom_id": request["custom_id"],
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "object": "chat.completion",
+                    "model": request["body"].get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": answer(request["body"])}
+                    }]
+                }
+            },
+            "error": None
+        }))
+
+    output_id = new_id("file", FILES)
+    FILES[output_id] = {"filename": "output.jsonl", "data": ("\n".join(lines) + "\n").encode("utf-8")}
+    batch.update(status="completed", output_file_id=output_id, completed_at=int(time.time()))
+
+
+# -------------------------
+# HTTP handler
+# -------------------------
+class FakeBatchHandler(BaseHTTPRequestHandler):
+    def send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        body = self.read_body()
+        with LOCK:
+            if self.path.rstrip("/").endswith("/files"):
+                header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+                message = BytesParser(policy=policy.HTTP).parsebytes(header + body)
+                upload = next(part for part in message.iter_parts()
+                              if part.get_param("name", header="content-disposition") == "file")
+                file_id = new_id("file", FILES)
+                FILES[file_id] = {"filename": upload.get_filename(), "data": upload.get_payload(decode=True)}
+                return self.send_json({
+                    "id": file_id, "object": "file", "bytes": len(FILES[file_id]["data"]),
+                    "created_at": int(time.time()), "filename": upload.get_filename(),
+                    "purpose": "batch", "status": "processed"
+                })
+
+            if self.path.rstrip("/").endswith("/batches"):
+                request = json.loads(body)
+                batch_id = new_id("batch", BATCHES)
+                BATCHES[batch_id] = {
+                    "id": batch_id, "object": "batch", "endpoint": request["endpoint"],
+                    "input_file_id": request["input_file_id"],
+                    "completion_window": request["completion_window"],
+                    "created_at": int(time.time()), "status": "validating",
+                    "output_file_id": None, "error_file_id": None, "polls": 0
+                }
+                return self.send_json(BATCHES[batch_id])
+
+        self.send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+    def do_GET(self):
+        with LOCK:
+            match = re.search(r"/batches/([^/]+)$", self.path)
+            if match and match.group(1) in BATCHES:
+                batch = BATCHES[match.group(1)]
+                batch["polls"] += 1
+                if batch["status"] != "completed":
+                    if batch["polls"] >= POLLS_TO_COMPLETE:
+                        run_batch(batch)
+                    else:
+                        batch["status"] = "in_progress"
+                return self.send_json(batch)
+
+            match = re.search(r"/files/([^/]+)/content$", self.path)
+            if match and match.group(1) in FILES:
+                data = FILES[match.group(1)]["data"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+
+        self.send_json({"error": {"message": f"Unknown path {self.path}"}}, 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, polls=2):
+    """
+    Starts the server on a daemon thread and returns it; port 0 picks a
+    free port (see server.server_port).
+    """
+    global POLLS_TO_COMPLETE
+    POLLS_TO_COMPLETE = polls
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeBatchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI batch server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--polls", type=int, default=2, help="status polls before a batch completes")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.polls)
+    print(f"Fake batch server on http://127.0.0.1:{server.server_port}/v1/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,203 @@
+"""
+Offline stand-in for the WebSocket endpoints of the "realtime" backend
+(hello-gpt/backends/realtime.py), speaking the subset of their framing the
+plugin uses:
+
+    /v1/realtime?model=<model>                     (OpenAI Realtime, text)
+    /ws/...GenerativeService.BidiGenerateContent   (Gemini Live, text)
+
+Point the plugin at it with "backend": "realtime" and "base_url":
+"http://127.0.0.1:8767/v1/" (openai) or "http://127.0.0.1:8767/" (gemini).
+Replies follow tools/mock_server.py's scenario (tokens, rate, chunk size,
+time to first token, dropped or frozen streams; the HTTP error and replay
+options don't apply). "close_after_turns" also closes each session after
+that many turns, to exercise reconnects. Each session keeps its
+conversation, so follow-up turns report the earlier turns as cached
+prompt tokens.
+
+    python3 tools/mock_realtime.py --port 8767 --tokens 500 --rate 200 --ttft 0.3
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(TOOLS_DIR), "hello-gpt", "google"))
+
+from websockets.sync.server import serve as ws_serve
+from websockets.exceptions import ConnectionClosed
+
+import mock_server
+from mock_server import DEFAULT_SCENARIO, reply_tokens
+
+REALTIME_SCENARIO = dict(DEFAULT_SCENARIO, close_after_turns=None)
+
+
+def paced(tokens, scenario):
+    """
+    Yields chunk_tokens tokens at a time at the scenario's pace. Raises
+    ConnectionAbortedError at disconnect_after and freezes at stall_after.
+    """
+    size = max(1, scenario["chunk_tokens"])
+    if scenario["ttft"]:
+        time.sleep(scenario["ttft"])
+    start = time.monotonic()
+    for index, offset in enumerate(range(0, len(tokens), size)):
+        if scenario["disconnect_after"] is not None and index >= scenario["disconnect_after"]:
+            raise ConnectionAbortedError
+        if scenario["stall_after"] is not None and index >= scenario["stall_after"]:
+            time.sleep(3600)
+        if scenario["rate"] and offset:
+            delay = start + offset / scenario["rate"] - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield "".join(tokens[offset:offset + size])
+
+
+# -------------------------
+# Sessions
+# -------------------------
+class MockSession:
+    def __init__(self, ws, scenario, counter):
+        self.ws = ws
+        self.scenario = scenario
+        self.counter = counter
+        self.history_tokens = 0
+        self.turns = 0
+
+    def send(self, event, binary=False):
+        data = json.dumps(event)
+        self.ws.send(data.encode("utf-8") if binary else data)
+
+    def finish_turn(self, prompt_tokens, output_tokens):
+        self.turns += 1
+        cached = self.history_tokens
+        self.history_tokens += prompt_tokens + output_tokens
+        with self.counter["lock"]:
+            self.counter["turns"] += 1
+        return cached
+
+    def closing(self):
+        limit = self.scenario["close_after_turns"]
+        return limit is not None and self.turns >= limit
+
+    def run_openai(self):
+        if "Authorization" not in self.ws.request.headers:
+            self.ws.close(1008, "missing Authorization")
+            return
+        self.send({"type": "session.created", "session": {"modalities": ["text", "audio"]}})
+        pending = []
+        for message in self.ws:
+            event = json.loads(message)
+            kind = event.get("type")
+            if kind == "session.update":
+                self.send({"type": "session.updated", "session": event.get("session") or {}})
+            elif kind == "conversation.item.create":
+                pending.append(event["item"])
+                self.send({"type": "conversation.item.created", "item": event["item"]})
+            elif kind == "response.create":
+                prompt = sum(len(c.get("text", "")) for item in pending for c in item.get("content", [])) // 4
+                pending = []
+                tokens = reply_tokens(self.scenario["tokens"])
+                self.send({"type": "response.created", "response": {"status": "in_progress"}})
+                for text in paced(tokens, self.scenario):
+                    self.send({"type": "response.text.delta", "delta": text})
+                self.send({"type": "response.text.done"})
+                cached = self.finish_turn(prompt, len(tokens))
+                self.send({"type": "response.done", "response": {"status": "completed", "usage": {
+                    "input_tokens": cached + prompt, "output_tokens": len(tokens),
+                    "total_tokens": cached + prompt + len(tokens),
+                    "input_token_details": {"cached_tokens": cached}}}})
+                if self.closing():
+                    self.ws.close(1000, "session turn limit")
+                    return
+            else:
+                self.send({"type": "error", "error": {"message": f"Unknown event type {kind!r}"}})
+
+    def run_gemini(self):
+        if "key=" not in self.ws.request.path:
+            self.ws.close(1008, "API key not valid")
+            return
+        for message in self.ws:
+            event = json.loads(message)
+            if "setup" in event:
+                self.send({"setupComplete": {}}, binary=True)
+            elif "clientContent" in event:
+                turns = event["clientContent"].get("turns") or []
+                prompt = sum(len(p.get("text", "")) for t in turns for p in t.get("parts", [])) // 4
+                tokens = reply_tokens(self.scenario["tokens"])
+                for text in paced(tokens, self.scenario):
+                    self.send({"serverContent": {"modelTurn": {"parts": [{"text": text}]}}}, binary=True)
+                cached = self.finish_turn(prompt, len(tokens))
+                self.send({"serverContent": {"turnComplete": True}, "usageMetadata": {
+                    "promptTokenCount": cached + prompt, "responseTokenCount": len(tokens),
+                    "cachedContentTokenCount": cached,
+                    "totalTokenCount": cached + prompt + len(tokens)}}, binary=True)
+                if self.closing():
+                    self.ws.close(1000, "session turn limit")
+                    return
+            else:
+                self.ws.close(1007, "Invalid JSON payload")
+                return
+
+
+def serve(port=0, **scenario):
+    """
+    Starts the server on a daemon thread and returns it; see
+    server.port, server.scenario and server.counter ("connections",
+    "turns").
+    """
+    settings = dict(REALTIME_SCENARIO)
+    settings.update(scenario)
+    counter = {"connections": 0, "turns": 0, "lock": threading.Lock()}
+
+    def handler(ws):
+        with counter["lock"]:
+            counter["connections"] += 1
+        session = MockSession(ws, settings, counter)
+        try:
+            if ws.request.path.startswith("/v1/realtime"):
+                session.run_openai()
+            elif "BidiGenerateContent" in ws.request.path:
+                session.run_gemini()
+            else:
+                ws.close(1008, "unknown endpoint")
+        except ConnectionAbortedError:
+            # A dropped connection: no close frame
+            ws.socket.shutdown(socket.SHUT_RDWR)
+        except ConnectionClosed:
+            pass
+
+    server = ws_serve(handler, "127.0.0.1", port, compression=None, max_size=None)
+    server.port = server.socket.getsockname()[1]
+    server.scenario = settings
+    server.counter = counter
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_scenario_arguments(parser):
+    mock_server.add_scenario_arguments(parser)
+    parser.add_argument("--close-after-turns", type=int, default=None, help="turns before closing a session")
+
+def scenario_from_args(args):
+    return {key: getattr(args, key) for key in REALTIME_SCENARIO}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI Realtime / Gemini Live WebSocket server")
+    parser.add_argument("--port", type=int, default=8767)
+    add_scenario_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(args.port, **scenario_from_args(args))
+    print(f"Mock realtime server on ws://127.0.0.1:{server.port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
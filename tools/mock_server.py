@@ -0,0 +1,419 @@
+"""
+Offline stand-in for the streaming endpoints the plugin's backends use:
+
+    POST /v1/chat/completions                               (OpenAI SSE)
+    POST /v1beta/models/<model>:streamGenerateContent?alt=sse  (Gemini SSE)
+    POST /v1/embeddings                                     (OpenAI embeddings)
+    POST /v1beta/models/<model>:batchEmbedContents          (Gemini embeddings)
+    POST /upload/v1beta/files                               (Gemini resumable upload)
+
+Point the plugin at it with "base_url": "http://127.0.0.1:8766/v1/" in the
+"openai" config section or "base_url": "http://127.0.0.1:8766/" in the
+"gemini" section. Streams are shaped by a scenario: token count and rate,
+tokens per chunk, time to first token, injected HTTP errors, dropped
+connections and frozen streams. An OpenAI request with a predicted
+output ("prediction") is answered with the prediction itself. With --replay DIR, openai.sse and
+gemini.sse in DIR (raw bodies of real streaming responses, e.g. saved with
+curl -N) are played back event by event instead of synthesized replies.
+Without them, the plugin's own recordings in DIR (recorder.py: "recording"
+in the config, or the CLI's --record) are replayed instead, each provider's
+in turn: status, headers and the exact body chunks, at their recorded
+times divided by --replay-speed (0 = no delays).
+Embeddings are deterministic hashed bags of words, so texts that share
+words score as similar. Uploaded files are kept in memory and count
+towards the prompt tokens of requests that refer to them; injected errors
+also hit upload chunks, to exercise resuming.
+
+    python3 tools/mock_server.py --port 8766 --tokens 500 --rate 200 --ttft 0.3
+"""
+import os
+import re
+import json
+import math
+import time
+import zlib
+import random
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------------
+# Scenario
+# -------------------------
+DEFAULT_SCENARIO = {
+    "tokens": 200,            # tokens per reply
+    "rate": 100.0,            # tokens per second after the first one; 0 = no delay
+    "chunk_tokens": 1,        # tokens per SSE event
+    "ttft": 0.0,              # seconds before the first event
+    "error_rate": 0.0,        # fraction of requests answered with error_status
+    "error_status": 500,
+    "disconnect_after": None, # drop the connection after this many events
+    "stall_after": None,      # stop sending (but keep the socket) after this many events
+    "replay": None,           # directory of recorded openai.sse / gemini.sse bodies or recordings
+    "replay_speed": 1.0,      # recordings: 1 = recorded pace, 10 = ten times faster, 0 = no delay
+    "seed": 0
+}
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+         "tempor incididunt ut labore et dolore magna aliqua").split()
+
+
+def reply_tokens(count):
+    return [(" " if i else "") + WORDS[i % len(WORDS)] for i in range(count)]
+
+def mock_embedding(text, dimensions):
+    """
+    A normalised bag of words, each word hashed to a signed bucket.
+    """
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        bucket = zlib.crc32(word.encode("utf-8"))
+        vector[bucket % dimensions] += 1.0 if bucket & 0x80000000 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [round(value / norm, 6) for value in vector]
+
+def read_recording(path):
+    """
+    Splits a recorded SSE body into its events, each with its trailing
+    blank line, so they can be paced like tokens.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        body = f.read().replace("\r\n", "\n")
+    return [event + "\n\n" for event in body.split("\n\n") if event.strip()]
+
+def read_recordings(directory, provider):
+    """
+    The plugin's recordings (recorder.py) of provider's requests in
+    directory that got a response, in the order they were made.
+    """
+    recordings = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(record, dict) and record.get("provider") == provider and record.get("status") is not None:
+            recordings.append(record)
+    return recordings
+
+def openai_event(model, text=None, finish=None, usage=None):
+    event = {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [] if usage else [{
+            "index": 0,
+            "delta": {"content": text} if text is not None else {},
+            "finish_reason": finish
+        }]
+    }
+    if usage:
+        event["usage"] = usage
+    return event
+
+def gemini_event(model, text, finish=None, usage=None):
+    parts = [{"text": text}] if text is not None else []
+    candidate = {"content": {"role": "model", "parts": parts}, "index": 0}
+    if finish:
+        candidate["finishReason"] = finish
+    event = {"candidates": [candidate], "modelVersion": model}
+    if usage:
+        event["usageMetadata"] = usage
+    return event
+
+
+# -------------------------
+# HTTP handler
+# -------------------------
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    scenario = DEFAULT_SCENARIO
+    counter = {"requests": 0}
+    # Uploaded file URI -> size, upload id -> bytes received
+    files = {}
+    uploads = {}
+    # provider -> recordings being replayed and the next one's position
+    recordings = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = urlparse(self.path).path
+        with self.lock:
+            self.counter["requests"] += 1
+            rng = random.Random(self.scenario["seed"] + self.counter["requests"])
+
+        if rng.random() < self.scenario["error_rate"]:
+            return self.send_error_json(self.scenario["error_status"], "Injected mock error")
+
+        if path.startswith("/upload/"):
+            return self.upload_file(data)
+        body = json.loads(data or b"{}")
+
+        if path.endswith("/chat/completions"):
+            if not self.stream_recorded("openai"):
+                self.stream_openai(body)
+        elif path.endswith(":streamGenerateContent"):
+            if not self.stream_recorded("gemini"):
+                self.stream_gemini(body, path.split("/models/")[-1].split(":")[0])
+        elif path.endswith("/embeddings"):
+            texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+            self.send_json({"object": "list", "model": body.get("model"),
+                            "data": [{"object": "embedding", "index": i,
+                                      "embedding": mock_embedding(text, body.get("dimensions") or 1536)}
+                                     for i, text in enumerate(texts)],
+                            "usage": {"prompt_tokens": sum(len(t) for t in texts) // 4,
+                                      "total_tokens": sum(len(t) for t in texts) // 4}})
+        elif path.endswith(":batchEmbedContents"):
+            self.send_json({"embeddings": [
+                {"values": mock_embedding("".join(p.get("text", "") for p in r["content"]["parts"]),
+                                          r.get("outputDimensionality") or 3072)}
+                for r in body["requests"]]})
+        else:
+            self.send_error_json(404, f"Unknown path {path}")
+
+    def upload_file(self, data):
+        """
+        The resumable upload protocol: start, upload [, finalize], query.
+        """
+        command = self.headers.get("X-Goog-Upload-Command", "")
+        with self.lock:
+            if command == "start":
+                upload_id = str(len(self.uploads) + 1)
+                self.uploads[upload_id] = bytearray()
+                url = f"http://{self.headers['Host']}/upload/v1beta/files?upload_id={upload_id}"
+                return self.send_json(None, headers={"X-Goog-Upload-URL": url, "X-Goog-Upload-Status": "active"})
+            upload_id = parse_qs(urlparse(self.path).query).get("upload_id", [""])[0]
+            received = self.uploads.get(upload_id)
+            if received is None:
+                return self.send_error_json(404, "Unknown upload")
+            if command == "query":
+                return self.send_json(None, headers={"X-Goog-Upload-Size-Received": str(len(received))})
+            if int(self.headers.get("X-Goog-Upload-Offset", -1)) != len(received):
+                return self.send_error_json(400, "Upload offset does not match the bytes received")
+            received += data
+            if "finalize" not in command:
+                return self.send_json(None, headers={"X-Goog-Upload-Status": "active"})
+            name = f"files/mock-{upload_id}"
+            uri = f"http://{self.headers['Host']}/v1beta/{name}"
+            self.files[uri] = len(received)
+        self.send_json({"file": {"name": name, "uri": uri, "mimeType": "text/plain", "sizeBytes": str(len(received)),
+                                 "state": "ACTIVE"}})
+
+    def send_json(self, reply, status=200, headers=None):
+        data = json.dumps(reply).encode("utf-8") if reply is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status, message):
+        data = json.dumps({"error": {"code": status, "message": message}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def paced_events(self, tokens):
+        """
+        Yields groups of chunk_tokens tokens at the scenario's pace and
+        applies disconnect/stall faults; cut_short is set when the stream
+        was dropped or frozen.
+        """
+        scenario = self.scenario
+        size = max(1, scenario["chunk_tokens"])
+        self.cut_short = False
+        if scenario["ttft"]:
+            time.sleep(scenario["ttft"])
+
+        start = time.monotonic()
+        for index, offset in enumerate(range(0, len(tokens), size)):
+            if scenario["disconnect_after"] is not None and index >= scenario["disconnect_after"]:
+                self.cut_short = self.close_connection = True
+                self.connection.close()
+                return
+            if scenario["stall_after"] is not None and index >= scenario["stall_after"]:
+                self.cut_short = True
+                time.sleep(3600)
+                return
+            if scenario["rate"] and offset:
+                delay = start + offset / scenario["rate"] - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield "".join(tokens[offset:offset + size])
+
+    def stream_recorded(self, provider):
+        """
+        Replays <replay>/<provider>.sse if there is one; returns False
+        otherwise. Each "token" is one recorded event.
+        """
+        if not self.scenario["replay"]:
+            return False
+        path = os.path.join(self.scenario["replay"], f"{provider}.sse")
+        if not os.path.exists(path):
+            return self.replay_recording(provider)
+        events = read_recording(path)
+        self.start_stream()
+        try:
+            for data in self.paced_events(events):
+                self.write_chunk(data.encode("utf-8"))
+            if not self.cut_short:
+                self.end_stream()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            self.close_connection = True
+        return True
+
+    def replay_recording(self, provider):
+        """
+        Replays the next of provider's recordings, if there are any; each
+        recorded chunk becomes one HTTP chunk, sent at its recorded time.
+        """
+        with self.lock:
+            if provider not in self.recordings:
+                self.recordings[provider] = [read_recordings(self.scenario["replay"], provider), 0]
+            recordings, position = self.recordings[provider]
+            if not recordings:
+                return False
+            self.recordings[provider][1] = position + 1
+        record = recordings[position % len(recordings)]
+        speed = self.scenario["replay_speed"]
+        start = time.monotonic()
+        self.send_response(record["status"])
+        for name, value in record["headers"]:
+            if name.lower() not in ("transfer-encoding", "content-length", "connection", "keep-alive", "date"):
+                self.send_header(name, value)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for at, data in record["chunks"]:
+                if speed:
+                    delay = start + at / speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.write_chunk(data.encode("utf-8", "surrogateescape"))
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            self.close_connection = True
+        return True
+
+    def stream_openai(self, body):
+        model = body.get("model", "mock")
+        prediction = (body.get("prediction") or {}).get("content")
+        # A predicted output comes back unchanged, every token accepted
+        tokens = re.findall(r"\s*\S+", prediction) if prediction else reply_tokens(self.scenario["tokens"])
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        self.start_stream()
+        try:
+            for text in self.paced_events(tokens):
+                self.write_chunk(b"data: " + json.dumps(openai_event(model, text)).encode("utf-8") + b"\n\n")
+            if self.cut_short:
+                return
+            self.write_chunk(b"data: " + json.dumps(openai_event(model, finish="stop")).encode("utf-8") + b"\n\n")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                         "total_tokens": prompt_tokens + len(tokens)}
+                if prediction:
+                    usage["completion_tokens_details"] = {"accepted_prediction_tokens": len(tokens),
+                                                          "rejected_prediction_tokens": 0}
+                self.write_chunk(b"data: " + json.dumps(openai_event(model, usage=usage)).encode("utf-8") + b"\n\n")
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            self.close_connection = True
+
+    def stream_gemini(self, body, model):
+        tokens = reply_tokens(self.scenario["tokens"])
+        prompt_tokens = len(json.dumps(body.get("contents", []))) // 4
+        for content in body.get("contents", []):
+            for part in content.get("parts", []):
+                if "fileData" in part:
+                    if part["fileData"].get("fileUri") not in self.files:
+                        return self.send_error_json(400, "File not found or not accessible")
+                    prompt_tokens += self.files[part["fileData"]["fileUri"]] // 4
+        self.start_stream()
+        try:
+            for text in self.paced_events(tokens):
+                self.write_chunk(b"data: " + json.dumps(gemini_event(model, text)).encode("utf-8") + b"\r\n\r\n")
+            if self.cut_short:
+                return
+            usage = {"promptTokenCount": prompt_tokens, "candidatesTokenCount": len(tokens),
+                     "totalTokenCount": prompt_tokens + len(tokens)}
+            self.write_chunk(b"data: " + json.dumps(gemini_event(model, None, "STOP", usage)).encode("utf-8") + b"\r\n\r\n")
+            self.end_stream()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, **scenario):
+    """
+    Starts the server on a daemon thread and returns it; port 0 picks a
+    free port (see server.server_port). Keyword arguments override
+    DEFAULT_SCENARIO and can be changed later via server.scenario.
+    """
+    settings = dict(DEFAULT_SCENARIO)
+    settings.update(scenario)
+    handler = type("MockHandler", (MockHandler,), {"scenario": settings, "counter": {"requests": 0},
+                                                   "files": {}, "uploads": {}, "recordings": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.scenario = settings
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_scenario_arguments(parser):
+    parser.add_argument("--tokens", type=int, default=DEFAULT_SCENARIO["tokens"])
+    parser.add_argument("--rate", type=float, default=DEFAULT_SCENARIO["rate"], help="tokens/s, 0 = unpaced")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_SCENARIO["chunk_tokens"])
+    parser.add_argument("--ttft", type=float, default=DEFAULT_SCENARIO["ttft"], help="seconds")
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_SCENARIO["error_rate"])
+    parser.add_argument("--error-status", type=int, default=DEFAULT_SCENARIO["error_status"])
+    parser.add_argument("--disconnect-after", type=int, default=None, help="events before dropping")
+    parser.add_argument("--stall-after", type=int, default=None, help="events before freezing")
+    parser.add_argument("--replay", default=None, help="directory of recorded openai.sse / gemini.sse or recordings")
+    parser.add_argument("--replay-speed", type=float, default=DEFAULT_SCENARIO["replay_speed"],
+                        help="recordings: speed-up over the recorded pace, 0 = no delays")
+    parser.add_argument("--seed", type=int, default=0)
+
+def scenario_from_args(args):
+    return {key: getattr(args, key) for key in DEFAULT_SCENARIO}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Gemini streaming server")
+    parser.add_argument("--port", type=int, default=8766)
+    add_scenario_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(args.port, **scenario_from_args(args))
+    print(f"Mock provider server on http://127.0.0.1:{server.server_port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()